@@ -0,0 +1,164 @@
+"""
+Circuit breaker for inter-service calls (one breaker per upstream).
+
+Shared by requests_service and approvals_service (config/ is put on sys.path
+in their settings) and by bot_gateway (api/circuit_breaker.py re-exports it).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple, TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """
+    Errors that say the upstream is unhealthy: transport errors, timeouts, 5xx.
+    4xx are the caller's problem and do not trip the breaker.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    closed -> open when the failure rate over the last `window` seconds reaches
+    `failure_rate` (with at least `min_calls` calls); open -> half-open after
+    `open_seconds`; half-open lets `half_open_calls` probes through and closes
+    on success or reopens on failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_rate: float | None = None,
+        min_calls: int | None = None,
+        window: float | None = None,
+        open_seconds: float | None = None,
+        half_open_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate or float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+        self.min_calls = min_calls or int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+        self.window = window or float(os.getenv("CIRCUIT_WINDOW_SECONDS", "30"))
+        self.open_seconds = open_seconds or float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_started_at = 0.0
+        self._calls: Deque[Tuple[float, bool]] = deque()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not reach the upstream."""
+        with self._lock:
+            self._refresh_state()
+            if self._state == OPEN:
+                raise CircuitOpenError(self.name, self.open_seconds - (time.monotonic() - self._opened_at))
+            if self._state == HALF_OPEN:
+                now = time.monotonic()
+                # Пробный вызов мог быть отменён и не отчитаться — не ждём его вечно
+                if self._probes >= self.half_open_calls and now - self._probe_started_at < self.open_seconds:
+                    raise CircuitOpenError(self.name, self.open_seconds - (now - self._probe_started_at))
+                if self._probes >= self.half_open_calls:
+                    self._probes = 0
+                self._probes += 1
+                self._probe_started_at = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                logger.info(f"Circuit '{self.name}' closed")
+                self._state = CLOSED
+                self._calls.clear()
+            self._record(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._record(False)
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if (
+                self._state == CLOSED
+                and len(self._calls) >= self.min_calls
+                and failures / len(self._calls) >= self.failure_rate
+            ):
+                self._open()
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._calls.append((now, ok))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _open(self) -> None:
+        logger.warning(f"Circuit '{self.name}' opened for {self.open_seconds:.0f}s")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        """Run one attempt of `func` through the breaker."""
+        self.before_call()
+        try:
+            result = await func()
+        except Exception as exc:
+            if is_upstream_failure(exc):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs: Any) -> CircuitBreaker:
+    """Process-wide breaker for the upstream `name`."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
@@ -8,7 +8,12 @@ reporting_service ("Reports") aligned with the same spreadsheet.
 from __future__ import annotations
 
 import os
+import threading
+import time
 from dataclasses import dataclass
+from typing import Any, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
 
 
 @dataclass(frozen=True)
@@ -27,3 +32,89 @@ GOOGLE_SHEETS_CONFIG = GoogleSheetsConfig(
     service_account_file=os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE"),
     service_account_json=os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON"),
 )
+
+
+def is_stale_handle_error(exc: Exception) -> bool:
+    """
+    True when a cached Spreadsheet/Worksheet handle is likely no longer valid:
+    the sheet was deleted or renamed. 403 is not included: it is almost always
+    a permission or quota error, which a fresh handle does not fix.
+    """
+    import gspread
+
+    if isinstance(exc, (gspread.exceptions.WorksheetNotFound, gspread.exceptions.SpreadsheetNotFound)):
+        return True
+    if isinstance(exc, gspread.exceptions.APIError):
+        response = getattr(exc, "response", None)
+        return getattr(response, "status_code", None) == 404
+    return False
+
+
+class WorksheetHandleCache:
+    """
+    Process-wide cache of gspread Worksheet handles keyed by
+    (spreadsheet_key, worksheet name).
+
+    Opening a worksheet costs two metadata requests (open_by_key + worksheet),
+    so handles are reused for `ttl` seconds and dropped as soon as the API
+    reports that the sheet is gone (404 / SpreadsheetNotFound /
+    WorksheetNotFound). A 403 (permissions, quota) keeps the handle.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._handles: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, client_factory: Callable[[], Any], spreadsheet_key: str, worksheet_name: str) -> Any:
+        key = (spreadsheet_key, worksheet_name)
+        with self._lock:
+            cached = self._handles.get(key)
+        if cached and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+
+        worksheet = client_factory().open_by_key(spreadsheet_key).worksheet(worksheet_name)
+        with self._lock:
+            self._handles[key] = (worksheet, time.monotonic())
+        return worksheet
+
+    def invalidate(self, spreadsheet_key: str, worksheet_name: str | None = None) -> None:
+        with self._lock:
+            for key in list(self._handles):
+                if key[0] == spreadsheet_key and worksheet_name in (None, key[1]):
+                    del self._handles[key]
+
+    def call(
+        self,
+        client_factory: Callable[[], Any],
+        spreadsheet_key: str,
+        worksheet_name: str,
+        action: Callable[[Any], T],
+        *,
+        retry: bool = True,
+    ) -> T:
+        """
+        Run `action(worksheet)` on the cached handle.
+
+        On a stale-handle error the handle is dropped; with `retry=True` (only
+        for read-only actions) it is reopened and the action run once more.
+        Writes must pass `retry=False`: part of a write may already be applied
+        when the error comes back, so running it again would duplicate rows.
+        The caller retries such writes itself, with a fresh handle.
+        """
+        worksheet = self.get(client_factory, spreadsheet_key, worksheet_name)
+        try:
+            return action(worksheet)
+        except Exception as exc:
+            if not is_stale_handle_error(exc):
+                raise
+            self.invalidate(spreadsheet_key, worksheet_name)
+            if not retry:
+                raise
+        worksheet = self.get(client_factory, spreadsheet_key, worksheet_name)
+        return action(worksheet)
+
+
+WORKSHEET_HANDLES = WorksheetHandleCache(
+    ttl=float(os.getenv("GOOGLE_SHEETS_HANDLE_TTL", "300")),
+)
@@ -0,0 +1,145 @@
+"""
+Per-process I/O executor for inter-service calls.
+
+Django views and workers are synchronous; instead of spinning an event loop
+and a fresh AsyncClient per call, the service clients run coroutines on one
+background loop thread per process via `run_sync` (waits for the result, with
+a timeout). Calls that must not block a request go through the outbox /
+side-effect workers, which use `run_sync` as well.
+
+Clients created on that loop keep their connection pools between calls.
+Shared by requests_service and approvals_service (config/ is on sys.path).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Coroutine, Dict, TypeVar
+
+import httpx
+
+from circuit_breaker import get_breaker, is_upstream_failure
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class HttpPool:
+    """One event loop thread and one pooled AsyncClient per upstream."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # После fork (gunicorn --preload) поток цикла в дочернем процессе не существует
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._clients = {}
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="inter-service-http",
+                    daemon=True,
+                )
+                self._thread.start()
+            return self._loop
+
+    def in_pool_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def client(self, name: str, timeout: float) -> httpx.AsyncClient:
+        """Pooled client for `name`; only valid inside the pool loop."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            limits = httpx.Limits(
+                max_connections=int(os.getenv("INTERSERVICE_HTTP_MAX_CONNECTIONS", "50")),
+                max_keepalive_connections=int(os.getenv("INTERSERVICE_HTTP_MAX_KEEPALIVE", "10")),
+            )
+            client = self._clients[name] = httpx.AsyncClient(timeout=timeout, limits=limits)
+        return client
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """
+        Run `coro` on the pool loop and wait for its result from sync code.
+        On timeout the call is cancelled and TimeoutError is raised.
+        """
+        future: "Future[T]" = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or self._pid != os.getpid() or not thread.is_alive():
+                return
+            self._loop = None
+
+        async def _close_clients() -> None:
+            await asyncio.gather(
+                *(client.aclose() for client in self._clients.values()),
+                return_exceptions=True,
+            )
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close_clients(), loop).result(5)
+        except Exception as exc:
+            logger.warning(f"Failed to close inter-service HTTP clients: {exc}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+
+
+_pool = HttpPool()
+atexit.register(_pool.close)
+
+
+def get_http_pool() -> HttpPool:
+    return _pool
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+    """Sync entry point for the service clients' `*_sync` wrappers."""
+    return _pool.run(coro, timeout)
+
+
+@asynccontextmanager
+async def pooled_client(name: str, timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    The pooled client when running on the pool loop, a one-off client
+    otherwise (e.g. when an async method is awaited from another loop).
+
+    Calls go through the circuit breaker of `name`: while the upstream is
+    down CircuitOpenError is raised right away instead of waiting for timeouts.
+    """
+    breaker = get_breaker(name)
+    breaker.before_call()
+    try:
+        if _pool.in_pool_loop():
+            yield _pool.client(name, timeout)
+        else:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                yield client
+    except Exception as exc:
+        if is_upstream_failure(exc):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    breaker.record_success()
@@ -0,0 +1,71 @@
+"""Worker that runs deferred side effects of approval transitions."""
+
+from __future__ import annotations
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from approvals_app.side_effects import SideEffectDispatcher, requeue_failed
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет отложенные побочные эффекты согласования: синхронизацию "
+        "статуса с requests_service и уведомления через bot_gateway."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать одну пачку задач и выйти.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=float(os.getenv("SIDE_EFFECTS_POLL_INTERVAL", "5.0")),
+            help="Пауза между опросами, когда очередь пуста (секунды).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Сколько задач забирать за один проход.",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Вернуть в очередь задачи, исчерпавшие попытки, перед запуском.",
+        )
+        parser.add_argument(
+            "--request-id",
+            type=int,
+            default=None,
+            help="С --retry-failed: только задачи этой заявки.",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            requeued = requeue_failed(options["request_id"])
+            self.stdout.write(f"Requeued {requeued} failed side effect(s).")
+
+        dispatcher = SideEffectDispatcher(batch_size=options["batch_size"])
+
+        if options["once"]:
+            processed = dispatcher.dispatch_batch()
+            self.stdout.write(f"Processed {processed} side effect(s).")
+            return
+
+        self.stdout.write("Side effect worker started.")
+        try:
+            while True:
+                close_old_connections()
+                processed = dispatcher.dispatch_batch()
+                # Пока есть работа, забираем следующую пачку без паузы
+                if processed < dispatcher.batch_size:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Side effect worker stopped.")
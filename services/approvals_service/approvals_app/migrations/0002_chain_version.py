@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalchain',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals_app', '0002_chain_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SideEffectJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('request.status', 'Статус заявки в requests_service'), ('notify.approver', 'Уведомление согласующему'), ('notify.approved', 'Уведомление автору: утверждена'), ('notify.rejected', 'Уведомление автору: отклонена')], help_text='Что нужно сделать', max_length=50)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Данные, зафиксированные в момент перехода')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает выполнения'), ('done', 'Выполнено'), ('failed', 'Не выполнено')], default='pending', help_text='Статус выполнения', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Сколько раз пытались выполнить задачу')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Не раньше какого времени делать следующую попытку')),
+                ('last_error', models.TextField(blank=True, help_text='Текст последней ошибки')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('done_at', models.DateTimeField(blank=True, help_text='Когда задача была успешно выполнена', null=True)),
+                ('chain', models.ForeignKey(help_text='Цепочка, переход которой породил задачу', on_delete=django.db.models.deletion.CASCADE, related_name='side_effects', to='approvals_app.approvalchain')),
+            ],
+            options={
+                'verbose_name': 'Побочный эффект',
+                'verbose_name_plural': 'Побочные эффекты',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='side_effect_status_due_idx')],
+            },
+        ),
+    ]
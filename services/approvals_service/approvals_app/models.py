@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Exists, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
@@ -20,6 +22,19 @@ class StepStatus(models.TextChoices):
     SKIPPED = "skipped", "Пропущено"
 
 
+class SideEffectKind(models.TextChoices):
+    REQUEST_STATUS = "request.status", "Статус заявки в requests_service"
+    NOTIFY_APPROVER = "notify.approver", "Уведомление согласующему"
+    NOTIFY_APPROVED = "notify.approved", "Уведомление автору: утверждена"
+    NOTIFY_REJECTED = "notify.rejected", "Уведомление автору: отклонена"
+
+
+class SideEffectStatus(models.TextChoices):
+    PENDING = "pending", "Ожидает выполнения"
+    DONE = "done", "Выполнено"
+    FAILED = "failed", "Не выполнено"
+
+
 @dataclass(frozen=True)
 class Approver:
     order: int
@@ -36,6 +51,17 @@ DEFAULT_APPROVAL_FLOW: List[Approver] = [
 ]
 
 
+class StaleTransitionError(Exception):
+    """The step was already processed or the chain changed since it was read."""
+
+    def __init__(self, chain: "ApprovalChain"):
+        super().__init__(
+            f"Approval chain of request {chain.request_id} is at step "
+            f"{chain.current_step_order} ({chain.status}), version {chain.version}"
+        )
+        self.chain = chain
+
+
 class ApprovalChain(models.Model):
     request_id = models.PositiveIntegerField(unique=True)
     summary = models.TextField()
@@ -45,6 +71,9 @@ class ApprovalChain(models.Model):
         default=ChainStatus.PENDING,
     )
     current_step_order = models.PositiveSmallIntegerField(default=1)
+    # Растёт на каждом переходе: клиент может передать прочитанную версию
+    # (оптимистическая блокировка) и получить 409, если цепочку уже изменили
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -55,93 +84,163 @@ class ApprovalChain(models.Model):
         return f"Согласование заявки {self.request_id}"
 
     def mark_rejected(self, step: "ApprovalStep", comment: str | None = None) -> None:
+        self.reject_step(step.order, comment=comment)
         step.status = StepStatus.REJECTED
         if comment:
             step.comment = comment
-        step.acted_at = timezone.now()
-        step.save(update_fields=["status", "comment", "acted_at", "updated_at"])
-        self.status = ChainStatus.REJECTED
-        self.save(update_fields=["status", "updated_at"])
-        
-        # Синхронизируем статус с requests_service
-        self._sync_request_status("rejected", step.order)
-        # Уведомляем автора об отклонении
-        self._notify_author_rejected(comment)
 
     def mark_approved(self, step: "ApprovalStep") -> None:
+        self.approve_step(step.order)
         step.status = StepStatus.APPROVED
-        step.acted_at = timezone.now()
-        step.save(update_fields=["status", "acted_at", "updated_at"])
 
-        next_step = (
-            self.steps.filter(order__gt=step.order).order_by("order").first()
+    def approve_step(self, step_order: int, *, expected_version: int | None = None) -> None:
+        """
+        Approve step `step_order` and move the chain to the next step (or
+        approve it) in one transaction: a compare-and-set UPDATE of the chain
+        (the next step is computed in SQL) and an UPDATE of the step. If the
+        chain is no longer at this step (another approver, a retried callback)
+        or its version differs, StaleTransitionError is raised and nothing
+        changes. Status sync and notifications are queued as side-effect jobs
+        in the same transaction and run by the worker after commit.
+        """
+        later_steps = ApprovalStep.objects.filter(chain=OuterRef("pk"), order__gt=step_order)
+        self._transition(
+            step_order,
+            expected_version,
+            chain_changes={
+                "current_step_order": Coalesce(
+                    Subquery(later_steps.order_by("order").values("order")[:1]),
+                    F("current_step_order"),
+                ),
+                "status": Case(
+                    When(Exists(later_steps), then=Value(ChainStatus.PENDING)),
+                    default=Value(ChainStatus.APPROVED),
+                ),
+            },
+            step_changes={"status": StepStatus.APPROVED},
+            side_effects=lambda: self._after_approved(step_order),
         )
-        if next_step:
-            self.current_step_order = next_step.order
-            self.save(update_fields=["current_step_order", "updated_at"])
-            # Синхронизируем статус - все еще в процессе
-            self._sync_request_status("in_progress", next_step.order)
-            # Уведомляем следующего согласующего
-            self._notify_next_approver(next_step)
-        else:
-            self.status = ChainStatus.APPROVED
-            self.save(update_fields=["status", "updated_at"])
+
+    def reject_step(
+        self,
+        step_order: int,
+        *,
+        comment: str | None = None,
+        expected_version: int | None = None,
+    ) -> None:
+        """Reject step `step_order` and the whole chain; see approve_step."""
+        step_changes = {"status": StepStatus.REJECTED}
+        if comment:
+            step_changes["comment"] = comment
+        self._transition(
+            step_order,
+            expected_version,
+            chain_changes={"status": ChainStatus.REJECTED},
+            step_changes=step_changes,
+            side_effects=lambda: self._after_rejected(step_order, comment),
+        )
+
+    def _transition(
+        self,
+        step_order: int,
+        expected_version: int | None,
+        *,
+        chain_changes: dict,
+        step_changes: dict,
+        side_effects: Callable[[], None],
+    ) -> None:
+        now = timezone.now()
+        chains = ApprovalChain.objects.filter(
+            pk=self.pk,
+            status=ChainStatus.PENDING,
+            current_step_order=step_order,
+        )
+        if expected_version is not None:
+            chains = chains.filter(version=expected_version)
+        with transaction.atomic():
+            claimed = chains.update(**chain_changes, version=F("version") + 1, updated_at=now)
+            if claimed:
+                claimed = ApprovalStep.objects.filter(
+                    chain_id=self.pk,
+                    order=step_order,
+                    status=StepStatus.WAITING,
+                ).update(**step_changes, acted_at=now, updated_at=now)
+            if claimed:
+                self.refresh_from_db(fields=self._TRANSITION_FIELDS)
+                side_effects()
+            else:
+                # Откатываем изменение цепочки, если шаг уже не ждёт решения
+                transaction.set_rollback(True)
+        if not claimed:
+            self.refresh_from_db(fields=self._TRANSITION_FIELDS)
+            raise StaleTransitionError(self)
+
+    _TRANSITION_FIELDS = ("status", "current_step_order", "version", "updated_at")
+
+    def _after_approved(self, step_order: int) -> None:
+        if self.status == ChainStatus.APPROVED:
             # Синхронизируем статус - утверждена
-            self._sync_request_status("approved", step.order)
+            self._sync_request_status("approved", step_order)
             # Уведомляем автора об утверждении
             self._notify_author_approved()
+            return
+        # Синхронизируем статус - все еще в процессе
+        self._sync_request_status("in_progress", self.current_step_order)
+        # Уведомляем следующего согласующего
+        next_step = self.steps.filter(order=self.current_step_order).first()
+        if next_step:
+            self._notify_next_approver(next_step)
+
+    def _after_rejected(self, step_order: int, comment: str | None) -> None:
+        # Синхронизируем статус с requests_service
+        self._sync_request_status("rejected", step_order)
+        # Уведомляем автора об отклонении
+        self._notify_author_rejected(comment)
+
+    # Побочные эффекты не выполняются здесь, а ставятся в очередь
+    # (SideEffectJob) в текущей транзакции; выполняет их воркер после commit.
 
     def _sync_request_status(self, status: str, current_level: int) -> None:
-        """Sync request status with requests_service."""
-        try:
-            from .requests_client import get_requests_client
-            client = get_requests_client()
-            client.update_request_status_sync(self.request_id, status, current_level)
-        except Exception:
-            # Логируем, но не падаем если синхронизация не удалась
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Failed to sync request {self.request_id} status to requests_service")
+        """Queue a status sync to requests_service."""
+        from .side_effects import enqueue_side_effect
+
+        enqueue_side_effect(
+            self,
+            SideEffectKind.REQUEST_STATUS,
+            {
+                "status": status,
+                "current_level": current_level,
+                # Номер перехода: старт цепочки — 1, каждый переход увеличивает
+                # version; requests_service отбрасывает повторы и устаревшие
+                "version": self.version + 1,
+            },
+        )
 
     def _notify_next_approver(self, step: "ApprovalStep") -> None:
-        """Notify next approver (via webhook or queue)."""
-        try:
-            from .notifications_client import get_notifications_client
-            client = get_notifications_client()
-            client.notify_approver_async(
-                telegram_username=step.telegram_username,
-                request_id=self.request_id,
-                summary=self.summary,
-                step_order=step.order,
-                approver_name=step.approver_name,
-            )
-        except Exception:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Failed to notify approver for request {self.request_id}")
+        """Queue a notification to the approver of `step` (via bot_gateway)."""
+        from .side_effects import enqueue_side_effect
+
+        enqueue_side_effect(
+            self,
+            SideEffectKind.NOTIFY_APPROVER,
+            {
+                "telegram_username": step.telegram_username,
+                "step_order": step.order,
+                "approver_name": step.approver_name,
+            },
+        )
 
     def _notify_author_approved(self) -> None:
-        """Notify author that request was approved."""
-        try:
-            from .notifications_client import get_notifications_client
-            client = get_notifications_client()
-            # Get author ID from requests_service
-            client.notify_author_approved_async(self.request_id)
-        except Exception:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Failed to notify author for request {self.request_id}")
+        """Queue a notification to the author that the request was approved."""
+        from .side_effects import enqueue_side_effect
+
+        enqueue_side_effect(self, SideEffectKind.NOTIFY_APPROVED)
 
     def _notify_author_rejected(self, comment: str | None = None) -> None:
-        """Notify author that request was rejected."""
-        try:
-            from .notifications_client import get_notifications_client
-            client = get_notifications_client()
-            client.notify_author_rejected_async(self.request_id, comment)
-        except Exception:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Failed to notify author for request {self.request_id}")
+        """Queue a notification to the author that the request was rejected."""
+        from .side_effects import enqueue_side_effect
+
+        enqueue_side_effect(self, SideEffectKind.NOTIFY_REJECTED, {"comment": comment})
 
 
 class ApprovalStep(models.Model):
@@ -170,3 +269,68 @@ class ApprovalStep(models.Model):
     def __str__(self) -> str:
         return f"{self.approver_name}: {self.get_status_display()}"
 
+
+class SideEffectJob(models.Model):
+    """
+    Отложенный побочный эффект перехода цепочки: синхронизация статуса
+    с requests_service или уведомление через bot_gateway.
+
+    Пишется в той же транзакции, что и переход, выполняется воркером
+    после commit (`manage.py run_side_effects` или фоновый поток процесса)
+    с повторами; статус доставки хранится здесь же.
+    """
+
+    chain = models.ForeignKey(
+        ApprovalChain,
+        related_name="side_effects",
+        on_delete=models.CASCADE,
+        help_text="Цепочка, переход которой породил задачу",
+    )
+    kind = models.CharField(
+        max_length=50,
+        choices=SideEffectKind.choices,
+        help_text="Что нужно сделать",
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Данные, зафиксированные в момент перехода",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=SideEffectStatus.choices,
+        default=SideEffectStatus.PENDING,
+        help_text="Статус выполнения",
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Сколько раз пытались выполнить задачу",
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Не раньше какого времени делать следующую попытку",
+    )
+    last_error = models.TextField(
+        blank=True,
+        help_text="Текст последней ошибки",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    done_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Когда задача была успешно выполнена",
+    )
+
+    class Meta:
+        ordering = ("id",)
+        indexes = [
+            models.Index(
+                fields=("status", "next_attempt_at"),
+                name="side_effect_status_due_idx",
+            ),
+        ]
+        verbose_name = "Побочный эффект"
+        verbose_name_plural = "Побочные эффекты"
+
+    def __str__(self) -> str:
+        return f"{self.kind} для цепочки #{self.chain_id} ({self.status})"
@@ -6,7 +6,7 @@ import logging
 import os
 from typing import Any, Dict
 
-import httpx
+from http_pool import pooled_client
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +41,7 @@ class NotificationsClient:
                 "approver_name": approver_name,
             }
             url = f"{self.base_url}/notifications/send"
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with pooled_client("notifications", self.timeout) as client:
                 response = await client.post(url, json=payload)
                 response.raise_for_status()
                 return response.json()
@@ -60,7 +60,7 @@ class NotificationsClient:
                 "request_id": request_id,
             }
             url = f"{self.base_url}/notifications/send"
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with pooled_client("notifications", self.timeout) as client:
                 response = await client.post(url, json=payload)
                 response.raise_for_status()
                 return response.json()
@@ -82,7 +82,7 @@ class NotificationsClient:
                 "comment": comment,
             }
             url = f"{self.base_url}/notifications/send"
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with pooled_client("notifications", self.timeout) as client:
                 response = await client.post(url, json=payload)
                 response.raise_for_status()
                 return response.json()
@@ -4,9 +4,9 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Any, Dict
+from typing import Any, Dict, List
 
-import httpx
+from http_pool import pooled_client, run_sync
 
 
 def get_api_headers() -> Dict[str, str]:
@@ -21,7 +21,7 @@ logger = logging.getLogger(__name__)
 
 
 class RequestsClient:
-    """Client for updating request status in requests_service."""
+    """Client for pushing request status transitions to requests_service."""
 
     def __init__(self):
         self.base_url = os.getenv("REQUESTS_SERVICE_URL", "http://requests_service:8000/api").rstrip("/")
@@ -29,10 +29,12 @@ class RequestsClient:
         self.enabled = os.getenv("REQUESTS_SERVICE_ENABLED", "true").lower() == "true"
 
     async def update_request_status_async(
-        self, request_id: int, status: str, current_level: int = 0
+        self, request_id: int, status: str, current_level: int = 0, *, version: int
     ) -> Dict[str, Any] | None:
         """
-        Update request status in requests_service asynchronously.
+        Push a status transition to requests_service asynchronously.
+        `version` is the transition number of the approval chain: requests_service
+        applies it only if it is newer than the last applied one.
         """
         if not self.enabled:
             return None
@@ -41,11 +43,12 @@ class RequestsClient:
             payload = {
                 "status": status,
                 "current_level": current_level,
+                "version": version,
             }
-            url = f"{self.base_url}/requests/{request_id}/"
+            url = f"{self.base_url}/requests/{request_id}/transition/"
             headers = get_api_headers()
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.patch(url, json=payload, headers=headers)
+            async with pooled_client("requests", self.timeout) as client:
+                response = await client.post(url, json=payload, headers=headers)
                 response.raise_for_status()
                 return response.json()
         except Exception as exc:
@@ -53,16 +56,41 @@ class RequestsClient:
             return None
 
     def update_request_status_sync(
-        self, request_id: int, status: str, current_level: int = 0
+        self, request_id: int, status: str, current_level: int = 0, *, version: int
     ) -> Dict[str, Any] | None:
-        """Synchronous wrapper."""
-        import asyncio
+        """Synchronous wrapper (runs on the shared inter-service loop)."""
+        # httpx timeout действует на каждую операцию; на весь вызов даём двойной запас
+        return run_sync(
+            self.update_request_status_async(request_id, status, current_level, version=version),
+            timeout=self.timeout * 2,
+        )
+
+    async def apply_transitions_async(
+        self, transitions: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]] | None:
+        """
+        Push several transitions in one call ({"id", "status", "current_level",
+        "version"} each). Returns per-request results of requests_service.
+        """
+        if not self.enabled:
+            return None
+
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        return loop.run_until_complete(self.update_request_status_async(request_id, status, current_level))
+            url = f"{self.base_url}/requests/transitions/"
+            headers = get_api_headers()
+            async with pooled_client("requests", self.timeout) as client:
+                response = await client.post(url, json={"transitions": transitions}, headers=headers)
+                response.raise_for_status()
+                return response.json()["results"]
+        except Exception as exc:
+            logger.error(f"Failed to push {len(transitions)} status transition(s): {exc}")
+            return None
+
+    def apply_transitions_sync(
+        self, transitions: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]] | None:
+        """Synchronous wrapper (runs on the shared inter-service loop)."""
+        return run_sync(self.apply_transitions_async(transitions), timeout=self.timeout * 2)
 
 
 # Singleton instance
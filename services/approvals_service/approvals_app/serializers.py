@@ -38,6 +38,7 @@ class ApprovalChainSerializer(serializers.ModelSerializer):
             "summary",
             "status",
             "current_step_order",
+            "version",
             "steps",
             "created_at",
             "updated_at",
@@ -68,4 +69,8 @@ class StartApprovalSerializer(serializers.ModelSerializer):
 class ApprovalActionSerializer(serializers.Serializer):
     actor_username = serializers.CharField(max_length=100, allow_blank=True)
     comment = serializers.CharField(required=False, allow_blank=True)
+    # Шаг, который согласующий видел в уведомлении; если цепочка уже ушла
+    # дальше (повторное нажатие, второй согласующий), вернётся 409
+    step_order = serializers.IntegerField(required=False, min_value=1)
+    version = serializers.IntegerField(required=False, min_value=0)
 
@@ -0,0 +1,315 @@
+"""
+Deferred side effects of approval transitions.
+
+A transition only records SideEffectJob rows in its own transaction
+(enqueue_side_effect), so the approve/reject endpoints never wait for
+requests_service or bot_gateway. `manage.py run_side_effects` delivers the
+jobs in a separate process and can requeue failed ones; for local development
+SIDE_EFFECTS_INPROCESS_WORKER=true also wakes an in-process thread after commit.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import timedelta
+from typing import Any, Callable, Dict, List
+
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from http_pool import run_sync
+
+from .models import ApprovalChain, SideEffectJob, SideEffectKind, SideEffectStatus
+from .notifications_client import get_notifications_client
+from .requests_client import get_requests_client
+
+logger = logging.getLogger(__name__)
+
+
+class SideEffectError(Exception):
+    """Raised by a handler when the upstream did not accept the call."""
+
+
+def enqueue_side_effect(
+    chain: ApprovalChain,
+    kind: str,
+    payload: Dict[str, Any] | None = None,
+) -> SideEffectJob:
+    """
+    Record a side effect of a transition of `chain`.
+    Should be called inside the transaction that changes the chain: the job
+    is rolled back with it and the worker is woken up only after commit.
+    """
+    job = SideEffectJob.objects.create(chain=chain, kind=kind, payload=payload or {})
+    transaction.on_commit(kick_worker)
+    return job
+
+
+def _sync_request_status(job: SideEffectJob) -> None:
+    client = get_requests_client()
+    if not client.enabled:
+        return
+    result = client.update_request_status_sync(
+        job.chain.request_id,
+        job.payload["status"],
+        job.payload.get("current_level", 0),
+        version=job.payload["version"],
+    )
+    if result is None:
+        raise SideEffectError("requests_service did not accept the status")
+
+
+def _notify(job: SideEffectJob, coro_factory: Callable[[Any], Any]) -> None:
+    client = get_notifications_client()
+    if not client.enabled:
+        return
+    # httpx timeout действует на каждую операцию; на весь вызов даём двойной запас
+    result = run_sync(coro_factory(client), timeout=client.timeout * 2)
+    if result is None:
+        raise SideEffectError("bot_gateway did not accept the notification")
+
+
+def _notify_approver(job: SideEffectJob) -> None:
+    if not job.payload.get("telegram_username"):
+        return
+    _notify(
+        job,
+        lambda client: client.notify_approver_async(
+            telegram_username=job.payload["telegram_username"],
+            request_id=job.chain.request_id,
+            summary=job.chain.summary,
+            step_order=job.payload["step_order"],
+            approver_name=job.payload.get("approver_name", ""),
+        ),
+    )
+
+
+def _notify_approved(job: SideEffectJob) -> None:
+    _notify(job, lambda client: client.notify_author_approved_async(job.chain.request_id))
+
+
+def _notify_rejected(job: SideEffectJob) -> None:
+    _notify(
+        job,
+        lambda client: client.notify_author_rejected_async(
+            job.chain.request_id, job.payload.get("comment")
+        ),
+    )
+
+
+class SideEffectDispatcher:
+    """
+    Runs due side-effect jobs in batches.
+
+    A batch is claimed in a short transaction (rows are leased by moving
+    `next_attempt_at` forward, rows locked by other workers are skipped) and
+    executed outside of it. Status syncs carry the chain's transition number,
+    so requests_service ignores ones that arrive late or twice; several syncs
+    in a batch go out as one call. Failed jobs are retried with exponential
+    backoff until `max_attempts`.
+    """
+
+    handlers: Dict[str, Callable[[SideEffectJob], None]] = {
+        SideEffectKind.REQUEST_STATUS: _sync_request_status,
+        SideEffectKind.NOTIFY_APPROVER: _notify_approver,
+        SideEffectKind.NOTIFY_APPROVED: _notify_approved,
+        SideEffectKind.NOTIFY_REJECTED: _notify_rejected,
+    }
+
+    def __init__(
+        self,
+        *,
+        batch_size: int | None = None,
+        max_attempts: int | None = None,
+        retry_base_delay: float | None = None,
+        retry_max_delay: float | None = None,
+        lease_seconds: float | None = None,
+    ) -> None:
+        self.batch_size = batch_size or int(os.getenv("SIDE_EFFECTS_BATCH_SIZE", "50"))
+        self.max_attempts = max_attempts or int(os.getenv("SIDE_EFFECTS_MAX_ATTEMPTS", "10"))
+        self.retry_base_delay = retry_base_delay or float(os.getenv("SIDE_EFFECTS_RETRY_BASE_DELAY", "5.0"))
+        self.retry_max_delay = retry_max_delay or float(os.getenv("SIDE_EFFECTS_RETRY_MAX_DELAY", "600.0"))
+        self.lease_seconds = lease_seconds or float(os.getenv("SIDE_EFFECTS_LEASE_SECONDS", "120.0"))
+
+    def dispatch_batch(self) -> int:
+        """Run one batch of due jobs. Returns the number of jobs processed."""
+        jobs = self._claim_batch()
+        status_jobs = [job for job in jobs if job.kind == SideEffectKind.REQUEST_STATUS]
+        single_jobs = jobs
+        if len(status_jobs) > 1:
+            # Несколько синхронизаций статуса в пачке — один вызов requests_service
+            self._run_status_batch(status_jobs)
+            single_jobs = [job for job in jobs if job.kind != SideEffectKind.REQUEST_STATUS]
+        for job in single_jobs:
+            self._run(job)
+        return len(jobs)
+
+    def _claim_batch(self) -> List[SideEffectJob]:
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                SideEffectJob.objects.select_for_update(skip_locked=True, of=("self",))
+                .select_related("chain")
+                .filter(status=SideEffectStatus.PENDING, next_attempt_at__lte=now)
+                .order_by("id")[: self.batch_size]
+            )
+            if jobs:
+                SideEffectJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds),
+                )
+        return jobs
+
+    def _run(self, job: SideEffectJob) -> None:
+        handler = self.handlers.get(job.kind)
+        attempts = job.attempts + 1
+        try:
+            if handler is None:
+                raise SideEffectError(f"No handler for side effect {job.kind!r}")
+            handler(job)
+        except Exception as exc:
+            self._mark_failed_attempt(job, attempts, exc)
+            return
+        self._mark_done([job])
+
+    def _run_status_batch(self, jobs: List[SideEffectJob]) -> None:
+        """
+        Push all status transitions of the batch with one POST /requests/transitions/.
+        requests_service keeps only the newest transition of each request, so an
+        older job of the same request is done as soon as the call succeeds.
+        """
+        client = get_requests_client()
+        if not client.enabled:
+            self._mark_done(jobs)
+            return
+        try:
+            results = client.apply_transitions_sync(
+                [
+                    {
+                        "id": job.chain.request_id,
+                        "status": job.payload["status"],
+                        "current_level": job.payload.get("current_level", 0),
+                        "version": job.payload["version"],
+                    }
+                    for job in jobs
+                ]
+            )
+            if results is None:
+                raise SideEffectError("requests_service did not accept the status batch")
+        except Exception as exc:
+            for job in jobs:
+                self._mark_failed_attempt(job, job.attempts + 1, exc)
+            return
+
+        missing = {item["id"]: item["detail"] for item in results if "detail" in item}
+        self._mark_done([job for job in jobs if job.chain.request_id not in missing])
+        for job in jobs:
+            if job.chain.request_id in missing:
+                self._mark_failed_attempt(
+                    job, job.attempts + 1, SideEffectError(missing[job.chain.request_id])
+                )
+
+    def _mark_done(self, jobs: List[SideEffectJob]) -> None:
+        if not jobs:
+            return
+        # attempts у задач пачки разные: считаем попытку в самом UPDATE
+        SideEffectJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=SideEffectStatus.DONE,
+            attempts=F("attempts") + 1,
+            done_at=timezone.now(),
+            last_error="",
+        )
+
+    def _mark_failed_attempt(self, job: SideEffectJob, attempts: int, exc: Exception) -> None:
+        if attempts >= self.max_attempts:
+            logger.error(
+                f"Side effect {job.pk} ({job.kind}) for request {job.chain.request_id} "
+                f"failed after {attempts} attempts: {exc}"
+            )
+            SideEffectJob.objects.filter(pk=job.pk).update(
+                status=SideEffectStatus.FAILED,
+                attempts=attempts,
+                last_error=str(exc),
+            )
+            return
+
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        logger.warning(
+            f"Side effect {job.pk} ({job.kind}) for request {job.chain.request_id} "
+            f"failed (attempt {attempts}/{self.max_attempts}): {exc}. Retrying in {delay}s..."
+        )
+        SideEffectJob.objects.filter(pk=job.pk).update(
+            attempts=attempts,
+            next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            last_error=str(exc),
+        )
+
+
+def requeue_failed(chain_request_id: int | None = None) -> int:
+    """Return failed jobs to the queue with a fresh attempt budget."""
+    jobs = SideEffectJob.objects.filter(status=SideEffectStatus.FAILED)
+    if chain_request_id is not None:
+        jobs = jobs.filter(chain__request_id=chain_request_id)
+    return jobs.update(
+        status=SideEffectStatus.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+    )
+
+
+class BackgroundWorker:
+    """
+    Per-process worker thread: runs due jobs when woken up after a commit and
+    every `poll_interval` seconds (retries, jobs of crashed processes).
+    """
+
+    def __init__(self) -> None:
+        self.poll_interval = float(os.getenv("SIDE_EFFECTS_POLL_INTERVAL", "5.0"))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def kick(self) -> None:
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            # После fork (gunicorn --preload) потока в дочернем процессе нет
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run_forever,
+                    name="approval-side-effects",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _run_forever(self) -> None:
+        dispatcher = SideEffectDispatcher()
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                # Пока есть работа, забираем следующую пачку без паузы
+                while dispatcher.dispatch_batch() >= dispatcher.batch_size:
+                    pass
+            except Exception as exc:
+                logger.error(f"Side effect worker iteration failed: {exc}")
+            finally:
+                close_old_connections()
+
+
+_worker = BackgroundWorker()
+
+
+def kick_worker() -> None:
+    """
+    Wake up the in-process worker. Off by default: deployments run the
+    dedicated run_side_effects worker; the thread is for local development.
+    """
+    if os.getenv("SIDE_EFFECTS_INPROCESS_WORKER", "false").lower() != "true":
+        return
+    _worker.kick()
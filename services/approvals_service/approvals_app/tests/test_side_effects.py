@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from approvals_app.models import ApprovalChain, SideEffectJob, SideEffectKind, SideEffectStatus
+from approvals_app.side_effects import SideEffectDispatcher, enqueue_side_effect
+
+
+class _StubRequestsClient:
+    enabled = True
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def update_request_status_sync(self, request_id, status, current_level=0, *, version):
+        self.calls.append((request_id, status, current_level, version))
+        return self.result
+
+    def apply_transitions_sync(self, transitions):
+        self.calls.append(transitions)
+        return self.result
+
+
+class SideEffectDispatcherTests(TestCase):
+    def setUp(self) -> None:
+        self.chain = ApprovalChain.objects.create(request_id=701, summary="Склад: Алматы")
+        self.job = enqueue_side_effect(
+            self.chain,
+            SideEffectKind.REQUEST_STATUS,
+            {"status": "in_progress", "current_level": 2, "version": 2},
+        )
+        self.dispatcher = SideEffectDispatcher(
+            max_attempts=2,
+            retry_base_delay=1.0,
+            retry_max_delay=1.0,
+        )
+
+    def _dispatch_with(self, client) -> int:
+        with patch("approvals_app.side_effects.get_requests_client", return_value=client):
+            return self.dispatcher.dispatch_batch()
+
+    def test_successful_job_is_marked_done(self) -> None:
+        client = _StubRequestsClient({"id": 701})
+        self.assertEqual(self._dispatch_with(client), 1)
+        self.assertEqual(client.calls, [(701, "in_progress", 2, 2)])
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, SideEffectStatus.DONE)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertIsNotNone(self.job.done_at)
+
+    def test_failed_job_is_retried_then_marked_failed(self) -> None:
+        client = _StubRequestsClient(None)
+        self._dispatch_with(client)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, SideEffectStatus.PENDING)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertIn("requests_service", self.job.last_error)
+        self.assertGreater(self.job.next_attempt_at, timezone.now())
+
+        # Следующая попытка ещё не наступила
+        self.assertEqual(self._dispatch_with(client), 0)
+
+        SideEffectJob.objects.filter(pk=self.job.pk).update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        self._dispatch_with(client)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, SideEffectStatus.FAILED)
+        self.assertEqual(self.job.attempts, 2)
+
+    def test_status_syncs_of_a_batch_go_out_in_one_call(self) -> None:
+        other = ApprovalChain.objects.create(request_id=702, summary="Склад: Астана")
+        later = enqueue_side_effect(
+            self.chain,
+            SideEffectKind.REQUEST_STATUS,
+            {"status": "approved", "current_level": 4, "version": 5},
+        )
+        missing = enqueue_side_effect(
+            other,
+            SideEffectKind.REQUEST_STATUS,
+            {"status": "rejected", "current_level": 1, "version": 2},
+        )
+        client = _StubRequestsClient(
+            [
+                {"id": 701, "status": "approved", "current_level": 4, "status_version": 5, "applied": True},
+                {"id": 702, "applied": False, "detail": "Заявка не найдена."},
+            ]
+        )
+        self.assertEqual(self._dispatch_with(client), 3)
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual([item["version"] for item in client.calls[0]], [2, 5, 2])
+
+        statuses = dict(SideEffectJob.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[self.job.pk], SideEffectStatus.DONE)
+        self.assertEqual(statuses[later.pk], SideEffectStatus.DONE)
+        self.assertEqual(statuses[missing.pk], SideEffectStatus.PENDING)
+        missing.refresh_from_db()
+        self.assertEqual(missing.attempts, 1)
+        self.assertIn("не найдена", missing.last_error)
+
+    def test_notification_without_username_is_skipped(self) -> None:
+        SideEffectJob.objects.filter(pk=self.job.pk).update(status=SideEffectStatus.DONE)
+        job = enqueue_side_effect(
+            self.chain,
+            SideEffectKind.NOTIFY_APPROVER,
+            {"telegram_username": "", "step_order": 1, "approver_name": "Денис"},
+        )
+        self.dispatcher.dispatch_batch()
+        job.refresh_from_db()
+        self.assertEqual(job.status, SideEffectStatus.DONE)
+
+    def test_command_requeues_failed_jobs(self) -> None:
+        SideEffectJob.objects.filter(pk=self.job.pk).update(status=SideEffectStatus.FAILED, attempts=10)
+        out = StringIO()
+        with patch("approvals_app.side_effects.get_requests_client", return_value=_StubRequestsClient({"id": 701})):
+            call_command("run_side_effects", "--once", "--retry-failed", stdout=out)
+        self.assertIn("Requeued 1", out.getvalue())
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, SideEffectStatus.DONE)
+        self.assertEqual(self.job.attempts, 1)
@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from approvals_app.models import ApprovalChain, ChainStatus, SideEffectKind, StepStatus
+
+
+class ApprovalTransitionTests(APITestCase):
+    request_id = 601
+
+    def setUp(self) -> None:
+        response = self.client.post(
+            "/api/approvals/start/",
+            {"request_id": self.request_id, "summary": "Склад: Алматы"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.chain = ApprovalChain.objects.get(request_id=self.request_id)
+
+    def _post(self, action: str, **data):
+        return self.client.post(
+            f"/api/approvals/{self.request_id}/{action}/",
+            {"actor_username": "denis", **data},
+            format="json",
+        )
+
+    def test_repeated_approve_of_same_step_advances_once(self) -> None:
+        first = self._post("approve", step_order=1)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["current_step_order"], 2)
+        self.assertEqual(first.data["version"], 1)
+
+        # Повторное нажатие кнопки в Telegram
+        second = self._post("approve", step_order=1)
+        self.assertEqual(second.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(second.data["current_step_order"], 2)
+        self.assertEqual(second.data["version"], 1)
+
+        self.chain.refresh_from_db()
+        self.assertEqual(self.chain.current_step_order, 2)
+        self.assertEqual(self.chain.steps.get(order=2).status, StepStatus.WAITING)
+
+    def test_stale_version_is_conflict(self) -> None:
+        self.assertEqual(self._post("approve", version=0).status_code, status.HTTP_200_OK)
+        response = self._post("reject", version=0, comment="Поздно")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.chain.refresh_from_db()
+        self.assertEqual(self.chain.status, ChainStatus.PENDING)
+        self.assertEqual(self.chain.steps.get(order=2).status, StepStatus.WAITING)
+
+    def test_last_step_approves_chain(self) -> None:
+        for order in range(1, self.chain.steps.count() + 1):
+            self.assertEqual(self._post("approve", step_order=order).status_code, status.HTTP_200_OK)
+        self.chain.refresh_from_db()
+        self.assertEqual(self.chain.status, ChainStatus.APPROVED)
+        self.assertEqual(self._post("reject").status_code, status.HTTP_409_CONFLICT)
+
+    def test_side_effects_are_queued_and_run_after_commit(self) -> None:
+        queued_on_start = list(self.chain.side_effects.values_list("pk", flat=True))
+        with patch("approvals_app.side_effects.kick_worker") as kick:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self._post("approve", step_order=1)
+                kick.assert_not_called()
+            for callback in callbacks:
+                callback()
+        kick.assert_called()
+        jobs = list(self.chain.side_effects.exclude(pk__in=queued_on_start).values_list("kind", "payload"))
+        self.assertIn((SideEffectKind.REQUEST_STATUS, {"status": "in_progress", "current_level": 2, "version": 2}), jobs)
+        self.assertIn(SideEffectKind.NOTIFY_APPROVER, [kind for kind, _ in jobs])
+
+    def test_conflict_has_no_side_effects(self) -> None:
+        self._post("reject", step_order=1)
+        queued = self.chain.side_effects.count()
+        response = self._post("approve", step_order=1)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.chain.side_effects.count(), queued)
@@ -22,6 +22,19 @@ class ApprovalWorkflowTests(APITestCase):
         self.assertEqual(chain.steps.count(), 4)
         self.assertEqual(chain.current_step_order, 1)
 
+    def test_repeated_start_returns_existing_chain(self) -> None:
+        chain = self._create_chain()
+        side_effects = chain.side_effects.count()
+
+        response = self.client.post("/api/approvals/start/", self.start_payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], chain.id)
+        self.assertEqual(ApprovalChain.objects.filter(request_id=chain.request_id).count(), 1)
+        self.assertEqual(chain.steps.count(), 4)
+        # Повторная доставка не шлёт уведомления второй раз
+        self.assertEqual(chain.side_effects.count(), side_effects)
+
     def test_approve_then_reject(self) -> None:
         chain = self._create_chain()
         approve_response = self.client.post(
@@ -1,10 +1,12 @@
 import logging
 
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import ApprovalChain, StepStatus
+from .models import ApprovalChain, StaleTransitionError
 from .serializers import (
     ApprovalActionSerializer,
     ApprovalChainSerializer,
@@ -26,67 +28,80 @@ class ApprovalChainViewSet(viewsets.GenericViewSet):
 
     @action(detail=False, methods=["post"], url_path="start")
     def start_flow(self, request, *args, **kwargs):
+        """
+        Старт цепочки. outbox requests_service доставляет start «хотя бы раз»,
+        поэтому повтор для того же request_id возвращает уже созданную
+        цепочку (200) без новых побочных эффектов.
+        """
+        existing = self._existing_chain(request.data.get("request_id"))
+        if existing is not None:
+            return Response(ApprovalChainSerializer(existing).data, status=status.HTTP_200_OK)
+
         serializer = StartApprovalSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        chain = serializer.save()
-        
-        # Синхронизируем статус с requests_service
-        try:
-            chain._sync_request_status("in_progress", 1)
-        except Exception as exc:
-            logger.error(f"Failed to sync request {chain.request_id} status: {exc}")
-        
-        # Уведомляем первого согласующего
+        # Синхронизация статуса и уведомление первого согласующего ставятся
+        # в очередь в той же транзакции и выполняются воркером после commit
         try:
-            first_step = chain.steps.filter(order=chain.current_step_order).first()
-            if first_step:
-                chain._notify_next_approver(first_step)
-        except Exception as exc:
-            logger.error(f"Failed to notify first approver for request {chain.request_id}: {exc}")
-        
+            with transaction.atomic():
+                chain = serializer.save()
+                chain._sync_request_status("in_progress", 1)
+                first_step = chain.steps.filter(order=chain.current_step_order).first()
+                if first_step:
+                    chain._notify_next_approver(first_step)
+        except IntegrityError:
+            # Параллельный повтор успел создать цепочку первым
+            existing = self._existing_chain(serializer.validated_data["request_id"])
+            if existing is None:
+                raise
+            return Response(ApprovalChainSerializer(existing).data, status=status.HTTP_200_OK)
+
         return Response(
             ApprovalChainSerializer(chain).data,
             status=status.HTTP_201_CREATED,
         )
 
+    def _existing_chain(self, request_id) -> ApprovalChain | None:
+        try:
+            return self.get_queryset().filter(request_id=int(request_id)).first()
+        except (TypeError, ValueError):
+            return None
+
     @action(detail=True, methods=["post"], url_path="approve")
     def approve(self, request, *args, **kwargs):
-        chain = self.get_object()
-        action_serializer = ApprovalActionSerializer(data=request.data)
-        action_serializer.is_valid(raise_exception=True)
-        current_step = chain.steps.filter(order=chain.current_step_order).first()
-        if not current_step:
-            return Response(
-                {"detail": "Текущий шаг не найден."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        if current_step.status != StepStatus.WAITING:
-            return Response(
-                {"detail": "Этот шаг уже обработан."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        chain.mark_approved(current_step)
-        return Response(ApprovalChainSerializer(chain).data)
+        return self._transition(request, approve=True)
 
     @action(detail=True, methods=["post"], url_path="reject")
     def reject(self, request, *args, **kwargs):
-        chain = self.get_object()
+        return self._transition(request, approve=False)
+
+    def _transition(self, request, *, approve: bool):
+        """
+        Переход цепочки одним условным UPDATE (см. ApprovalChain.approve_step).
+        Без step_order берётся текущий шаг цепочки; устаревший step_order
+        или version -> 409 с актуальным состоянием цепочки.
+        """
+        chain = get_object_or_404(ApprovalChain, request_id=self.kwargs[self.lookup_field])
         action_serializer = ApprovalActionSerializer(data=request.data)
         action_serializer.is_valid(raise_exception=True)
-        current_step = chain.steps.filter(order=chain.current_step_order).first()
-        if not current_step:
-            return Response(
-                {"detail": "Текущий шаг не найден."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        if current_step.status != StepStatus.WAITING:
+        data = action_serializer.validated_data
+        step_order = data.get("step_order", chain.current_step_order)
+        try:
+            if approve:
+                chain.approve_step(step_order, expected_version=data.get("version"))
+            else:
+                chain.reject_step(
+                    step_order,
+                    comment=data.get("comment"),
+                    expected_version=data.get("version"),
+                )
+        except StaleTransitionError as exc:
             return Response(
-                {"detail": "Этот шаг уже обработан."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {
+                    "detail": "Этот шаг уже обработан.",
+                    "status": exc.chain.status,
+                    "current_step_order": exc.chain.current_step_order,
+                    "version": exc.chain.version,
+                },
+                status=status.HTTP_409_CONFLICT,
             )
-        chain.mark_rejected(
-            current_step,
-            comment=action_serializer.validated_data.get("comment"),
-        )
-        return Response(ApprovalChainSerializer(chain).data)
-
+        return Response(ApprovalChainSerializer(self.get_object()).data)
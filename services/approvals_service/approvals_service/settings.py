@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -12,6 +13,15 @@ except ImportError:  # pragma: no cover
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Общие модули из config/ (circuit_breaker, http_pool): в репозитории — корень
+# проекта, в образе — /app/config
+CONFIG_DIR = next(
+    (path / "config" for path in (BASE_DIR, *BASE_DIR.parents) if (path / "config").is_dir()),
+    None,
+)
+if CONFIG_DIR is not None and str(CONFIG_DIR) not in sys.path:
+    sys.path.insert(0, str(CONFIG_DIR))
+
 load_dotenv(BASE_DIR / ".env")
 
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "unsafe-approvals-secret")
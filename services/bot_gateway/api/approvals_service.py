@@ -6,7 +6,8 @@ from typing import Any, Dict
 
 import httpx
 
-from .http_utils import get_api_headers
+from .circuit_breaker import get_breaker
+from .http_utils import get_api_headers, open_client
 from .retry_client import retry_request
 
 
@@ -16,9 +17,19 @@ class ApprovalsServiceClient:
     Денис → Жасулан → Мейржан → (Лязат/Айгуль)
     """
 
-    def __init__(self, base_url: str, *, timeout: float = 15.0):
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 15.0,
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        # Общий пул соединений из bot.py; без него — клиент на каждый вызов
+        self.http_client = http_client
+        # Если сервис лежит — не ждём таймаутов, а сразу отказываем
+        self.breaker = get_breaker("approvals")
 
     async def start_approval_chain(self, request_id: int, summary: str) -> Dict[str, Any]:
         """Запустить цепочку согласования."""
@@ -26,7 +37,7 @@ class ApprovalsServiceClient:
         headers = get_api_headers()
         
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.post(
                     url,
                     json={"request_id": request_id, "summary": summary},
@@ -35,15 +46,19 @@ class ApprovalsServiceClient:
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        return await retry_request(_make_request, idempotent=False, breaker=self.breaker)
 
     async def approve_request(
         self,
         request_id: int,
         actor_username: str | None = None,
-        comment: str | None = None
+        comment: str | None = None,
+        step_order: int | None = None,
     ) -> Dict[str, Any]:
-        """Одобрить заявку на текущем шаге."""
+        """
+        Одобрить заявку на шаге step_order (по умолчанию — на текущем).
+        Если шаг уже обработан, сервис отвечает 409 (HTTPStatusError).
+        """
         url = f"{self.base_url}/approvals/{request_id}/approve"
         headers = get_api_headers()
         
@@ -52,22 +67,30 @@ class ApprovalsServiceClient:
             payload["actor_username"] = actor_username
         if comment:
             payload["comment"] = comment
+        if step_order is not None:
+            payload["step_order"] = step_order
         
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.post(url, json=payload, headers=headers)
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        # С step_order повтор безопасен: второй переход того же шага получит 409
+        return await retry_request(
+            _make_request,
+            idempotent=step_order is not None,
+            breaker=self.breaker,
+        )
 
     async def reject_request(
         self,
         request_id: int,
         comment: str | None = None,
-        actor_username: str | None = None
+        actor_username: str | None = None,
+        step_order: int | None = None,
     ) -> Dict[str, Any]:
-        """Отклонить заявку на текущем шаге."""
+        """Отклонить заявку на шаге step_order (по умолчанию — на текущем); см. approve_request."""
         url = f"{self.base_url}/approvals/{request_id}/reject"
         headers = get_api_headers()
         
@@ -76,14 +99,21 @@ class ApprovalsServiceClient:
             payload["actor_username"] = actor_username
         if comment:
             payload["comment"] = comment
+        if step_order is not None:
+            payload["step_order"] = step_order
         
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.post(url, json=payload, headers=headers)
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        # С step_order повтор безопасен: второй переход того же шага получит 409
+        return await retry_request(
+            _make_request,
+            idempotent=step_order is not None,
+            breaker=self.breaker,
+        )
 
     async def get_approval_chain(self, request_id: int) -> Dict[str, Any]:
         """Получить информацию о цепочке согласования."""
@@ -91,10 +121,10 @@ class ApprovalsServiceClient:
         headers = get_api_headers()
         
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.get(url, headers=headers)
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        return await retry_request(_make_request, idempotent=True, breaker=self.breaker)
 
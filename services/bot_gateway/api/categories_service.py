@@ -2,14 +2,22 @@
 
 from __future__ import annotations
 
-from typing import Iterable, List
+import asyncio
+import logging
+import os
+import itertools
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
 
 import httpx
 from pydantic import BaseModel, Field
 
-from .http_utils import get_api_headers
+from .circuit_breaker import get_breaker
+from .http_utils import get_api_headers, open_client
 from .retry_client import retry_request
 
+logger = logging.getLogger(__name__)
 
 class Subcategory(BaseModel):
     id: str
@@ -32,6 +40,49 @@ class Warehouse(BaseModel):
     categories: List[Category] = Field(default_factory=list)
 
 
+class CategoryTree:
+    """
+    Immutable snapshot of the tree for one version.
+    FSM state keeps only `version` and selected ids; names are resolved here
+    through dict indexes built once per version.
+    """
+
+    __slots__ = ("version", "warehouses", "_warehouses", "_categories", "_subcategories")
+
+    def __init__(self, version: str, warehouses: List[Warehouse]):
+        self.version = version
+        self.warehouses = warehouses
+        self._warehouses: Dict[str, Warehouse] = {}
+        self._categories: Dict[Tuple[str, str], Category] = {}
+        self._subcategories: Dict[Tuple[str, str, str], Subcategory] = {}
+        for warehouse in warehouses:
+            self._warehouses.setdefault(warehouse.id, warehouse)
+            for category in warehouse.categories:
+                self._categories.setdefault((warehouse.id, category.id), category)
+                for subcategory in category.subcategories:
+                    self._subcategories.setdefault(
+                        (warehouse.id, category.id, subcategory.id), subcategory
+                    )
+
+    def warehouse(self, warehouse_id: str | None) -> Warehouse | None:
+        return self._warehouses.get(warehouse_id)
+
+    def category(self, warehouse_id: str | None, category_id: str | None) -> Category | None:
+        return self._categories.get((warehouse_id, category_id))
+
+    def subcategory(
+        self,
+        warehouse_id: str | None,
+        category_id: str | None,
+        subcategory_id: str | None,
+    ) -> Subcategory | None:
+        return self._subcategories.get((warehouse_id, category_id, subcategory_id))
+
+
+# Сколько последних версий дерева держим для форм, начатых до обновления
+TREE_HISTORY_SIZE = 5
+
+
 class CategoriesServiceClient:
     """
     Загружает структуру расходов из categories_service (Google Sheets источник).
@@ -54,31 +105,119 @@ class CategoriesServiceClient:
     ]
     """
 
-    def __init__(self, base_url: str, *, timeout: float = 15.0):
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 15.0,
+        cache_ttl: float | None = None,
+        stale_ttl: float | None = None,
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        # Общий пул соединений из bot.py; без него — клиент на каждый вызов
+        self.http_client = http_client
+        # Если сервис лежит — не ждём таймаутов, а сразу отказываем
+        self.breaker = get_breaker("categories")
+        # Сколько дерево считается свежим и сколько ещё можно отдавать устаревшее,
+        # пока в фоне идёт перепроверка (If-None-Match)
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(
+            os.getenv("CATEGORIES_CACHE_TTL", "60")
+        )
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(
+            os.getenv("CATEGORIES_CACHE_STALE_TTL", "600")
+        )
+        self._tree: CategoryTree | None = None
+        self._trees: OrderedDict[str, CategoryTree] = OrderedDict()
+        self._local_versions = itertools.count(1)
+        self._etag: str | None = None
+        self._fetched_at = 0.0
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def tree_version(self) -> str | None:
+        return self._tree.version if self._tree else None
 
     async def fetch_structure(self) -> List[Warehouse]:
         """
-        Возвращает свежую структуру для FSM.
+        Возвращает свежую структуру для FSM (с перепроверкой кеша).
         """
+        await self._refresh()
+        return self._tree.warehouses if self._tree else []
+
+    async def list_warehouses(self) -> List[Warehouse]:
+        return (await self.current_tree()).warehouses
+
+    async def current_tree(self) -> CategoryTree:
+        """
+        Дерево из кеша: свежее — сразу, устаревшее — сразу, но с фоновым
+        обновлением; без кеша (или слишком старое) — ждём загрузку.
+        Одновременные вызовы делят один запрос к categories_service.
+        """
+        age = time.monotonic() - self._fetched_at
+        if self._tree is not None and age < self.cache_ttl:
+            return self._tree
+        if self._tree is not None and age < self.cache_ttl + self.stale_ttl:
+            self._start_refresh()
+            return self._tree
+        await self._refresh()
+        return self._tree or CategoryTree("empty", [])
+
+    def get_tree(self, version: str | None) -> CategoryTree | None:
+        """Снимок дерева по версии из FSM (None, если версия уже вытеснена)."""
+        if version is None:
+            return None
+        return self._trees.get(version)
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._revalidate())
+            self._refresh_task.add_done_callback(self._log_refresh_error)
+        return self._refresh_task
+
+    async def _refresh(self) -> None:
+        # shield: отмена одного ожидающего не должна отменять общий запрос
+        await asyncio.shield(self._start_refresh())
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Category tree refresh failed: {task.exception()}")
+
+    async def _revalidate(self) -> None:
         url = f"{self.base_url}/categories/tree"
         headers = get_api_headers()
+        if self._etag and self._tree is not None:
+            headers["If-None-Match"] = self._etag
 
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                return response.json()
-
-        payload = await retry_request(_make_request)
-        return [Warehouse.model_validate(raw) for raw in payload]
-
-    async def list_warehouses(self) -> List[Warehouse]:
-        return await self.fetch_structure()
+                if response.status_code != httpx.codes.NOT_MODIFIED:
+                    response.raise_for_status()
+                return response
+
+        response = await retry_request(_make_request, idempotent=True, breaker=self.breaker)
+        if response.status_code != httpx.codes.NOT_MODIFIED:
+            warehouses = [Warehouse.model_validate(raw) for raw in response.json()]
+            version = response.headers.get("X-Tree-Version") or f"local-{next(self._local_versions)}"
+            self._store_tree(CategoryTree(version, warehouses))
+            self._etag = response.headers.get("ETag")
+        self._fetched_at = time.monotonic()
+
+    def _store_tree(self, tree: CategoryTree) -> None:
+        self._tree = tree
+        self._trees[tree.version] = tree
+        self._trees.move_to_end(tree.version)
+        while len(self._trees) > TREE_HISTORY_SIZE:
+            self._trees.popitem(last=False)
 
     @staticmethod
-    def find_categories(tree: Iterable[Warehouse], warehouse_id: str) -> List[Category]:
+    def find_categories(tree: CategoryTree | Iterable[Warehouse], warehouse_id: str) -> List[Category]:
+        if isinstance(tree, CategoryTree):
+            warehouse = tree.warehouse(warehouse_id)
+            return warehouse.categories if warehouse else []
         for warehouse in tree:
             if warehouse.id == warehouse_id:
                 return warehouse.categories
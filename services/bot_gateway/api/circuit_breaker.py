@@ -0,0 +1,38 @@
+"""
+Circuit breaker for the service clients.
+
+The implementation is shared with the Django services and lives in
+config/circuit_breaker.py (project root in the repo, /app/config in the image).
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+_CONFIG_DIR = next(
+    (path / "config" for path in Path(__file__).resolve().parents if (path / "config").is_dir()),
+    None,
+)
+if _CONFIG_DIR is not None and str(_CONFIG_DIR) not in sys.path:
+    sys.path.insert(0, str(_CONFIG_DIR))
+
+from circuit_breaker import (  # noqa: E402
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    get_breaker,
+    is_upstream_failure,
+)
+
+__all__ = [
+    "CLOSED",
+    "HALF_OPEN",
+    "OPEN",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "get_breaker",
+    "is_upstream_failure",
+]
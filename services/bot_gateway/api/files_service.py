@@ -7,7 +7,8 @@ from typing import Any, Dict, Optional
 import httpx
 from pydantic import BaseModel
 
-from .http_utils import get_api_headers
+from .circuit_breaker import get_breaker
+from .http_utils import get_api_headers, open_client
 from .retry_client import retry_request
 
 
@@ -25,9 +26,19 @@ class FilesServiceClient:
     микросервис возвращает конечный URL и путь для сохранения в заявке.
     """
 
-    def __init__(self, base_url: str, *, timeout: float = 30.0):
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 30.0,
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        # Общий пул соединений из bot.py; без него — клиент на каждый вызов
+        self.http_client = http_client
+        # Если сервис лежит — не ждём таймаутов, а сразу отказываем
+        self.breaker = get_breaker("files")
 
     async def upload_telegram_file(
         self,
@@ -51,11 +62,18 @@ class FilesServiceClient:
         headers = get_api_headers()
 
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.post(url, json=payload, headers=headers)
                 response.raise_for_status()
                 return FileUploadResponse.model_validate(response.json())
 
-        return await retry_request(_make_request, max_retries=2)  # Files can be large, fewer retries
+        # Повторная загрузка создаст ещё один файл — повторяем только до отправки
+        return await retry_request(
+            _make_request,
+            max_retries=2,  # Files can be large, fewer retries
+            idempotent=False,
+            breaker=self.breaker,
+            deadline=self.timeout * 3,
+        )
 
 
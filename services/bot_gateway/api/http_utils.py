@@ -2,8 +2,15 @@
 
 from __future__ import annotations
 
+import importlib.util
+import logging
 import os
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
 
 
 def get_api_headers() -> Dict[str, str]:
@@ -15,7 +22,34 @@ def get_api_headers() -> Dict[str, str]:
     return headers
 
 
-
-
-
-
+def build_http_client(*, timeout: float) -> httpx.AsyncClient:
+    """
+    Long-lived pooled client for one upstream service.
+    Created in bot.py main() and closed on shutdown.
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("BOT_HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("BOT_HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("BOT_HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+    http2 = os.getenv("BOT_HTTP2", "false").lower() == "true"
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("BOT_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=http2)
+
+
+@asynccontextmanager
+async def open_client(
+    shared: httpx.AsyncClient | None,
+    timeout: float,
+) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Yield the shared pooled client, or a one-off client if none was given
+    (tests, scripts) or it is already closed.
+    """
+    if shared is not None and not shared.is_closed:
+        yield shared
+        return
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        yield client
@@ -7,7 +7,8 @@ from typing import Any, Dict
 import httpx
 from pydantic import BaseModel
 
-from .http_utils import get_api_headers
+from .circuit_breaker import get_breaker
+from .http_utils import get_api_headers, open_client
 from .retry_client import retry_request
 
 
@@ -27,9 +28,19 @@ class ReportingServiceClient:
     Client for sending request reports to reporting_service.
     """
 
-    def __init__(self, base_url: str, *, timeout: float = 15.0):
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 15.0,
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        # Общий пул соединений из bot.py; без него — клиент на каждый вызов
+        self.http_client = http_client
+        # Если сервис лежит — не ждём таймаутов, а сразу отказываем
+        self.breaker = get_breaker("reporting")
 
     async def report_request(self, report: RequestReport) -> Dict[str, Any]:
         """
@@ -39,10 +50,11 @@ class ReportingServiceClient:
         headers = get_api_headers()
 
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.post(url, json=report.model_dump(), headers=headers)
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        # Отчёт — upsert строки по request_id, повтор безопасен
+        return await retry_request(_make_request, idempotent=True, breaker=self.breaker)
 
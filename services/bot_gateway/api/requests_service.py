@@ -2,15 +2,23 @@
 
 from __future__ import annotations
 
+import uuid
 from typing import Any, Dict
 
 import httpx
 from pydantic import BaseModel
 
-from .http_utils import get_api_headers
+from .circuit_breaker import get_breaker
+from .http_utils import get_api_headers, open_client
 from .retry_client import retry_request
 
 
+class AttachmentPayload(BaseModel):
+    file_url: str
+    storage_path: str
+    file_name: str
+
+
 class RequestPayload(BaseModel):
     tg_user_id: int
     author_username: str | None = None
@@ -25,12 +33,19 @@ class RequestPayload(BaseModel):
     quantity: str | None = None
     amount: float
     comment: str | None = None
+    # Файлы сохраняются вместе с заявкой — без отдельного вызова attach
+    attachments: list[AttachmentPayload] = []
 
 
-class AttachmentPayload(BaseModel):
-    file_url: str
-    storage_path: str
-    file_name: str
+def new_idempotency_key() -> str:
+    return uuid.uuid4().hex
+
+
+def idempotency_headers(idempotency_key: str | None) -> Dict[str, str]:
+    headers = get_api_headers()
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    return headers
 
 
 class RequestsServiceClient:
@@ -38,57 +53,102 @@ class RequestsServiceClient:
     Minimal wrapper around requests_service REST API.
 
     The URLs follow the schema:
-        POST {base_url}/requests/        -> create request
+        POST {base_url}/requests/        -> create request (with attachments)
         GET  {base_url}/requests/{id}/  -> retrieve request
         PATCH {base_url}/requests/{id}/ -> update request
         POST {base_url}/requests/{id}/attach/ -> add file
+
+    POST calls accept an Idempotency-Key, which makes their retries safe.
     """
 
-    def __init__(self, base_url: str, *, timeout: float = 15.0):
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 15.0,
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        # Общий пул соединений из bot.py; без него — клиент на каждый вызов
+        self.http_client = http_client
+        # Если сервис лежит — не ждём таймаутов, а сразу отказываем
+        self.breaker = get_breaker("requests")
 
-    async def create_request(self, payload: RequestPayload) -> Dict[str, Any]:
+    async def create_request(
+        self,
+        payload: RequestPayload,
+        *,
+        idempotency_key: str | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Создать заявку. С `idempotency_key` сервис отдаёт на повтор уже
+        созданную заявку, поэтому запрос можно безопасно повторять.
+        """
         url = f"{self.base_url}/requests/"
-        headers = get_api_headers()
+        headers = idempotency_headers(idempotency_key)
 
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.post(url, json=payload.model_dump(), headers=headers)
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        return await retry_request(
+            _make_request,
+            idempotent=idempotency_key is not None,
+            breaker=self.breaker,
+        )
 
     async def attach_file(
         self,
         request_id: int,
         payload: AttachmentPayload,
+        *,
+        idempotency_key: str | None = None,
     ) -> Dict[str, Any]:
         url = f"{self.base_url}/requests/{request_id}/attach/"
-        headers = get_api_headers()
+        headers = idempotency_headers(idempotency_key)
 
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.post(url, json=payload.model_dump(), headers=headers)
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        return await retry_request(
+            _make_request,
+            idempotent=idempotency_key is not None,
+            breaker=self.breaker,
+        )
 
-    async def get_user_requests(self, tg_user_id: int) -> list[Dict[str, Any]]:
-        """Получить список заявок пользователя."""
+    async def get_user_requests(
+        self,
+        tg_user_id: int,
+        *,
+        cursor: str | None = None,
+        page_size: int = 5,
+        status: str | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Одна страница заявок пользователя (новые сверху):
+        {"results": [...], "next_cursor": str | None, "has_next": bool}.
+        """
         url = f"{self.base_url}/requests/"
         headers = get_api_headers()
-        
+        params: Dict[str, Any] = {"tg_user_id": tg_user_id, "page_size": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        if status:
+            params["status"] = status
+
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                params = {"tg_user_id": tg_user_id}
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.get(url, params=params, headers=headers)
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        return await retry_request(_make_request, idempotent=True, breaker=self.breaker)
 
     async def get_request(self, request_id: int) -> Dict[str, Any]:
         """Получить детальную информацию о заявке."""
@@ -96,10 +156,10 @@ class RequestsServiceClient:
         headers = get_api_headers()
 
         async def _make_request():
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with open_client(self.http_client, self.timeout) as client:
                 response = await client.get(url, headers=headers)
                 response.raise_for_status()
                 return response.json()
 
-        return await retry_request(_make_request)
+        return await retry_request(_make_request, idempotent=True, breaker=self.breaker)
 
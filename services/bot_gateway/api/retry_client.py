@@ -3,25 +3,179 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
+import inspect
 import logging
-from typing import Any, Callable, TypeVar
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterator, TypeVar
 
 import httpx
 
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
 
+# Запрос гарантированно не дошёл до сервиса — повтор безопасен даже для POST
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Абсолютный дедлайн (time.monotonic) текущей операции; вложенные вызовы его наследуют
+_deadline_at: contextvars.ContextVar[float | None] = contextvars.ContextVar("retry_deadline_at", default=None)
+
+
+def is_retryable(exc: BaseException, *, idempotent: bool) -> bool:
+    """
+    Retry classification: connect errors and 429 are always retried, other
+    transport errors, 5xx and non-httpx errors the caller opted into only for
+    idempotent calls; other 4xx and open circuits never.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, _NOT_SENT_ERRORS):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status_code = exc.response.status_code
+        if status_code == httpx.codes.TOO_MANY_REQUESTS:
+            return True
+        return idempotent and status_code >= 500
+    if isinstance(exc, httpx.HTTPError):
+        return idempotent and isinstance(exc, httpx.TransportError)
+    # Прочие исключения ловятся, только если вызывающий сам перечислил их в `exceptions`
+    return idempotent
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """Delay requested by the upstream via `Retry-After` (seconds or HTTP date)."""
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    value = exc.response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def remaining_time() -> float | None:
+    """Seconds left until the current deadline, None if there is none."""
+    deadline_at = _deadline_at.get()
+    if deadline_at is None:
+        return None
+    return deadline_at - time.monotonic()
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[None]:
+    """
+    Limit the total time of all requests (with their retries) made inside
+    the block. An enclosing, earlier deadline is never extended.
+    """
+    deadline_at = time.monotonic() + seconds
+    outer = _deadline_at.get()
+    if outer is not None:
+        deadline_at = min(deadline_at, outer)
+    token = _deadline_at.set(deadline_at)
+    try:
+        yield
+    finally:
+        _deadline_at.reset(token)
+
+
+class RetryBudget:
+    """
+    Caps retries to a share of the calls made to one upstream within the last
+    `window` seconds (plus `min_retries` so rarely used upstreams can still
+    retry), so that a blip does not turn into a retry storm.
+    """
+
+    def __init__(
+        self,
+        *,
+        ratio: float | None = None,
+        min_retries: int | None = None,
+        window: float | None = None,
+    ):
+        self.ratio = ratio if ratio is not None else float(os.getenv("BOT_RETRY_BUDGET_RATIO", "0.2"))
+        self.min_retries = min_retries if min_retries is not None else int(
+            os.getenv("BOT_RETRY_BUDGET_MIN_RETRIES", "3")
+        )
+        self.window = window or float(os.getenv("BOT_RETRY_BUDGET_WINDOW", "10"))
+        self._lock = threading.Lock()
+        self._calls: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def _trim(self, now: float) -> None:
+        for events in (self._calls, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_call(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._calls.append(now)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False when it is exhausted."""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= max(self.min_retries, self.ratio * len(self._calls)):
+                return False
+            self._retries.append(now)
+            return True
+
+
+_budgets: Dict[str, RetryBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_retry_budget(name: str) -> RetryBudget:
+    """Process-wide retry budget for the upstream `name`."""
+    with _budgets_lock:
+        budget = _budgets.get(name)
+        if budget is None:
+            budget = _budgets[name] = RetryBudget()
+        return budget
+
+
+def backoff_delay(attempt: int, initial_delay: float, backoff_factor: float, max_delay: float) -> float:
+    """Full jitter: uniform in [0, min(max_delay, initial_delay * backoff_factor ** attempt)]."""
+    return random.uniform(0, min(max_delay, initial_delay * backoff_factor ** attempt))
+
+
 async def retry_request(
     func: Callable[[], Any],
     max_retries: int = 3,
     initial_delay: float = 1.0,
     backoff_factor: float = 2.0,
     exceptions: tuple[type[Exception], ...] = (httpx.RequestError, httpx.HTTPStatusError),
+    *,
+    idempotent: bool = False,
+    breaker: CircuitBreaker | None = None,
+    budget: RetryBudget | None = None,
+    deadline: float | None = None,
+    max_delay: float | None = None,
 ) -> T:
     """
-    Retry an async function with exponential backoff.
+    Retry an async function with jittered exponential backoff.
 
     Args:
         func: Async function to retry
@@ -29,42 +183,74 @@ async def retry_request(
         initial_delay: Initial delay in seconds
         backoff_factor: Multiplier for delay after each retry
         exceptions: Tuple of exceptions to catch and retry on
+        idempotent: Whether the call may be repeated after it reached the upstream;
+            off by default, GET and upsert calls opt in explicitly
+        breaker: Circuit breaker of the upstream; every attempt goes through it
+        budget: Retry budget; defaults to the budget of the breaker's upstream
+        deadline: Total time in seconds for all attempts and pauses
+            (BOT_RETRY_DEADLINE by default); never extends an enclosing deadline_scope
+        max_delay: Cap for a single backoff pause
 
     Returns:
         Result of the function call
 
     Raises:
-        Last exception if all retries fail
+        CircuitOpenError if the upstream's circuit is open,
+        TimeoutError if the deadline expires during an attempt,
+        last exception if all retries fail, the error is not retryable,
+        the retry budget is exhausted or the deadline leaves no room to retry
     """
-    delay = initial_delay
-    last_exception = None
-
-    for attempt in range(max_retries + 1):
-        try:
-            if asyncio.iscoroutinefunction(func):
-                return await func()
-            else:
-                return func()
-        except exceptions as exc:
-            last_exception = exc
-            if attempt < max_retries:
-                logger.warning(
-                    f"Request failed (attempt {attempt + 1}/{max_retries + 1}): {exc}. "
-                    f"Retrying in {delay}s..."
-                )
-                await asyncio.sleep(delay)
-                delay *= backoff_factor
-            else:
-                logger.error(f"Request failed after {max_retries + 1} attempts: {exc}")
-                raise
-
-    # Should never reach here, but just in case
-    if last_exception:
-        raise last_exception
-    raise RuntimeError("Unexpected error in retry logic")
+    if budget is None and breaker is not None:
+        budget = get_retry_budget(breaker.name)
+    if deadline is None:
+        deadline = float(os.getenv("BOT_RETRY_DEADLINE", "30"))
+    if max_delay is None:
+        max_delay = float(os.getenv("BOT_RETRY_MAX_DELAY", "10"))
+    if budget is not None:
+        budget.record_call()
+
+    async def _attempt() -> Any:
+        result = func()
+        if inspect.isawaitable(result):
+            return await result
+        return result
 
+    with deadline_scope(deadline):
+        for attempt in range(max_retries + 1):
+            try:
+                remaining = remaining_time()
+                if remaining <= 0:
+                    raise TimeoutError("Request deadline exceeded")
 
+                # Попытка не может пережить дедлайн вызывающего
+                async def _bounded_attempt() -> Any:
+                    return await asyncio.wait_for(_attempt(), remaining)
 
+                if breaker is not None:
+                    return await breaker.call(_bounded_attempt)
+                return await _bounded_attempt()
+            except exceptions as exc:
+                if not is_retryable(exc, idempotent=idempotent):
+                    raise
+                if attempt >= max_retries:
+                    logger.error(f"Request failed after {max_retries + 1} attempts: {exc}")
+                    raise
 
+                delay = backoff_delay(attempt, initial_delay, backoff_factor, max_delay)
+                retry_after = retry_after_seconds(exc)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if delay >= remaining_time():
+                    logger.error(f"Request failed, no time left before the deadline to retry: {exc}")
+                    raise
+                if budget is not None and not budget.try_spend():
+                    logger.error(f"Request failed, retry budget exhausted: {exc}")
+                    raise
 
+                logger.warning(
+                    f"Request failed (attempt {attempt + 1}/{max_retries + 1}): {exc}. "
+                    f"Retrying in {delay:.2f}s..."
+                )
+                await asyncio.sleep(delay)
 
+    raise RuntimeError("Unexpected error in retry logic")
@@ -13,6 +13,7 @@ from .api.files_service import FilesServiceClient
 from .api.requests_service import RequestsServiceClient
 from .api.reporting_service import ReportingServiceClient
 from .api.approvals_service import ApprovalsServiceClient
+from .api.http_utils import build_http_client
 from .fsm.handlers import (
     BotDependencies,
     router as request_form_router,
@@ -35,18 +36,29 @@ async def main() -> None:
     bot = Bot(token=bot_token, default=DefaultBotProperties(parse_mode="HTML"))
     dp = Dispatcher()
 
+    # Один пул keep-alive соединений на каждый сервис на всё время жизни бота
+    http_clients = {
+        "categories": build_http_client(timeout=15.0),
+        "requests": build_http_client(timeout=15.0),
+        "files": build_http_client(timeout=30.0),
+        "reporting": build_http_client(timeout=15.0),
+        "approvals": build_http_client(timeout=15.0),
+    }
     deps = BotDependencies(
-        categories_client=CategoriesServiceClient(categories_url),
-        requests_client=RequestsServiceClient(requests_url),
-        files_client=FilesServiceClient(files_url),
-        reporting_client=ReportingServiceClient(reporting_url),
-        approvals_client=ApprovalsServiceClient(approvals_url),
+        categories_client=CategoriesServiceClient(categories_url, http_client=http_clients["categories"]),
+        requests_client=RequestsServiceClient(requests_url, http_client=http_clients["requests"]),
+        files_client=FilesServiceClient(files_url, http_client=http_clients["files"]),
+        reporting_client=ReportingServiceClient(reporting_url, http_client=http_clients["reporting"]),
+        approvals_client=ApprovalsServiceClient(approvals_url, http_client=http_clients["approvals"]),
     )
     setup_request_form_handlers(request_form_router, deps)
     dp.include_router(request_form_router)
 
     logging.info("Bot is starting...")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await asyncio.gather(*(client.aclose() for client in http_clients.values()))
 
 
 if __name__ == "__main__":
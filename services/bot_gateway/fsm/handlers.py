@@ -2,8 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, List
+from typing import Any, Dict
 
+import httpx
 from aiogram import Bot, F, Router
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
@@ -11,8 +12,7 @@ from aiogram.types import CallbackQuery, Message
 
 from ..api.categories_service import (
     CategoriesServiceClient,
-    Warehouse,
-    Category,
+    CategoryTree,
     Subcategory,
 )
 from ..api.files_service import FilesServiceClient
@@ -20,12 +20,16 @@ from ..api.requests_service import (
     AttachmentPayload,
     RequestPayload,
     RequestsServiceClient,
+    new_idempotency_key,
 )
 from ..api.reporting_service import ReportingServiceClient
 from ..api.approvals_service import ApprovalsServiceClient
 from . import keyboards
 from .states import RequestFormStates
 
+# Сколько заявок показываем (и запрашиваем с сервиса) на одной странице
+REQUESTS_PAGE_SIZE = 5
+
 
 @dataclass(slots=True)
 class BotDependencies:
@@ -36,16 +40,38 @@ class BotDependencies:
     approvals_client: ApprovalsServiceClient
 
 
-def serialize_warehouses(tree: List[Warehouse]) -> List[Dict[str, Any]]:
-    return [warehouse.model_dump() for warehouse in tree]
+def resolve_selection(tree: CategoryTree, data: Dict[str, Any]) -> Dict[str, str] | None:
+    """
+    Names of the selected warehouse/category/subcategory by the ids kept in FSM.
+    None if the selection is not present in the tree anymore.
+    """
+    warehouse = tree.warehouse(data.get("warehouse_id"))
+    category = tree.category(data.get("warehouse_id"), data.get("category_id"))
+    if warehouse is None or category is None:
+        return None
+    subcategory_name = data.get("custom_subcategory_name")
+    if not subcategory_name:
+        subcategory = tree.subcategory(
+            data.get("warehouse_id"),
+            data.get("category_id"),
+            data.get("subcategory_id"),
+        )
+        if subcategory is None:
+            return None
+        subcategory_name = subcategory.name
+    return {
+        "warehouse_name": warehouse.name,
+        "category_name": category.name,
+        "subcategory_name": subcategory_name,
+    }
 
 
-def deserialize_warehouses(raw: List[Dict[str, Any]]) -> List[Warehouse]:
-    return [Warehouse.model_validate(item) for item in raw]
+def is_already_processed(exc: Exception) -> bool:
+    """409 от approvals_service: шаг уже одобрен/отклонён (повторное нажатие или другой согласующий)."""
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 409
 
 
-def serialize_category(category: Category | Subcategory) -> Dict[str, Any]:
-    return category.model_dump()
+ALREADY_PROCESSED_TEXT = "ℹ️ Заявка #{request_id} уже обработана на этом шаге."
 
 
 def build_summary(data: Dict[str, Any]) -> str:
@@ -87,17 +113,7 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
     async def cmd_my_requests(message: Message, state: FSMContext) -> None:
         await state.clear()
         try:
-            requests_list = await deps.requests_client.get_user_requests(message.from_user.id)
-            if not requests_list:
-                await message.answer(
-                    "📋 У вас пока нет заявок.\n"
-                    "Создайте первую заявку, нажав на кнопку '📝 Создать заявку'.",
-                    reply_markup=keyboards.main_menu_keyboard()
-                )
-                return
-            
-            await state.update_data(requests_list=requests_list, requests_page=0)
-            await show_requests_list(message, state, page=0)
+            await show_requests_list(message, state, message.from_user.id, page=0)
         except Exception as exc:
             await message.answer(
                 f"❌ Ошибка при получении списка заявок: {exc}\n"
@@ -126,26 +142,40 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
         )
         await message.answer(help_text, reply_markup=keyboards.main_menu_keyboard())
 
-    async def show_requests_list(message: Message, state: FSMContext, page: int = 0) -> None:
-        """Показать список заявок с пагинацией."""
+    async def show_requests_list(message: Message, state: FSMContext, user_id: int, page: int = 0) -> None:
+        """
+        Показать страницу списка заявок. Страницы грузятся с сервиса по одной;
+        в FSM храним только курсоры уже открытых страниц (для кнопки «Назад»).
+        """
         data = await state.get_data()
-        requests_list = data.get("requests_list", [])
-        
-        if not requests_list:
-            await message.answer("У вас нет заявок.")
+        cursors = data.get("requests_cursors") or [None]
+        if page < 0 or page >= len(cursors):
+            # Кнопка от старого сообщения — начинаем с первой страницы
+            page, cursors = 0, [None]
+
+        result = await deps.requests_client.get_user_requests(
+            user_id,
+            cursor=cursors[page],
+            page_size=REQUESTS_PAGE_SIZE,
+        )
+        page_requests = result.get("results", [])
+
+        if not page_requests:
+            if page == 0:
+                await message.answer(
+                    "📋 У вас пока нет заявок.\n"
+                    "Создайте первую заявку, нажав на кнопку '📝 Создать заявку'.",
+                    reply_markup=keyboards.main_menu_keyboard()
+                )
+            else:
+                await message.answer("У вас нет заявок.")
             return
-        
-        total = len(requests_list)
-        page_size = 5
-        start_idx = page * page_size
-        
-        if start_idx >= total:
-            page = 0
-            start_idx = 0
-        
-        page_requests = requests_list[start_idx:start_idx + page_size]
-        
-        text = f"📋 <b>Ваши заявки</b> (всего: {total})\n\n"
+
+        cursors = cursors[:page + 1]
+        if result.get("has_next"):
+            cursors.append(result.get("next_cursor"))
+
+        text = f"📋 <b>Ваши заявки</b> (страница {page + 1})\n\n"
         for req in page_requests:
             status_emoji = {
                 "new": "🆕",
@@ -162,10 +192,15 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
                 f"   Статус: {req.get('status_display')}\n\n"
             )
         
-        await state.update_data(requests_page=page)
+        await state.update_data(requests_page=page, requests_cursors=cursors)
         await message.answer(
             text,
-            reply_markup=keyboards.requests_list_keyboard(requests_list, page, page_size)
+            reply_markup=keyboards.requests_list_keyboard(
+                page_requests,
+                page,
+                REQUESTS_PAGE_SIZE,
+                has_next=bool(result.get("has_next")),
+            )
         )
 
     @router.callback_query(F.data == "main_menu")
@@ -183,7 +218,7 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
     @router.callback_query(F.data.startswith("requests_page:"))
     async def callback_requests_page(callback: CallbackQuery, state: FSMContext) -> None:
         page = int(callback.data.split(":")[1])
-        await show_requests_list(callback.message, state, page)
+        await show_requests_list(callback.message, state, callback.from_user.id, page)
         await callback.answer()
 
     @router.callback_query(F.data.startswith("request_detail:"))
@@ -229,7 +264,7 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
     async def callback_requests_list(callback: CallbackQuery, state: FSMContext) -> None:
         data = await state.get_data()
         page = data.get("requests_page", 0)
-        await show_requests_list(callback.message, state, page)
+        await show_requests_list(callback.message, state, callback.from_user.id, page)
         await callback.answer()
 
     @router.message(Command("cancel"))
@@ -241,38 +276,57 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
         )
 
     async def ask_warehouse(message: Message, state: FSMContext) -> None:
-        warehouses = await deps.categories_client.list_warehouses()
-        await state.update_data(
-            warehouses=serialize_warehouses(warehouses),
-        )
+        tree = await deps.categories_client.current_tree()
+        # В FSM храним только версию дерева и выбранные id — имена берём из дерева
+        await state.update_data(tree_version=tree.version)
         await state.set_state(RequestFormStates.warehouse)
         await message.answer(
             "Шаг 1 — выберите склад:",
-            reply_markup=keyboards.warehouses_keyboard(warehouses),
+            reply_markup=keyboards.tree_keyboards(tree).warehouses(),
         )
 
+    async def ask_confirmation(message: Message, state: FSMContext, names: Dict[str, str]) -> None:
+        # Единственный вход в подтверждение: ключ создаётся здесь один раз,
+        # повторы и двойное нажатие «Подтвердить» не создадут вторую заявку
+        await state.update_data(idempotency_key=new_idempotency_key())
+        await state.set_state(RequestFormStates.confirmation)
+        summary = build_summary({**(await state.get_data()), **names})
+        await message.answer(
+            "Шаг 7 — подтверждение.\n" + summary,
+            reply_markup=keyboards.confirmation_keyboard(),
+        )
+
+    async def tree_for(data: Dict[str, Any]) -> CategoryTree:
+        """Дерево той версии, с которой начата форма (или текущее, если она вытеснена)."""
+        tree = deps.categories_client.get_tree(data.get("tree_version"))
+        return tree or await deps.categories_client.current_tree()
+
+    async def selection_names(message: Message, state: FSMContext) -> Dict[str, str] | None:
+        data = await state.get_data()
+        names = resolve_selection(await tree_for(data), data)
+        if names is None:
+            await state.clear()
+            await message.answer("Справочник категорий обновился. Пожалуйста, выберите заново.")
+            await ask_warehouse(message, state)
+        return names
+
     @router.callback_query(
         RequestFormStates.warehouse,
         F.data.startswith("warehouse:"),
     )
     async def select_warehouse(callback: CallbackQuery, state: FSMContext) -> None:
         warehouse_id = callback.data.split(":", maxsplit=1)[1]
-        data = await state.get_data()
-        warehouses = deserialize_warehouses(data.get("warehouses", []))
-        warehouse = next((w for w in warehouses if w.id == warehouse_id), None)
+        tree = await tree_for(await state.get_data())
+        warehouse = tree.warehouse(warehouse_id)
         if not warehouse:
             await callback.answer("Не удалось определить склад. Попробуйте ещё раз.")
             return
-        await state.update_data(
-            warehouse_id=warehouse.id,
-            warehouse_name=warehouse.name,
-            categories=[serialize_category(cat) for cat in warehouse.categories],
-        )
+        await state.update_data(tree_version=tree.version, warehouse_id=warehouse.id)
         await state.set_state(RequestFormStates.category)
         await callback.message.edit_text(
             f"Склад: {warehouse.name}\n"
             "Шаг 2 — выберите категорию расходов:",
-            reply_markup=keyboards.categories_keyboard(warehouse.categories),
+            reply_markup=keyboards.tree_keyboards(tree).categories(warehouse),
         )
         await callback.answer()
 
@@ -283,23 +337,17 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
     async def select_category(callback: CallbackQuery, state: FSMContext) -> None:
         category_id = callback.data.split(":", maxsplit=1)[1]
         data = await state.get_data()
-        categories = [
-            Category.model_validate(cat) for cat in data.get("categories", [])
-        ]
-        category = next((c for c in categories if c.id == category_id), None)
+        tree = await tree_for(data)
+        category = tree.category(data.get("warehouse_id"), category_id)
         if not category:
             await callback.answer("Категория недоступна.")
             return
-        await state.update_data(
-            category_id=category.id,
-            category_name=category.name,
-            subcategories=[serialize_category(sub) for sub in category.subcategories],
-        )
+        await state.update_data(category_id=category.id)
         await state.set_state(RequestFormStates.subcategory)
         await callback.message.edit_text(
             f"Категория: {category.name}\n"
             "Шаг 3 — выберите подкатегорию.",
-            reply_markup=keyboards.subcategories_keyboard(category.subcategories),
+            reply_markup=keyboards.tree_keyboards(tree).subcategories(data["warehouse_id"], category),
         )
         await callback.answer()
 
@@ -310,10 +358,11 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
     async def select_subcategory(callback: CallbackQuery, state: FSMContext) -> None:
         subcategory_id = callback.data.split(":", maxsplit=1)[1]
         data = await state.get_data()
-        subcategories = [
-            Subcategory.model_validate(sub) for sub in data.get("subcategories", [])
-        ]
-        subcategory = next((s for s in subcategories if s.id == subcategory_id), None)
+        subcategory = (await tree_for(data)).subcategory(
+            data.get("warehouse_id"),
+            data.get("category_id"),
+            subcategory_id,
+        )
         if not subcategory:
             await callback.answer("Подкатегория недоступна.")
             return
@@ -338,7 +387,8 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
         await state.update_data(
             awaiting_custom_subcategory=False,
             subcategory_id=subcategory.id,
-            subcategory_name=subcategory.name,
+            # Имя из дерева не храним; ручной ввод в дереве не найти — его сохраняем
+            custom_subcategory_name=subcategory.name if subcategory.id.startswith("custom:") else None,
             comment_required=subcategory.requires_comment,
         )
         await state.set_state(RequestFormStates.amount)
@@ -423,25 +473,19 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
             await message.answer("Нужен документ или фотография.")
             return
 
-        data = await state.get_data()
+        names = await selection_names(message, state)
+        if names is None:
+            return
         upload_result = await deps.files_client.upload_telegram_file(
             telegram_file_id=file_id,
             file_name=file_name,
-            warehouse=data["warehouse_name"],
-            category=data["category_name"],
-            subcategory=data["subcategory_name"],
+            warehouse=names["warehouse_name"],
+            category=names["category_name"],
+            subcategory=names["subcategory_name"],
             author_id=message.from_user.id,
         )
-        await state.update_data(
-            file_info=upload_result.model_dump(),
-        )
-
-        await state.set_state(RequestFormStates.confirmation)
-        summary = build_summary(await state.get_data())
-        await message.answer(
-            "Шаг 7 — подтверждение.\n" + summary,
-            reply_markup=keyboards.confirmation_keyboard(),
-        )
+        await state.update_data(file_info=upload_result.model_dump())
+        await ask_confirmation(message, state, names)
 
     @router.message(RequestFormStates.file)
     async def file_required(message: Message) -> None:
@@ -463,25 +507,34 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
     )
     async def confirm(callback: CallbackQuery, state: FSMContext) -> None:
         data = await state.get_data()
+        idempotency_key = data.get("idempotency_key")
+        if not idempotency_key:
+            # Без ключа повторное нажатие создало бы дубликат — начинаем заново
+            await callback.answer("Форма устарела, начнём заново.")
+            await state.clear()
+            await ask_warehouse(callback.message, state)
+            return
         await callback.answer("Отправляем заявку...")
+        names = await selection_names(callback.message, state)
+        if names is None:
+            return
+        file_info = data.get("file_info")
         payload = RequestPayload(
             tg_user_id=callback.from_user.id,
             author_username=callback.from_user.username,
             author_full_name=callback.from_user.full_name,
-            warehouse=data["warehouse_name"],
-            category=data["category_name"],
-            subcategory=data["subcategory_name"],
+            warehouse=names["warehouse_name"],
+            category=names["category_name"],
+            subcategory=names["subcategory_name"],
             amount=data["amount"],
             comment=data.get("comment"),
+            attachments=[AttachmentPayload(**file_info)] if file_info else [],
+        )
+        # Заявка и файл создаются одним запросом (и одной транзакцией в сервисе)
+        request_body = await deps.requests_client.create_request(
+            payload,
+            idempotency_key=idempotency_key,
         )
-        request_body = await deps.requests_client.create_request(payload)
-        file_info = data.get("file_info")
-        if file_info:
-            attachment_payload = AttachmentPayload(**file_info)
-            await deps.requests_client.attach_file(
-                request_id=request_body["id"],
-                payload=attachment_payload,
-            )
         await callback.message.answer(
             "✅ Шаг 8 — отправка завершена.\n"
             f"Заявка №{request_body['id']} создана и передана на согласование.",
@@ -506,6 +559,7 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
             result = await deps.approvals_client.approve_request(
                 request_id=request_id,
                 actor_username=callback.from_user.username,
+                step_order=step_order,
             )
             
             chain_status = result.get("status", "")
@@ -520,6 +574,9 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
                     "Заявка передана следующему согласующему."
                 )
         except Exception as exc:
+            if is_already_processed(exc):
+                await callback.message.edit_text(ALREADY_PROCESSED_TEXT.format(request_id=request_id))
+                return
             await callback.answer(f"❌ Ошибка: {exc}", show_alert=True)
 
     @router.callback_query(F.data.startswith("reject:"))
@@ -562,6 +619,7 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
             await deps.approvals_client.reject_request(
                 request_id=request_id,
                 actor_username=callback.from_user.username,
+                step_order=step_order,
             )
             
             await callback.message.edit_text(
@@ -570,6 +628,10 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
             )
             await state.clear()
         except Exception as exc:
+            if is_already_processed(exc):
+                await state.clear()
+                await callback.message.edit_text(ALREADY_PROCESSED_TEXT.format(request_id=request_id))
+                return
             await callback.answer(f"❌ Ошибка: {exc}", show_alert=True)
 
     @router.message(RequestFormStates.rejection_comment)
@@ -593,7 +655,8 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
             await deps.approvals_client.reject_request(
                 request_id=request_id,
                 actor_username=message.from_user.username,
-                comment=comment
+                comment=comment,
+                step_order=step_order,
             )
             
             await message.answer(
@@ -603,6 +666,10 @@ def setup_request_form_handlers(router: Router, deps: BotDependencies) -> None:
             )
             await state.clear()
         except Exception as exc:
+            if is_already_processed(exc):
+                await state.clear()
+                await message.answer(ALREADY_PROCESSED_TEXT.format(request_id=request_id))
+                return
             await message.answer(f"❌ Ошибка при отклонении заявки: {exc}")
 
 
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-from typing import Iterable, Sequence
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Sequence
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
-from ..api.categories_service import Warehouse, Category, Subcategory
+from ..api.categories_service import (
+    TREE_HISTORY_SIZE,
+    Category,
+    CategoryTree,
+    Subcategory,
+    Warehouse,
+)
 
 
 def warehouses_keyboard(warehouses: Sequence[Warehouse]) -> InlineKeyboardMarkup:
@@ -42,6 +49,52 @@ def subcategories_keyboard(subcategories: Sequence[Subcategory]) -> InlineKeyboa
     return builder.as_markup()
 
 
+class TreeKeyboards:
+    """
+    Inline keyboards of one CategoryTree version, built on first use and then
+    reused for every user and click (the tree is immutable).
+    """
+
+    def __init__(self, tree: CategoryTree):
+        self.tree = tree
+        self._markups: Dict[Any, InlineKeyboardMarkup] = {}
+
+    def _cached(self, key: Any, build: Callable[[], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+        markup = self._markups.get(key)
+        if markup is None:
+            markup = self._markups[key] = build()
+        return markup
+
+    def warehouses(self) -> InlineKeyboardMarkup:
+        return self._cached("warehouses", lambda: warehouses_keyboard(self.tree.warehouses))
+
+    def categories(self, warehouse: Warehouse) -> InlineKeyboardMarkup:
+        return self._cached(
+            ("categories", warehouse.id),
+            lambda: categories_keyboard(warehouse.categories),
+        )
+
+    def subcategories(self, warehouse_id: str, category: Category) -> InlineKeyboardMarkup:
+        return self._cached(
+            ("subcategories", warehouse_id, category.id),
+            lambda: subcategories_keyboard(category.subcategories),
+        )
+
+
+_tree_keyboards: OrderedDict[str, TreeKeyboards] = OrderedDict()
+
+
+def tree_keyboards(tree: CategoryTree) -> TreeKeyboards:
+    """Keyboards for the tree version (kept for the same versions as the tree registry)."""
+    keyboards = _tree_keyboards.get(tree.version)
+    if keyboards is None or keyboards.tree is not tree:
+        keyboards = _tree_keyboards[tree.version] = TreeKeyboards(tree)
+    _tree_keyboards.move_to_end(tree.version)
+    while len(_tree_keyboards) > TREE_HISTORY_SIZE:
+        _tree_keyboards.popitem(last=False)
+    return keyboards
+
+
 def confirmation_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="✅ Подтвердить", callback_data="confirm:yes")
@@ -86,12 +139,24 @@ def rejection_comment_keyboard(request_id: int, step_order: int) -> InlineKeyboa
     return builder.as_markup()
 
 
-def requests_list_keyboard(requests: list, page: int = 0, page_size: int = 5) -> InlineKeyboardMarkup:
-    """Клавиатура для списка заявок с пагинацией."""
+def requests_list_keyboard(
+    requests: list,
+    page: int = 0,
+    page_size: int = 5,
+    has_next: bool | None = None,
+) -> InlineKeyboardMarkup:
+    """
+    Клавиатура для списка заявок с пагинацией.
+    Если передан has_next, `requests` — уже загруженная страница (курсорная
+    пагинация); иначе это полный список и страница вырезается локально.
+    """
     builder = InlineKeyboardBuilder()
-    start_idx = page * page_size
-    end_idx = start_idx + page_size
-    page_requests = requests[start_idx:end_idx]
+    if has_next is None:
+        start_idx = page * page_size
+        page_requests = requests[start_idx:start_idx + page_size]
+        has_next = start_idx + page_size < len(requests)
+    else:
+        page_requests = requests
     
     for req in page_requests:
         status_emoji = {
@@ -112,7 +177,7 @@ def requests_list_keyboard(requests: list, page: int = 0, page_size: int = 5) ->
         nav_buttons.append(
             InlineKeyboardButton(text="◀️ Назад", callback_data=f"requests_page:{page-1}")
         )
-    if end_idx < len(requests):
+    if has_next:
         nav_buttons.append(
             InlineKeyboardButton(text="Вперед ▶️", callback_data=f"requests_page:{page+1}")
         )
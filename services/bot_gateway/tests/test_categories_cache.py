@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+
+from ..api import categories_service
+from ..api.categories_service import CategoriesServiceClient
+
+TREE = [{"id": "almaty", "name": "Алматы", "categories": []}]
+
+
+def _install_transport(monkeypatch, handler) -> None:
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(
+        categories_service.httpx,
+        "AsyncClient",
+        lambda **kwargs: real_client(transport=transport, **kwargs),
+    )
+
+
+def test_concurrent_calls_share_one_fetch(monkeypatch) -> None:
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=TREE, headers={"ETag": '"tree-1"', "X-Tree-Version": "1"})
+
+    _install_transport(monkeypatch, handler)
+    client = CategoriesServiceClient("http://categories", cache_ttl=60)
+
+    async def scenario():
+        return await asyncio.gather(*(client.list_warehouses() for _ in range(50)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(result[0].id == "almaty" for result in results)
+    assert client.tree_version == "1"
+
+
+def test_stale_tree_is_served_while_revalidating(monkeypatch) -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"tree-1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=TREE, headers={"ETag": '"tree-1"'})
+
+    _install_transport(monkeypatch, handler)
+    client = CategoriesServiceClient("http://categories", cache_ttl=0, stale_ttl=60)
+
+    async def scenario():
+        first = await client.list_warehouses()
+        second = await client.list_warehouses()  # устарело: отдаём кеш, обновляем в фоне
+        await client._refresh_task  # noqa: SLF001
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert second is first
+    assert calls == [None, '"tree-1"']
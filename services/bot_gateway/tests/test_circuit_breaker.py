@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+
+from ..api.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from ..api.retry_client import retry_request
+
+
+def _status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://upstream/api")
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status_code}", request=request, response=response)
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_after_probe() -> None:
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4, window=60, open_seconds=0.05)
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        pass
+    else:
+        raise AssertionError("open circuit must reject calls")
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_retry_request_does_not_retry_client_errors_or_non_idempotent_calls() -> None:
+    calls = []
+
+    async def fails_with(status_code: int):
+        calls.append(status_code)
+        raise _status_error(status_code)
+
+    async def scenario():
+        for status_code, idempotent in ((404, True), (503, False)):
+            try:
+                await retry_request(lambda: fails_with(status_code), initial_delay=0, idempotent=idempotent)
+            except httpx.HTTPStatusError:
+                pass
+        assert calls == [404, 503]
+
+        # Без явного idempotent=True вызов считается неидемпотентным
+        calls.clear()
+        try:
+            await retry_request(lambda: fails_with(503), max_retries=2, initial_delay=0)
+        except httpx.HTTPStatusError:
+            pass
+        assert calls == [503]
+
+        calls.clear()
+        try:
+            await retry_request(lambda: fails_with(503), max_retries=2, initial_delay=0, idempotent=True)
+        except httpx.HTTPStatusError:
+            pass
+        assert calls == [503, 503, 503]
+
+    asyncio.run(scenario())
+
+
+def test_open_circuit_fails_fast_without_calling_upstream() -> None:
+    breaker = CircuitBreaker("down", failure_rate=1.0, min_calls=2, window=60, open_seconds=60)
+    calls = []
+
+    async def unreachable():
+        calls.append(1)
+        raise httpx.ConnectError("connection refused")
+
+    async def scenario():
+        try:
+            await retry_request(unreachable, max_retries=5, initial_delay=0, breaker=breaker)
+        except CircuitOpenError:
+            pass
+        else:
+            raise AssertionError("expected CircuitOpenError")
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert breaker.state == OPEN
@@ -1,13 +1,16 @@
+import httpx
+
 from ..api.categories_service import (
     Warehouse,
     Category,
     Subcategory,
     CategoriesServiceClient,
+    CategoryTree,
 )
 from ..fsm.handlers import (
     build_summary,
-    serialize_warehouses,
-    deserialize_warehouses,
+    is_already_processed,
+    resolve_selection,
 )
 
 
@@ -25,28 +28,6 @@ def test_build_summary_includes_all_fields() -> None:
     assert "invoice.pdf" in summary
 
 
-def test_serialize_deserialize_warehouses_roundtrip() -> None:
-    warehouses = [
-        Warehouse(
-            id="almaty",
-            name="Алматы",
-            categories=[
-                Category(
-                    id="auto",
-                    name="Авто",
-                    subcategories=[
-                        Subcategory(id="repair", name="Ремонт"),
-                    ],
-                )
-            ],
-        )
-    ]
-    serialized = serialize_warehouses(warehouses)
-    restored = deserialize_warehouses(serialized)
-    assert restored[0].name == "Алматы"
-    assert restored[0].categories[0].subcategories[0].name == "Ремонт"
-
-
 def test_find_categories_returns_expected_branch() -> None:
     warehouses = [
         Warehouse(
@@ -64,3 +45,71 @@ def test_find_categories_returns_expected_branch() -> None:
     assert len(result) == 1
     assert result[0].name == "Аренда"
 
+
+
+def test_resolve_selection_uses_ids_from_state() -> None:
+    tree = CategoryTree(
+        "3",
+        [
+            Warehouse(
+                id="almaty",
+                name="Алматы",
+                categories=[
+                    Category(
+                        id="auto",
+                        name="Авто",
+                        subcategories=[Subcategory(id="repair", name="Ремонт")],
+                    )
+                ],
+            )
+        ],
+    )
+    state = {"tree_version": "3", "warehouse_id": "almaty", "category_id": "auto", "subcategory_id": "repair"}
+
+    assert resolve_selection(tree, state) == {
+        "warehouse_name": "Алматы",
+        "category_name": "Авто",
+        "subcategory_name": "Ремонт",
+    }
+    custom = {**state, "subcategory_id": "custom:1", "custom_subcategory_name": "Своё"}
+    assert resolve_selection(tree, custom)["subcategory_name"] == "Своё"
+    assert resolve_selection(tree, {**state, "category_id": "gone"}) is None
+
+
+def test_tree_keyboards_are_reused_per_tree_version() -> None:
+    from ..fsm.keyboards import tree_keyboards
+
+    category = Category(id="auto", name="Авто", subcategories=[Subcategory(id="repair", name="Ремонт")])
+    warehouse = Warehouse(id="almaty", name="Алматы", categories=[category])
+    tree = CategoryTree("7", [warehouse])
+
+    markup = tree_keyboards(tree).subcategories("almaty", category)
+
+    assert tree_keyboards(tree).subcategories("almaty", category) is markup
+    assert markup.inline_keyboard[0][0].callback_data == "subcategory:repair"
+    assert tree_keyboards(CategoryTree("7", [warehouse])).subcategories("almaty", category) is not markup
+    assert CategoriesServiceClient.find_categories(tree, "almaty") == [category]
+
+
+def test_requests_list_keyboard_with_server_page() -> None:
+    from ..fsm.keyboards import requests_list_keyboard
+
+    page = [{"id": 9, "status": "new", "status_display": "Новая"}, {"id": 8, "status": "paid"}]
+
+    markup = requests_list_keyboard(page, page=1, page_size=2, has_next=True)
+    callbacks = [button.callback_data for row in markup.inline_keyboard for button in row]
+
+    assert callbacks[:2] == ["request_detail:9", "request_detail:8"]
+    assert "requests_page:0" in callbacks and "requests_page:2" in callbacks
+
+
+def test_is_already_processed_only_for_conflict() -> None:
+    request = httpx.Request("POST", "http://approvals/approvals/1/approve")
+
+    def error(status_code: int) -> httpx.HTTPStatusError:
+        response = httpx.Response(status_code, request=request)
+        return httpx.HTTPStatusError("error", request=request, response=response)
+
+    assert is_already_processed(error(409))
+    assert not is_already_processed(error(400))
+    assert not is_already_processed(httpx.ConnectError("down", request=request))
@@ -0,0 +1,19 @@
+import asyncio
+
+from ..api.http_utils import build_http_client, open_client
+
+
+def test_open_client_reuses_shared_client_until_closed() -> None:
+    async def scenario():
+        shared = build_http_client(timeout=5.0)
+        async with open_client(shared, 5.0) as client:
+            assert client is shared
+        assert not shared.is_closed
+
+        await shared.aclose()
+        async with open_client(shared, 5.0) as client:
+            assert client is not shared
+            fallback = client
+        assert fallback.is_closed
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import httpx
+
+from ..api.retry_client import RetryBudget, backoff_delay, deadline_scope, retry_after_seconds, retry_request
+
+
+def _status_error(status_code: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "http://upstream/api")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status_code}", request=request, response=response)
+
+
+def test_backoff_uses_full_jitter_within_cap() -> None:
+    delays = [backoff_delay(3, 1.0, 2.0, 5.0) for _ in range(200)]
+    assert all(0 <= delay <= 5.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_after_header_is_parsed() -> None:
+    assert retry_after_seconds(_status_error(503, {"Retry-After": "2"})) == 2.0
+    assert retry_after_seconds(_status_error(503)) is None
+    assert retry_after_seconds(_status_error(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+
+
+def test_retry_budget_stops_retry_storm() -> None:
+    budget = RetryBudget(ratio=0.1, min_retries=2, window=60)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise _status_error(503)
+
+    async def scenario():
+        for _ in range(3):
+            try:
+                await retry_request(failing, max_retries=3, initial_delay=0, idempotent=True, budget=budget)
+            except httpx.HTTPStatusError:
+                pass
+
+    asyncio.run(scenario())
+    # 3 первых попытки + только 2 повтора из бюджета
+    assert len(calls) == 5
+
+
+def test_total_time_never_exceeds_deadline() -> None:
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def scenario():
+        started = time.monotonic()
+        try:
+            with deadline_scope(0.1):
+                # Собственный дедлайн вызова не может продлить внешний
+                await retry_request(slow, deadline=5)
+        except TimeoutError:
+            pass
+        else:
+            raise AssertionError("expected TimeoutError")
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_caller_supplied_exceptions_are_retried_for_idempotent_calls() -> None:
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ValueError("transient")
+        return "ok"
+
+    async def scenario():
+        result = await retry_request(flaky, initial_delay=0, exceptions=(ValueError,), idempotent=True)
+        assert result == "ok"
+
+        calls.clear()
+        try:
+            await retry_request(flaky, initial_delay=0, exceptions=(ValueError,))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected ValueError")
+
+    asyncio.run(scenario())
+    assert calls == [1]
@@ -6,4 +6,6 @@ class CategoriesAppConfig(AppConfig):
     name = "categories_app"
     verbose_name = "Структура расходов"
 
-
+    def ready(self):
+        """Import signals when app is ready."""
+        import categories_app.signals  # noqa: F401
@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class SyncJobStatus(models.TextChoices):
+    QUEUED = "queued", "В очереди"
+    RUNNING = "running", "Выполняется"
+    SUCCEEDED = "succeeded", "Выполнена"
+    FAILED = "failed", "Ошибка"
+
+
+class SyncJobTrigger(models.TextChoices):
+    MANUAL = "manual", "Запрос через API"
+    SCHEDULE = "schedule", "По расписанию"
@@ -0,0 +1,71 @@
+"""Worker that runs the category sheet sync on a schedule and on demand."""
+
+from __future__ import annotations
+
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from categories_app.choices import SyncJobTrigger
+from categories_app.sheets_sync import CategoriesSheetSync
+from categories_app.sync_jobs import SyncJobRunner, enqueue_sync
+
+
+class Command(BaseCommand):
+    help = "Периодически синхронизирует категории из Google Sheets и выполняет задачи из очереди."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Поставить синхронизацию в очередь, выполнить её и выйти.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=float(os.getenv("CATEGORIES_SYNC_INTERVAL", "300")),
+            help="Интервал плановой синхронизации (секунды).",
+        )
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            default=float(os.getenv("CATEGORIES_SYNC_JITTER", "30")),
+            help="Случайная добавка к интервалу, чтобы воркеры не стучались одновременно (секунды).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=float(os.getenv("CATEGORIES_SYNC_POLL_INTERVAL", "2.0")),
+            help="Как часто проверять очередь задач из API (секунды).",
+        )
+
+    def handle(self, *args, **options):
+        runner = SyncJobRunner()
+        scheduled = bool(CategoriesSheetSync().spreadsheet_key)
+        if not scheduled:
+            self.stdout.write("GOOGLE_SHEET_ID is not configured; scheduled sync disabled.")
+
+        if options["once"]:
+            if not scheduled:
+                # Без таблицы задача гарантированно упадёт — не создаём её
+                return
+            enqueue_sync(trigger=SyncJobTrigger.SCHEDULE)
+            job = runner.run_next()
+            self.stdout.write(f"Sync job: {job.pk} {job.status}" if job else "No sync job was run.")
+            return
+
+        self.stdout.write("Category sync scheduler started.")
+        next_run_at = time.monotonic()
+        try:
+            while True:
+                close_old_connections()
+                if scheduled and time.monotonic() >= next_run_at:
+                    enqueue_sync(trigger=SyncJobTrigger.SCHEDULE)
+                    next_run_at = time.monotonic() + options["interval"] + random.uniform(0, options["jitter"])
+                runner.run_next()
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Category sync scheduler stopped.")
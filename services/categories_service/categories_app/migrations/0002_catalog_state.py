@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories_app', '0002_catalog_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogstate',
+            name='sync_lease_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SyncJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('succeeded', 'Выполнена'), ('failed', 'Ошибка')], default='queued', max_length=16)),
+                ('trigger', models.CharField(choices=[('manual', 'Запрос через API'), ('schedule', 'По расписанию')], default='manual', max_length=16)),
+                ('force', models.BooleanField(default=False)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ('-id',),
+                'indexes': [models.Index(fields=['status', 'id'], name='syncjob_status_idx')],
+            },
+        ),
+    ]
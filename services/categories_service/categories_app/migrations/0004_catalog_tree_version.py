@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories_app', '0003_sync_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogstate',
+            name='tree_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from django.db import models
 
+from .choices import SyncJobStatus, SyncJobTrigger
+
 
 class TimestampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -57,3 +59,53 @@ class Subcategory(TimestampedModel):
     def __str__(self) -> str:
         return f"{self.category.name}: {self.name}"
 
+
+
+class CatalogState(models.Model):
+    """
+    Single-row state of the category catalog sync.
+    Holds the fingerprint of the last sheet payload applied to the DB.
+    """
+
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    synced_at = models.DateTimeField(null=True, blank=True)
+    # Растёт при каждом изменении справочника; по нему кешируется дерево (ETag)
+    tree_version = models.PositiveBigIntegerField(default=0)
+    # Аренда на выполнение синхронизации: пока не истекла, второй воркер её не запустит
+    sync_lease_until = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def load(cls) -> "CatalogState":
+        state, _ = cls.objects.get_or_create(pk=1)
+        return state
+
+    def __str__(self) -> str:
+        return f"CatalogState({self.content_hash[:12]})"
+
+
+class SyncJob(models.Model):
+    """A queued/running/finished run of the category sheet sync."""
+
+    status = models.CharField(
+        max_length=16,
+        choices=SyncJobStatus.choices,
+        default=SyncJobStatus.QUEUED,
+    )
+    trigger = models.CharField(
+        max_length=16,
+        choices=SyncJobTrigger.choices,
+        default=SyncJobTrigger.MANUAL,
+    )
+    force = models.BooleanField(default=False)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-id",)
+        indexes = [models.Index(fields=("status", "id"), name="syncjob_status_idx")]
+
+    def __str__(self) -> str:
+        return f"SyncJob #{self.pk} ({self.status})"
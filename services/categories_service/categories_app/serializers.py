@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Warehouse, Category, Subcategory
+from .models import SyncJob, Warehouse, Category, Subcategory
 
 
 class SubcategorySerializer(serializers.ModelSerializer):
@@ -29,3 +29,19 @@ class WarehouseSerializer(serializers.ModelSerializer):
         model = Warehouse
         fields = ("slug", "name", "categories")
 
+
+
+class SyncJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SyncJob
+        fields = (
+            "id",
+            "status",
+            "trigger",
+            "force",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
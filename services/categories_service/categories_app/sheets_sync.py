@@ -1,21 +1,25 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import gspread
 from django.db import transaction
+from django.utils import timezone
 from django.utils.text import slugify
 
 # Add config directory to path (папка config лежит в корне проекта)
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent / "config"))
 
-from google_sheets import GOOGLE_SHEETS_CONFIG  # noqa: E402
+from google_sheets import GOOGLE_SHEETS_CONFIG, WORKSHEET_HANDLES  # noqa: E402
 
-from .models import Warehouse, Category, Subcategory
+from .models import CatalogState, Warehouse, Category, Subcategory
+from .tree_cache import bump_tree_version, deferred_tree_bump
 
 
 WAREHOUSE_KEYS = ("Выберите склад", "Склад")
@@ -70,12 +74,12 @@ class CategoriesSheetSync:
         return self._client
 
     def fetch_rows(self) -> List[Dict[str, Any]]:
-        worksheet = (
-            self._build_client()
-            .open_by_key(self.spreadsheet_key)
-            .worksheet(self.worksheet_name)
+        return WORKSHEET_HANDLES.call(
+            self._build_client,
+            self.spreadsheet_key,
+            self.worksheet_name,
+            lambda worksheet: worksheet.get_all_records(),
         )
-        return worksheet.get_all_records()
 
     def _first_value(self, row: Dict[str, Any], keys: Iterable[str]) -> str | None:
         for key in keys:
@@ -109,41 +113,187 @@ class CategoriesSheetSync:
             is_custom_input=is_custom_input,
         )
 
-    @transaction.atomic
-    def sync(self) -> Dict[str, int]:
+    def fingerprint(self, records: List[Dict[str, Any]], *, prune: bool) -> str:
+        """sha256 of the fetched payload (and of what it is applied with)."""
+        material = json.dumps(
+            {
+                "spreadsheet": self.spreadsheet_key,
+                "worksheet": self.worksheet_name,
+                "prune": prune,
+                "records": records,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def sync(self, *, prune: bool | None = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Apply the sheet to the DB as a diff.
+
+        If the fetched payload has the same fingerprint as the last applied
+        one, nothing is touched and the result has status "unchanged"
+        (`force` skips this check).
+
+        Existing warehouses/categories/subcategories are loaded once, new rows
+        are inserted with bulk_create, changed ones with bulk_update. With
+        `prune` (default: CATEGORIES_SYNC_PRUNE) entities that disappeared from
+        the sheet are deleted.
+        """
+        if prune is None:
+            prune = os.getenv("CATEGORIES_SYNC_PRUNE", "false").lower() == "true"
+        records = self.fetch_rows()
+        content_hash = self.fingerprint(records, prune=prune)
+        state = CatalogState.load()
+        if not force and state.content_hash == content_hash:
+            return {"status": "unchanged", "content_hash": content_hash}
+
+        with transaction.atomic():
+            return self._apply_records(records, state, content_hash, prune=prune)
+
+    def _apply_records(
+        self,
+        records: List[Dict[str, Any]],
+        state: CatalogState,
+        content_hash: str,
+        *,
+        prune: bool,
+    ) -> Dict[str, Any]:
         rows = [
             normalised
-            for normalised in (self._normalise_row(row) for row in self.fetch_rows())
+            for normalised in (self._normalise_row(row) for row in records)
             if normalised
         ]
+        stats = {"created": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        now = timezone.now()
 
-        processed = 0
+        # --- Склады ---
+        warehouses = {obj.slug: obj for obj in Warehouse.objects.all()}
+        wanted_warehouses: Dict[str, Dict[str, Any]] = {}
         for row in rows:
-            warehouse, _ = Warehouse.objects.get_or_create(
-                slug=slugify(row.warehouse, allow_unicode=True),
-                defaults={"name": row.warehouse},
+            wanted_warehouses.setdefault(
+                slugify(row.warehouse, allow_unicode=True),
+                {"name": row.warehouse},
             )
-            category, _ = Category.objects.get_or_create(
-                warehouse=warehouse,
-                slug=slugify(row.category, allow_unicode=True),
-                defaults={"name": row.category},
+        self._apply(Warehouse, warehouses, wanted_warehouses, lambda key: {"slug": key}, stats, now)
+        if any(warehouses[key].pk is None for key in wanted_warehouses):
+            warehouses = {obj.slug: obj for obj in Warehouse.objects.all()}
+
+        # --- Категории ---
+        categories = {(obj.warehouse_id, obj.slug): obj for obj in Category.objects.all()}
+        wanted_categories: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        for row in rows:
+            warehouse = warehouses[slugify(row.warehouse, allow_unicode=True)]
+            wanted_categories.setdefault(
+                (warehouse.pk, slugify(row.category, allow_unicode=True)),
+                {"name": row.category},
             )
+        self._apply(
+            Category,
+            categories,
+            wanted_categories,
+            lambda key: {"warehouse_id": key[0], "slug": key[1]},
+            stats,
+            now,
+        )
+        if any(categories[key].pk is None for key in wanted_categories):
+            categories = {(obj.warehouse_id, obj.slug): obj for obj in Category.objects.all()}
+
+        # --- Подкатегории (последняя строка с тем же slug побеждает) ---
+        subcategories = {(obj.category_id, obj.slug): obj for obj in Subcategory.objects.all()}
+        wanted_subcategories: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        for row in rows:
+            warehouse = warehouses[slugify(row.warehouse, allow_unicode=True)]
+            category = categories[(warehouse.pk, slugify(row.category, allow_unicode=True))]
             subcategory_slug_source = f"{row.canonical_subcategory}-{row.detail_option or ''}"
-            subcategory, _ = Subcategory.objects.update_or_create(
-                category=category,
-                slug=slugify(subcategory_slug_source, allow_unicode=True),
-                defaults={
-                    "name": row.display_name,
-                    "requires_comment": row.requires_comment,
-                    "is_custom_input": row.is_custom_input,
-                },
-            )
-            processed += 1
+            wanted_subcategories[(category.pk, slugify(subcategory_slug_source, allow_unicode=True))] = {
+                "name": row.display_name,
+                "requires_comment": row.requires_comment,
+                "is_custom_input": row.is_custom_input,
+            }
+        self._apply(
+            Subcategory,
+            subcategories,
+            wanted_subcategories,
+            lambda key: {"category_id": key[0], "slug": key[1]},
+            stats,
+            now,
+        )
+
+        totals = {
+            "warehouses": len(warehouses),
+            "categories": len(categories),
+            "subcategories": len(subcategories),
+        }
+        # Пустой лист скорее означает ошибку чтения, чем удаление всего справочника
+        if prune and rows:
+            with deferred_tree_bump():
+                for model, existing, wanted, total_key in (
+                    (Subcategory, subcategories, wanted_subcategories, "subcategories"),
+                    (Category, categories, wanted_categories, "categories"),
+                    (Warehouse, warehouses, wanted_warehouses, "warehouses"),
+                ):
+                    stale = [obj.pk for key, obj in existing.items() if key not in wanted]
+                    if stale:
+                        model.objects.filter(pk__in=stale).delete()
+                        stats["deleted"] += len(stale)
+                        totals[total_key] -= len(stale)
+
+        state.content_hash = content_hash
+        state.synced_at = now
+        state.save(update_fields=["content_hash", "synced_at"])
+        # Кеш дерева сбрасываем только если справочник действительно изменился
+        if stats["created"] or stats["updated"] or stats["deleted"]:
+            bump_tree_version()
 
         return {
-            "rows_processed": processed,
-            "warehouses": Warehouse.objects.count(),
-            "categories": Category.objects.count(),
-            "subcategories": Subcategory.objects.count(),
+            "status": "applied",
+            "content_hash": content_hash,
+            "tree_version": CatalogState.objects.values_list("tree_version", flat=True).get(pk=1),
+            "rows_processed": len(rows),
+            **stats,
+            **totals,
         }
 
+    @staticmethod
+    def _apply(
+        model,
+        existing: Dict[Any, Any],
+        wanted: Dict[Any, Dict[str, Any]],
+        key_fields,
+        stats: Dict[str, int],
+        now,
+    ) -> None:
+        """
+        Diff `wanted` (key -> field values) against `existing` (key -> instance)
+        and write the difference with one bulk_create and one bulk_update.
+        New instances are added to `existing`.
+        """
+        to_create = []
+        to_update = []
+        changed_fields: set[str] = set()
+        for key, values in wanted.items():
+            obj = existing.get(key)
+            if obj is None:
+                obj = model(**key_fields(key), **values)
+                existing[key] = obj
+                to_create.append(obj)
+                continue
+            diff = [field for field, value in values.items() if getattr(obj, field) != value]
+            if not diff:
+                stats["unchanged"] += 1
+                continue
+            for field in diff:
+                setattr(obj, field, values[field])
+            # bulk_update не трогает auto_now, выставляем вручную
+            obj.updated_at = now
+            changed_fields.update(diff)
+            to_update.append(obj)
+
+        if to_create:
+            model.objects.bulk_create(to_create)
+            stats["created"] += len(to_create)
+        if to_update:
+            model.objects.bulk_update(to_update, [*sorted(changed_fields), "updated_at"])
+            stats["updated"] += len(to_update)
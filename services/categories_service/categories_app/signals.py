@@ -0,0 +1,25 @@
+"""Keep the cached category tree in sync with manual edits (admin, shell)."""
+
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Subcategory, Warehouse
+from .tree_cache import bump_tree_version
+
+
+@receiver(post_save, sender=Warehouse)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Warehouse)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Subcategory)
+def invalidate_category_tree(sender, **kwargs):
+    """
+    Bulk writes of CategoriesSheetSync do not send signals;
+    the sync bumps the version itself when it changes data.
+    """
+    if kwargs.get("raw"):
+        return
+    bump_tree_version()
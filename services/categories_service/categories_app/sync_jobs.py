@@ -0,0 +1,120 @@
+"""Queue and single-flight runner for the category sheet sync."""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import timedelta
+from typing import Callable
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .choices import SyncJobStatus, SyncJobTrigger
+from .models import CatalogState, SyncJob
+from .sheets_sync import CategoriesSheetSync
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_sync(*, trigger: str = SyncJobTrigger.MANUAL, force: bool = False) -> SyncJob:
+    """
+    Queue a sync run. While a job is still waiting in the queue,
+    further requests reuse it instead of piling up identical runs.
+    """
+    with transaction.atomic():
+        job = (
+            SyncJob.objects.select_for_update()
+            .filter(status=SyncJobStatus.QUEUED)
+            .order_by("id")
+            .first()
+        )
+        if job is None:
+            return SyncJob.objects.create(trigger=trigger, force=force)
+        if force and not job.force:
+            job.force = True
+            job.save(update_fields=["force"])
+        return job
+
+
+class SyncJobRunner:
+    """
+    Runs queued sync jobs one at a time across all workers.
+
+    Single-flight is enforced with a lease on the CatalogState row, taken by a
+    conditional UPDATE: only the worker whose update matched runs the sync.
+    """
+
+    def __init__(
+        self,
+        *,
+        lease_seconds: float | None = None,
+        sync_factory: Callable[[], CategoriesSheetSync] = CategoriesSheetSync,
+    ) -> None:
+        self.lease_seconds = lease_seconds or float(os.getenv("CATEGORIES_SYNC_LEASE_SECONDS", "600"))
+        self.sync_factory = sync_factory
+
+    def run_next(self) -> SyncJob | None:
+        """Run the oldest queued job. Returns it, or None if nothing was run."""
+        if not SyncJob.objects.filter(status=SyncJobStatus.QUEUED).exists():
+            return None
+        if not self._acquire_lease():
+            return None
+        try:
+            self._fail_abandoned_jobs()
+            job = SyncJob.objects.filter(status=SyncJobStatus.QUEUED).order_by("id").first()
+            if job is None:
+                return None
+            claimed = SyncJob.objects.filter(pk=job.pk, status=SyncJobStatus.QUEUED).update(
+                status=SyncJobStatus.RUNNING,
+                started_at=timezone.now(),
+            )
+            if not claimed:
+                return None
+            self._run(job)
+            job.refresh_from_db()
+            return job
+        finally:
+            self._release_lease()
+
+    def _run(self, job: SyncJob) -> None:
+        try:
+            sync = self.sync_factory()
+            if not sync.spreadsheet_key:
+                raise RuntimeError("GOOGLE_SHEET_ID is not configured")
+            result = sync.sync(force=job.force)
+        except Exception as exc:
+            logger.exception(f"Category sync job {job.pk} failed: {exc}")
+            SyncJob.objects.filter(pk=job.pk).update(
+                status=SyncJobStatus.FAILED,
+                error=str(exc),
+                finished_at=timezone.now(),
+            )
+            return
+        SyncJob.objects.filter(pk=job.pk).update(
+            status=SyncJobStatus.SUCCEEDED,
+            result=result,
+            finished_at=timezone.now(),
+        )
+
+    def _acquire_lease(self) -> bool:
+        CatalogState.load()
+        now = timezone.now()
+        acquired = (
+            CatalogState.objects.filter(pk=1)
+            .filter(Q(sync_lease_until__isnull=True) | Q(sync_lease_until__lt=now))
+            .update(sync_lease_until=now + timedelta(seconds=self.lease_seconds))
+        )
+        return acquired == 1
+
+    def _release_lease(self) -> None:
+        CatalogState.objects.filter(pk=1).update(sync_lease_until=None)
+
+    def _fail_abandoned_jobs(self) -> None:
+        # Под нашей арендой других запусков нет: running-задачи остались от упавшего воркера
+        SyncJob.objects.filter(status=SyncJobStatus.RUNNING).update(
+            status=SyncJobStatus.FAILED,
+            error="Worker stopped before the sync finished.",
+            finished_at=timezone.now(),
+        )
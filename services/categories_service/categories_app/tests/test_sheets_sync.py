@@ -1,7 +1,7 @@
 from django.test import TestCase
 from django.utils.text import slugify
 
-from categories_app.models import Warehouse, Category, Subcategory
+from categories_app.models import CatalogState, Warehouse, Category, Subcategory
 from categories_app.sheets_sync import (
     CategoriesSheetSync,
     WAREHOUSE_KEYS,
@@ -61,3 +61,57 @@ class CategoriesSheetSyncTests(TestCase):
             subcategory.slug,
             slugify("Repair-Tires", allow_unicode=True),
         )
+
+
+class CategoriesSheetSyncDiffTests(TestCase):
+    def _sync(self, records, **kwargs):
+        sync = CategoriesSheetSync(spreadsheet_key="dummy", worksheet_name="Categories")
+        sync.fetch_rows = lambda: records
+        return sync.sync(**kwargs)
+
+    def _row(self, warehouse, category, subcategory, comment=""):
+        return {
+            WAREHOUSE_KEYS[0]: warehouse,
+            CATEGORY_KEYS[0]: category,
+            SUBCATEGORY_KEYS[0]: subcategory,
+            "Комментарий": comment,
+        }
+
+    def test_sync_reports_diff_and_skips_unchanged_rows(self):
+        records = [
+            self._row("Almaty", "Auto", "Repair"),
+            self._row("Almaty", "Auto", "Fuel"),
+        ]
+        first = self._sync(records)
+        self.assertEqual(first["created"], 4)
+        self.assertEqual(first["subcategories"], 2)
+
+        second = self._sync(records, force=True)
+        self.assertEqual((second["created"], second["updated"], second["unchanged"]), (0, 0, 4))
+
+        records[1] = self._row("Almaty", "Auto", "Fuel", comment="Обязательно")
+        third = self._sync(records)
+        self.assertEqual(third["updated"], 1)
+        self.assertTrue(Subcategory.objects.get(name="Fuel").requires_comment)
+
+    def test_sync_prunes_rows_removed_from_sheet(self):
+        self._sync([self._row("Almaty", "Auto", "Repair"), self._row("Astana", "Office", "Paper")])
+
+        result = self._sync([self._row("Almaty", "Auto", "Repair")], prune=True)
+
+        self.assertEqual(result["deleted"], 3)
+        self.assertEqual(list(Warehouse.objects.values_list("name", flat=True)), ["Almaty"])
+        self.assertEqual(Subcategory.objects.count(), 1)
+        self.assertEqual(result["warehouses"], 1)
+
+    def test_sync_skips_db_work_when_sheet_is_unchanged(self):
+        records = [self._row("Almaty", "Auto", "Repair")]
+        self.assertEqual(self._sync(records)["status"], "applied")
+
+        Subcategory.objects.update(name="Edited locally")
+        with self.assertNumQueries(1):
+            result = self._sync(records)
+
+        self.assertEqual(result["status"], "unchanged")
+        self.assertEqual(Subcategory.objects.get().name, "Edited locally")
+        self.assertEqual(CatalogState.load().content_hash, result["content_hash"])
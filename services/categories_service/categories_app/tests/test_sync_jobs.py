@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from categories_app.choices import SyncJobStatus
+from categories_app.models import CatalogState, SyncJob
+from categories_app.sync_jobs import SyncJobRunner, enqueue_sync
+
+
+class _StubSync:
+    spreadsheet_key = "dummy"
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = []
+
+    def sync(self, *, force=False):
+        self.calls.append(force)
+        if self.fail:
+            raise RuntimeError("sheet unavailable")
+        return {"status": "applied", "rows_processed": 3}
+
+
+class SyncJobRunnerTests(TestCase):
+    def test_enqueue_reuses_queued_job(self):
+        first = enqueue_sync()
+        second = enqueue_sync(force=True)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertTrue(SyncJob.objects.get(pk=first.pk).force)
+
+    def test_runner_runs_job_and_releases_lease(self):
+        stub = _StubSync()
+        job = enqueue_sync()
+
+        done = SyncJobRunner(sync_factory=lambda: stub).run_next()
+
+        self.assertEqual(done.pk, job.pk)
+        self.assertEqual(done.status, SyncJobStatus.SUCCEEDED)
+        self.assertEqual(done.result["rows_processed"], 3)
+        self.assertIsNone(CatalogState.load().sync_lease_until)
+
+    def test_runner_marks_failed_job(self):
+        enqueue_sync()
+
+        done = SyncJobRunner(sync_factory=lambda: _StubSync(fail=True)).run_next()
+
+        self.assertEqual(done.status, SyncJobStatus.FAILED)
+        self.assertIn("sheet unavailable", done.error)
+
+    def test_runner_skips_while_other_worker_holds_lease(self):
+        CatalogState.load()
+        CatalogState.objects.filter(pk=1).update(sync_lease_until=timezone.now() + timedelta(minutes=5))
+        stub = _StubSync()
+        enqueue_sync()
+
+        self.assertIsNone(SyncJobRunner(sync_factory=lambda: stub).run_next())
+        self.assertEqual(stub.calls, [])
+
+    def test_scheduler_once_without_sheet_does_not_enqueue(self):
+        out = StringIO()
+        with patch("categories_app.management.commands.run_category_sync_scheduler.CategoriesSheetSync") as sync:
+            sync.return_value.spreadsheet_key = ""
+            call_command("run_category_sync_scheduler", "--once", stdout=out)
+
+        self.assertIn("scheduled sync disabled", out.getvalue())
+        self.assertFalse(SyncJob.objects.exists())
+
+
+class SyncEndpointTests(APITestCase):
+    def test_sync_endpoint_enqueues_job(self):
+        with patch("categories_app.views.CategoriesSheetSync") as sync_class:
+            sync_class.return_value.spreadsheet_key = "dummy"
+            response = self.client.post("/api/categories/sync")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.json()["job_id"]
+        self.assertEqual(SyncJob.objects.get(pk=job_id).status, SyncJobStatus.QUEUED)
+
+        job_response = self.client.get(f"/api/categories/sync/jobs/{job_id}")
+        self.assertEqual(job_response.json()["status"], SyncJobStatus.QUEUED)
+
+        status_response = self.client.get("/api/categories/sync/status")
+        self.assertEqual(status_response.json()["queued"], 1)
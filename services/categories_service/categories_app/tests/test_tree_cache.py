@@ -0,0 +1,48 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from categories_app import tree_cache
+from categories_app.models import CatalogState, Category, Subcategory, Warehouse
+from categories_app.sheets_sync import CATEGORY_KEYS, SUBCATEGORY_KEYS, WAREHOUSE_KEYS, CategoriesSheetSync
+
+
+class CategoryTreeCacheTests(APITestCase):
+    def setUp(self) -> None:
+        # Версии в тестовой БД повторяются между тестами — сбрасываем кеш процесса
+        tree_cache._rendered.clear()  # noqa: SLF001
+        CatalogState.load()
+        warehouse = Warehouse.objects.create(slug="almaty", name="Алматы")
+        category = Category.objects.create(warehouse=warehouse, slug="auto", name="Авто")
+        self.subcategory = Subcategory.objects.create(category=category, slug="repair", name="Ремонт")
+
+    def test_tree_is_served_with_etag_and_revalidated(self) -> None:
+        response = self.client.get("/api/categories/tree")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertEqual(response["X-Tree-Version"], str(CatalogState.load().tree_version))
+
+        with self.assertNumQueries(1):
+            cached = self.client.get("/api/categories/tree", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_bump_version_and_refresh_tree(self) -> None:
+        etag = self.client.get("/api/categories/tree")["ETag"]
+
+        self.subcategory.name = "Шиномонтаж"
+        self.subcategory.save()
+
+        response = self.client.get("/api/categories/tree", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()[0]["categories"][0]["subcategories"][0]["name"], "Шиномонтаж")
+
+    def test_sync_without_changes_keeps_version(self) -> None:
+        records = [{WAREHOUSE_KEYS[0]: "Алматы", CATEGORY_KEYS[0]: "Авто", SUBCATEGORY_KEYS[0]: "Мойка"}]
+        sync = CategoriesSheetSync(spreadsheet_key="dummy", worksheet_name="Categories")
+        sync.fetch_rows = lambda: records
+
+        applied = sync.sync()
+        unchanged = sync.sync(force=True)
+
+        self.assertEqual(applied["tree_version"], unchanged["tree_version"])
+        self.assertEqual(CatalogState.load().tree_version, applied["tree_version"])
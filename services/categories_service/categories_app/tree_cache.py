@@ -0,0 +1,70 @@
+"""Pre-rendered, versioned category tree for CategoryTreeView."""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+from .models import CatalogState, Warehouse
+from .serializers import WarehouseSerializer
+
+_lock = threading.Lock()
+_rendered: dict[int, bytes] = {}
+_local = threading.local()
+
+
+def current_tree_version() -> int | None:
+    """Version of the catalog, or None if it has never been synced."""
+    return CatalogState.objects.filter(pk=1).values_list("tree_version", flat=True).first()
+
+
+def bump_tree_version() -> None:
+    """Invalidate cached trees in every process by moving the version forward."""
+    if getattr(_local, "deferred", False):
+        return
+    CatalogState.objects.filter(pk=1).update(tree_version=F("tree_version") + 1)
+
+
+@contextmanager
+def deferred_tree_bump() -> Iterator[None]:
+    """
+    Silence per-object bumps (e.g. signals of a cascade delete);
+    the caller bumps the version once afterwards.
+    """
+    _local.deferred = True
+    try:
+        yield
+    finally:
+        _local.deferred = False
+
+
+def tree_etag(version: int) -> str:
+    return f'"tree-{version}"'
+
+
+def render_tree() -> bytes:
+    queryset = Warehouse.objects.prefetch_related("categories__subcategories").all()
+    return JSONRenderer().render(WarehouseSerializer(queryset, many=True).data)
+
+
+def get_rendered_tree(version: int | None) -> bytes:
+    """
+    JSON bytes of the tree for `version`, rendered once per process.
+    Without a version (catalog never synced) nothing is cached.
+    """
+    if version is None:
+        return render_tree()
+    with _lock:
+        body = _rendered.get(version)
+    if body is not None:
+        return body
+    body = render_tree()
+    with _lock:
+        # Держим только актуальную версию
+        _rendered.clear()
+        _rendered[version] = body
+    return body
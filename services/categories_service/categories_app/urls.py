@@ -1,9 +1,11 @@
 from django.urls import path
 
-from .views import CategoryTreeView, CategorySyncView
+from .views import CategoryTreeView, CategorySyncView, SyncJobDetailView, SyncStatusView
 
 urlpatterns = [
     path("categories/tree", CategoryTreeView.as_view(), name="categories-tree"),
     path("categories/sync", CategorySyncView.as_view(), name="categories-sync"),
+    path("categories/sync/status", SyncStatusView.as_view(), name="categories-sync-status"),
+    path("categories/sync/jobs/<int:pk>", SyncJobDetailView.as_view(), name="categories-sync-job"),
 ]
 
@@ -1,31 +1,48 @@
 from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Warehouse
-from .serializers import WarehouseSerializer
+from .choices import SyncJobStatus
+from .models import CatalogState, SyncJob
+from .serializers import SyncJobSerializer
 from .sheets_sync import CategoriesSheetSync
+from .sync_jobs import enqueue_sync
+from .tree_cache import current_tree_version, get_rendered_tree, tree_etag
 
 
 class CategoryTreeView(APIView):
     """
     Возвращает актуальную структуру расходов:
     Склад -> Категории -> Подкатегории.
+
+    Дерево отдаётся заранее отрендеренным JSON для текущей версии справочника;
+    клиент может прислать If-None-Match и получить 304.
     """
 
     def get(self, request, *args, **kwargs):
-        queryset = Warehouse.objects.prefetch_related(
-            "categories__subcategories"
-        ).all()
-        serializer = WarehouseSerializer(queryset, many=True)
-        return Response(serializer.data)
+        version = current_tree_version()
+        if version is None:
+            return HttpResponse(get_rendered_tree(None), content_type="application/json")
+
+        etag = tree_etag(version)
+        headers = {"ETag": etag, "X-Tree-Version": str(version)}
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return HttpResponse(
+            get_rendered_tree(version),
+            content_type="application/json",
+            headers=headers,
+        )
 
 
 class CategorySyncView(APIView):
     """
-    Заглушка под синхронизацию с Google Sheets.
-    В дальнейшем здесь будет логика загрузки данных и обновления БД.
+    Ставит синхронизацию с Google Sheets в очередь.
+    Выполняет её воркер run_category_sync_scheduler; статус — по job_id.
     """
 
     def post(self, request, *args, **kwargs):
@@ -38,8 +55,38 @@ class CategorySyncView(APIView):
                 },
                 status=status.HTTP_202_ACCEPTED,
             )
-        result = sync.sync()
+        force = str(request.query_params.get("force", "")).lower() in ("1", "true")
+        job = enqueue_sync(force=force)
+        return Response(
+            {
+                "detail": "Синхронизация поставлена в очередь.",
+                "job_id": job.pk,
+                "status": job.status,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class SyncJobDetailView(APIView):
+    """Статус конкретной задачи синхронизации."""
+
+    def get(self, request, pk: int, *args, **kwargs):
+        job = get_object_or_404(SyncJob, pk=pk)
+        return Response(SyncJobSerializer(job).data)
+
+
+class SyncStatusView(APIView):
+    """Сводка: последняя задача и последнее применённое состояние таблицы."""
+
+    def get(self, request, *args, **kwargs):
+        state = CatalogState.objects.filter(pk=1).first()
+        last_job = SyncJob.objects.order_by("-id").first()
         return Response(
-            {"detail": "Синхронизация выполнена.", **result},
-            status=status.HTTP_200_OK,
+            {
+                "running": SyncJob.objects.filter(status=SyncJobStatus.RUNNING).exists(),
+                "queued": SyncJob.objects.filter(status=SyncJobStatus.QUEUED).count(),
+                "content_hash": state.content_hash if state else "",
+                "synced_at": state.synced_at if state else None,
+                "last_job": SyncJobSerializer(last_job).data if last_job else None,
+            }
         )
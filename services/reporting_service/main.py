@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any, Dict
 
@@ -18,7 +20,15 @@ from sheets.writer import RequestsSheetWriter  # noqa: E402
 
 load_dotenv()
 
-app = FastAPI(title="reporting_service", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    yield
+    # Дописываем в таблицу всё, что осталось в очереди
+    await asyncio.to_thread(writer.connector.close, 30)
+
+
+app = FastAPI(title="reporting_service", version="0.1.0", lifespan=lifespan)
 app.middleware("http")(verify_api_key)
 
 # Use unified config
@@ -48,9 +58,15 @@ async def healthcheck() -> Dict[str, str]:
 
 
 @app.post("/reports/requests", tags=["reports"])
-async def append_request(report: RequestReport) -> Dict[str, Any]:
+async def append_request(report: RequestReport, wait: bool = False) -> Dict[str, Any]:
+    """
+    Queue the request row for the batched Sheets writer.
+    With `?wait=true` the response is sent after the row is flushed.
+    """
     try:
-        row_id = await writer.append_request(report.model_dump())
-        return {"detail": "Строка добавлена в Google Sheets.", "google_row_id": row_id}
+        row_id = await writer.append_request(report.model_dump(), wait=wait)
+        if wait or writer.connector.dry_run:
+            return {"detail": "Строка добавлена в Google Sheets.", "google_row_id": row_id}
+        return {"detail": "Строка поставлена в очередь записи в Google Sheets.", "google_row_id": row_id}
     except Exception as exc:  # pragma: no cover - placeholder logging
         raise HTTPException(status_code=500, detail=str(exc)) from exc
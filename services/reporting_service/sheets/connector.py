@@ -2,14 +2,262 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any, List
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, TypeVar
 
 import gspread
 
+# Add config directory to path (папка config лежит в корне проекта)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent / "config"))
+
+from google_sheets import WORKSHEET_HANDLES  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_ROW_NUMBER_RE = re.compile(r"(\d+)(?::[A-Z]+\d+)?$")
+
+
+def row_number_from_range(a1_range: str) -> int | None:
+    """Extract the first row number from 'Reports!A5:H5' / 'Reports!A5' / 'dry-run!5'."""
+    match = _ROW_NUMBER_RE.search(a1_range or "")
+    return int(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for the Sheets API per-minute quota.
+    `acquire` blocks until a token is available.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = max(1.0, per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RowIndex:
+    """Key (value of column A) -> row number for one worksheet."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._rows: Dict[str, int] | None = None
+        self._loaded_at = 0.0
+
+    @staticmethod
+    def _normalise(key: Any) -> str:
+        return str(key).strip()
+
+    @property
+    def needs_reload(self) -> bool:
+        return self._rows is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, column: List[Any]) -> None:
+        rows: Dict[str, int] = {}
+        for row_number, value in enumerate(column, start=1):
+            key = self._normalise(value)
+            if key:
+                rows[key] = row_number
+        self._rows = rows
+        self._loaded_at = time.monotonic()
+
+    def get(self, key: Any) -> int | None:
+        if self._rows is None:
+            return None
+        return self._rows.get(self._normalise(key))
+
+    def record(self, key: Any, row_number: int) -> None:
+        if self._rows is not None:
+            self._rows[self._normalise(key)] = row_number
+
+    def invalidate(self) -> None:
+        self._rows = None
+
+
+@dataclass
+class _PendingWrite:
+    key: Any
+    row: list[Any]
+    futures: List[Future] = field(default_factory=list)
+    attempts: int = 0
+
+
+class SheetsWriteQueue:
+    """
+    In-process write queue drained by one background thread.
+
+    Writes submitted within `flush_interval` are coalesced (the last row for a
+    key wins) and handed to `flush` per worksheet in one call. Writes of a
+    failed flush that were not resolved go back to the queue and are retried
+    with exponential backoff; only after `max_attempts` their futures fail.
+    Callers that do not wait (reports from requests_service) rely on this:
+    a Sheets error must not drop a row the service has already accepted.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[str, List[_PendingWrite]], None],
+        *,
+        flush_interval: float,
+        max_attempts: int | None = None,
+        retry_base_delay: float | None = None,
+        retry_max_delay: float | None = None,
+    ) -> None:
+        self._flush = flush
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts or int(os.getenv("SHEETS_WRITE_MAX_ATTEMPTS", "8"))
+        self.retry_base_delay = retry_base_delay if retry_base_delay is not None else float(
+            os.getenv("SHEETS_WRITE_RETRY_BASE_DELAY", "2.0")
+        )
+        self.retry_max_delay = retry_max_delay if retry_max_delay is not None else float(
+            os.getenv("SHEETS_WRITE_RETRY_MAX_DELAY", "60.0")
+        )
+        self._pending: Dict[str, Dict[str, _PendingWrite]] = {}
+        self._resume_at = 0.0
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._close_deadline = float("inf")
+
+    def submit(self, worksheet: str, key: Any, row: list[Any]) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Sheets write queue is closed")
+            writes = self._pending.setdefault(worksheet, {})
+            pending = writes.get(str(key))
+            if pending:
+                pending.row = row
+                pending.futures.append(future)
+            else:
+                writes[str(key)] = _PendingWrite(key=key, row=row, futures=[future])
+            self._ensure_thread()
+            self._cond.notify()
+        return future
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Flush whatever is queued and stop the worker thread. Failed writes are
+        still retried with backoff, but only until `timeout` runs out.
+        """
+        with self._cond:
+            self._closed = True
+            if timeout is not None:
+                self._close_deadline = time.monotonic() + timeout
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run,
+                name="sheets-write-queue",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                # Окно накопления: ждём ещё немного, чтобы собрать пачку
+                # (после ошибки — не раньше окончания паузы перед повтором).
+                # При остановке окно не ждём, а паузу — не дольше срока остановки
+                window_end = time.monotonic() + self.flush_interval
+                while True:
+                    if self._closed:
+                        deadline = min(self._resume_at, self._close_deadline)
+                    else:
+                        deadline = max(window_end, self._resume_at)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, {}
+
+            for worksheet, writes in batch.items():
+                pending = list(writes.values())
+                try:
+                    self._flush(worksheet, pending)
+                except Exception as exc:
+                    self._retry_later(worksheet, pending, exc)
+
+    def _retry_later(self, worksheet: str, writes: List[_PendingWrite], exc: Exception) -> None:
+        """Requeue unresolved writes of a failed flush, fail those out of attempts."""
+        unresolved = [write for write in writes if not all(f.done() for f in write.futures)]
+        # Срок остановки вышел — повторять больше некогда
+        out_of_time = self._closed and time.monotonic() >= self._close_deadline
+        retry: List[_PendingWrite] = []
+        for write in unresolved:
+            write.attempts += 1
+            if out_of_time or write.attempts >= self.max_attempts:
+                logger.error(
+                    f"Giving up on row {write.key!r} for {worksheet} after {write.attempts} attempts: {exc}"
+                )
+                for future in write.futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            else:
+                retry.append(write)
+        if not retry:
+            return
+
+        attempts = max(write.attempts for write in retry)
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        logger.warning(
+            f"Failed to flush {len(retry)} row(s) to {worksheet} "
+            f"(attempt {attempts}/{self.max_attempts}): {exc}. Retrying in {delay}s..."
+        )
+        with self._cond:
+            writes_by_key = self._pending.setdefault(worksheet, {})
+            for write in retry:
+                newer = writes_by_key.get(str(write.key))
+                if newer:
+                    # Пока ждали, пришла новая версия строки: пишем её, ждущих объединяем
+                    newer.futures[:0] = write.futures
+                    newer.attempts = max(newer.attempts, write.attempts)
+                else:
+                    writes_by_key[str(write.key)] = write
+            self._resume_at = time.monotonic() + delay
+            self._cond.notify()
+
 
 class SheetsConnector:
     """
     Async wrapper around gspread with a dry-run fallback for local tests.
+
+    Row upserts go through a batched write queue: pending writes are flushed
+    every `flush_interval` seconds as one `batch_update` (existing rows) plus
+    one `append_rows` (new rows), throttled by a per-minute token bucket.
+    Column A is re-read before every append, so keys written by another
+    process are updated in place instead of being appended twice.
     """
 
     def __init__(
@@ -18,12 +266,34 @@ class SheetsConnector:
         *,
         service_account_file: str | None = None,
         service_account_json: str | None = None,
+        flush_interval: float | None = None,
+        write_quota_per_minute: float | None = None,
+        index_ttl: float | None = None,
     ) -> None:
         self.spreadsheet_key = spreadsheet_key
         self.service_account_file = service_account_file
         self.service_account_json = service_account_json
         self._client: gspread.Client | None = None
         self._dry_run_rows: List[list[Any]] = []
+        # Лист могут править руками — периодически перечитываем индекс
+        self.index_ttl = index_ttl if index_ttl is not None else float(
+            os.getenv("REPORTING_ROW_INDEX_TTL", "600")
+        )
+        self._indexes: Dict[str, RowIndex] = {}
+        self._bucket = TokenBucket(
+            write_quota_per_minute
+            or float(os.getenv("GOOGLE_SHEETS_WRITE_QUOTA_PER_MINUTE", "60"))
+        )
+        self._queue = SheetsWriteQueue(
+            self._flush_writes,
+            flush_interval=flush_interval
+            if flush_interval is not None
+            else float(os.getenv("SHEETS_FLUSH_INTERVAL", "1.0")),
+        )
+
+    @property
+    def dry_run(self) -> bool:
+        return not self.spreadsheet_key
 
     def _build_client(self) -> gspread.Client:
         if self._client:
@@ -38,6 +308,115 @@ class SheetsConnector:
             self._client = gspread.service_account()
         return self._client
 
+    def _with_worksheet(self, worksheet: str, action: Callable[[gspread.Worksheet], T]) -> T:
+        """
+        Run a write `action` on the cached worksheet handle. A stale handle is
+        dropped but the write is not re-run here (it may be partly applied):
+        the write queue retries it with a fresh handle and a reloaded index.
+        """
+        return WORKSHEET_HANDLES.call(
+            self._build_client, self.spreadsheet_key, worksheet, action, retry=False
+        )
+
+    def _index(self, worksheet: str) -> RowIndex:
+        return self._indexes.setdefault(worksheet, RowIndex(self.index_ttl))
+
+    async def upsert_row(
+        self,
+        worksheet: str,
+        key: Any,
+        row: list[Any],
+        *,
+        wait: bool = False,
+    ) -> str | None:
+        """
+        Write the row identified by `key` (value of column A): update it in
+        place if it exists, append it otherwise.
+
+        By default returns right after the write is queued, with the row id if
+        the row is already known. With `wait=True` waits for the flush.
+        """
+        if self.dry_run:
+            return self._upsert_dry_run(worksheet, key, row)
+
+        future = self._queue.submit(worksheet, key, row)
+        if wait:
+            return await asyncio.wrap_future(future)
+        row_number = self._index(worksheet).get(key)
+        return f"{worksheet}!A{row_number}" if row_number else None
+
+    def close(self, timeout: float | None = None) -> None:
+        """Flush queued writes and stop the background writer."""
+        self._queue.close(timeout)
+
+    def _upsert_dry_run(self, worksheet: str, key: Any, row: list[Any]) -> str:
+        index = self._index(worksheet)
+        if index.needs_reload:
+            index.load([r[0] if r else "" for r in self._dry_run_rows])
+        row_number = index.get(key)
+        if row_number is not None:
+            self._dry_run_rows[row_number - 1] = row
+        else:
+            self._dry_run_rows.append(row)
+            row_number = len(self._dry_run_rows)
+            index.record(key, row_number)
+        return f"dry-run!{row_number}"
+
+    def _flush_writes(self, worksheet: str, writes: List[_PendingWrite]) -> None:
+        """Runs in the queue thread: one batch_update + one append_rows per worksheet."""
+        try:
+            self._with_worksheet(worksheet, lambda ws: self._flush_to(ws, worksheet, writes))
+        except Exception:
+            # Часть строк могла лечь до ошибки: перед повтором перечитываем
+            # колонку A, чтобы такие строки обновились, а не добавились ещё раз
+            self._index(worksheet).invalidate()
+            raise
+
+    def _flush_to(self, ws: gspread.Worksheet, worksheet: str, writes: List[_PendingWrite]) -> None:
+        index = self._index(worksheet)
+        # Индекс локален для процесса (uvicorn --workers N): незнакомый ключ мог
+        # уже добавить другой воркер, поэтому перед append перечитываем колонку A
+        if index.needs_reload or any(index.get(write.key) is None for write in writes):
+            self._bucket.acquire()
+            index.load(ws.col_values(1))
+
+        updates = [(write, index.get(write.key)) for write in writes if index.get(write.key)]
+        appends = [write for write in writes if index.get(write.key) is None]
+
+        if updates:
+            self._bucket.acquire()
+            ws.batch_update(
+                [
+                    {"range": f"A{row_number}", "values": [write.row]}
+                    for write, row_number in updates
+                ],
+                value_input_option="USER_ENTERED",
+            )
+            for write, row_number in updates:
+                self._resolve(write, f"{worksheet}!A{row_number}")
+
+        if appends:
+            self._bucket.acquire()
+            response = ws.append_rows(
+                [write.row for write in appends],
+                value_input_option="USER_ENTERED",
+            )
+            first_row = row_number_from_range(response.get("updates", {}).get("updatedRange", ""))
+            if first_row is None:
+                # Не знаем, куда легли строки — перечитаем индекс при следующей записи
+                index.invalidate()
+            for offset, write in enumerate(appends):
+                row_number = first_row + offset if first_row is not None else None
+                if row_number is not None:
+                    index.record(write.key, row_number)
+                self._resolve(write, f"{worksheet}!A{row_number}" if row_number else None)
+
+    @staticmethod
+    def _resolve(write: _PendingWrite, row_id: str | None) -> None:
+        for future in write.futures:
+            if not future.done():
+                future.set_result(row_id)
+
     async def append_row(self, worksheet: str, row: list[Any]) -> str:
         if not self.spreadsheet_key:
             self._dry_run_rows.append(row)
@@ -46,10 +425,12 @@ class SheetsConnector:
         return await asyncio.to_thread(self._append_row_sync, worksheet, row)
 
     def _append_row_sync(self, worksheet: str, row: list[Any]) -> str:
-        ws = (
-            self._build_client()
-            .open_by_key(self.spreadsheet_key)
-            .worksheet(worksheet)
+        self._bucket.acquire()
+        response = self._with_worksheet(
+            worksheet,
+            lambda ws: ws.append_row(row, value_input_option="USER_ENTERED"),
         )
-        ws.append_row(row, value_input_option="USER_ENTERED")
-        return f"{worksheet}!A{ws.row_count}"
+        # Номер строки берём из ответа API: ws.row_count — это размер листа
+        updated_range = response.get("updates", {}).get("updatedRange", "")
+        row_number = row_number_from_range(updated_range)
+        return f"{worksheet}!A{row_number}" if row_number else updated_range
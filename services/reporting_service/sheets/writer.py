@@ -6,6 +6,14 @@ from .connector import SheetsConnector
 
 
 class RequestsSheetWriter:
+    """
+    Keeps one row per request in the reporting worksheet.
+
+    Rows are keyed by request_id (column A): repeated reports of the same
+    request update its row in place instead of adding duplicates. Writes go
+    through the connector's batched queue.
+    """
+
     def __init__(
         self,
         spreadsheet_key: str,
@@ -13,17 +21,31 @@ class RequestsSheetWriter:
         *,
         service_account_file: str | None = None,
         service_account_json: str | None = None,
+        index_ttl: float | None = None,
     ):
         self.connector = SheetsConnector(
             spreadsheet_key,
             service_account_file=service_account_file,
             service_account_json=service_account_json,
+            index_ttl=index_ttl,
         )
         self.worksheet_name = worksheet_name
 
-    async def append_request(self, payload: Dict[str, Any]) -> str:
+    async def append_request(self, payload: Dict[str, Any], *, wait: bool = False) -> str | None:
+        """
+        Upsert the request row: append it on the first report,
+        update the existing row in place afterwards.
+
+        Returns once the write is queued unless `wait` is set; the row id is
+        None while a new row has not been flushed yet.
+        """
         row = self._build_row(payload)
-        return await self.connector.append_row(self.worksheet_name, row)
+        return await self.connector.upsert_row(
+            self.worksheet_name,
+            int(payload["request_id"]),
+            row,
+            wait=wait,
+        )
 
     def _build_row(self, payload: Dict[str, Any]) -> List[Any]:
         return [
@@ -1,6 +1,9 @@
 import asyncio
+from unittest.mock import Mock
 
-from sheets.connector import SheetsConnector
+import pytest
+
+from sheets.connector import SheetsConnector, row_number_from_range
 from sheets.writer import RequestsSheetWriter
 
 
@@ -36,3 +39,193 @@ def test_writer_builds_row_and_calls_connector_in_dry_run() -> None:
     assert writer.connector._dry_run_rows == [  # noqa: SLF001
         [5, "test goal", "item", "2", 123.5, "note", "approved", "done"]
     ]
+
+
+def test_writer_updates_existing_row_instead_of_appending() -> None:
+    writer = RequestsSheetWriter(spreadsheet_key="", worksheet_name="Reports")
+    writer.connector._dry_run_rows.append(["ID", "Цель"])  # noqa: SLF001 - заголовок
+
+    first = asyncio.run(writer.append_request({"request_id": 7, "amount": 100, "status": "new"}))
+    asyncio.run(writer.append_request({"request_id": 8, "amount": 50, "status": "new"}))
+    second = asyncio.run(writer.append_request({"request_id": 7, "amount": 100, "status": "approved"}))
+
+    assert first == second == "dry-run!2"
+    rows = writer.connector._dry_run_rows  # noqa: SLF001
+    assert len(rows) == 3
+    assert rows[1][6] == "approved"
+
+
+def test_row_number_from_range() -> None:
+    assert row_number_from_range("Reports!A12:H12") == 12
+    assert row_number_from_range("Reports!A5") == 5
+    assert row_number_from_range("") is None
+
+
+class _FakeWorksheet:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+        self.calls: list = []
+
+    def col_values(self, column: int) -> list:
+        self.calls.append("col_values")
+        return [row[column - 1] for row in self.rows]
+
+    def batch_update(self, data: list, value_input_option: str) -> None:
+        self.calls.append("batch_update")
+        for item in data:
+            self.rows[row_number_from_range(item["range"]) - 1] = item["values"][0]
+
+    def append_rows(self, values: list, value_input_option: str) -> dict:
+        self.calls.append("append_rows")
+        first = len(self.rows) + 1
+        self.rows.extend(values)
+        return {"updates": {"updatedRange": f"Reports!A{first}:H{len(self.rows)}"}}
+
+
+def test_queue_coalesces_writes_into_one_batch() -> None:
+    connector = SheetsConnector(spreadsheet_key="sheet", flush_interval=0.2)
+    worksheet = _FakeWorksheet([["ID"], ["7", "old"]])
+    connector._with_worksheet = lambda name, action: action(worksheet)  # noqa: SLF001
+
+    async def scenario() -> list:
+        return await asyncio.gather(
+            connector.upsert_row("Reports", 7, ["7", "new"], wait=True),
+            connector.upsert_row("Reports", 9, ["9", "first"], wait=True),
+            connector.upsert_row("Reports", 9, ["9", "second"], wait=True),
+        )
+
+    results = asyncio.run(scenario())
+    connector.close()
+
+    assert results == ["Reports!A2", "Reports!A3", "Reports!A3"]
+    assert worksheet.rows == [["ID"], ["7", "new"], ["9", "second"]]
+    assert worksheet.calls == ["col_values", "batch_update", "append_rows"]
+
+
+def test_failed_flush_is_retried_without_duplicating_rows(monkeypatch) -> None:
+    monkeypatch.setenv("SHEETS_WRITE_RETRY_BASE_DELAY", "0.01")
+    connector = SheetsConnector(spreadsheet_key="sheet", flush_interval=0.01)
+
+    class _FlakyWorksheet(_FakeWorksheet):
+        failures = 1
+
+        def append_rows(self, values: list, value_input_option: str) -> dict:
+            response = super().append_rows(values, value_input_option)
+            if self.failures:
+                # Строки легли, но ответ потерялся (5xx / обрыв соединения)
+                self.failures -= 1
+                raise ConnectionError("connection reset")
+            return response
+
+    worksheet = _FlakyWorksheet([["ID"]])
+    connector._with_worksheet = lambda name, action: action(worksheet)  # noqa: SLF001
+
+    # Вызывающий не ждёт записи (как отчёты requests_service)
+    asyncio.run(connector.upsert_row("Reports", 9, ["9", "row"]))
+    connector.close(5)
+
+    assert worksheet.rows == [["ID"], ["9", "row"]]
+    assert worksheet.calls == ["col_values", "append_rows", "col_values", "batch_update"]
+
+
+def test_worksheet_handles_are_cached_and_reopened_when_stale() -> None:
+    import gspread
+    from google_sheets import WorksheetHandleCache
+
+    opened: list = []
+
+    class _Spreadsheet:
+        def worksheet(self, name: str) -> _FakeWorksheet:
+            opened.append(name)
+            return _FakeWorksheet([["ID"]])
+
+    class _Client:
+        def open_by_key(self, key: str) -> _Spreadsheet:
+            return _Spreadsheet()
+
+    cache = WorksheetHandleCache(ttl=60)
+    first = cache.get(_Client, "sheet", "Reports")
+    assert cache.get(_Client, "sheet", "Reports") is first
+    assert opened == ["Reports"]
+
+    def action(worksheet: _FakeWorksheet) -> str:
+        if worksheet is first:
+            raise gspread.exceptions.WorksheetNotFound("Reports")
+        return "ok"
+
+    assert cache.call(_Client, "sheet", "Reports", action) == "ok"
+    assert opened == ["Reports", "Reports"]
+
+    # Запись при устаревшем листе не повторяется (могла примениться частично),
+    # но лист будет открыт заново при следующем вызове
+    writes: list = []
+
+    def write(worksheet: _FakeWorksheet) -> None:
+        writes.append(worksheet)
+        raise gspread.exceptions.WorksheetNotFound("Reports")
+
+    with pytest.raises(gspread.exceptions.WorksheetNotFound):
+        cache.call(_Client, "sheet", "Reports", write, retry=False)
+    assert len(writes) == 1
+    cache.get(_Client, "sheet", "Reports")
+    assert opened == ["Reports", "Reports", "Reports"]
+
+
+def test_forbidden_is_not_a_stale_handle() -> None:
+    import gspread
+    from google_sheets import is_stale_handle_error
+
+    def api_error(status_code: int) -> gspread.exceptions.APIError:
+        response = Mock(status_code=status_code)
+        response.json.return_value = {"error": {"code": status_code, "message": "error"}}
+        return gspread.exceptions.APIError(response)
+
+    assert is_stale_handle_error(api_error(404))
+    assert not is_stale_handle_error(api_error(403))
+
+
+def test_two_connectors_sharing_a_worksheet_do_not_duplicate_rows() -> None:
+    # Два воркера uvicorn: у каждого свой индекс, лист — общий
+    worksheet = _FakeWorksheet([["ID"]])
+    first = SheetsConnector(spreadsheet_key="sheet", flush_interval=0.01)
+    second = SheetsConnector(spreadsheet_key="sheet", flush_interval=0.01)
+    for connector in (first, second):
+        connector._with_worksheet = lambda name, action: action(worksheet)  # noqa: SLF001
+
+    async def scenario() -> list:
+        # Оба индекса загружены до того, как строка 9 появилась
+        await first.upsert_row("Reports", 7, ["7", "a"], wait=True)
+        await second.upsert_row("Reports", 8, ["8", "b"], wait=True)
+        await first.upsert_row("Reports", 9, ["9", "first"], wait=True)
+        return [
+            await second.upsert_row("Reports", 9, ["9", "second"], wait=True),
+            await first.upsert_row("Reports", 8, ["8", "c"], wait=True),
+        ]
+
+    results = asyncio.run(scenario())
+    first.close()
+    second.close()
+
+    assert results == ["Reports!A4", "Reports!A3"]
+    assert worksheet.rows == [["ID"], ["7", "a"], ["8", "c"], ["9", "second"]]
+
+
+def test_close_keeps_backoff_between_retries(monkeypatch) -> None:
+    monkeypatch.setenv("SHEETS_WRITE_RETRY_BASE_DELAY", "0.2")
+    monkeypatch.setenv("SHEETS_WRITE_MAX_ATTEMPTS", "100")
+    connector = SheetsConnector(spreadsheet_key="sheet", flush_interval=0.01)
+    attempts = []
+
+    def failing(name, action):
+        attempts.append(name)
+        raise ConnectionError("connection reset")
+
+    connector._with_worksheet = failing  # noqa: SLF001
+
+    future = connector._queue.submit("Reports", 9, ["9", "row"])  # noqa: SLF001
+    connector.close(0.5)
+
+    # Без паузы за 0.5 с ушли бы все 100 попыток
+    assert 1 < len(attempts) <= 4
+    with pytest.raises(ConnectionError):
+        future.result(1)
@@ -6,7 +6,9 @@ import logging
 import os
 from typing import Any, Dict
 
-import httpx
+from http_pool import pooled_client, run_sync
+
+from .http_utils import get_api_headers
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +36,7 @@ class ApprovalsClient:
             }
             url = f"{self.base_url}/approvals/start"
             headers = get_api_headers()
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with pooled_client("approvals", self.timeout) as client:
                 response = await client.post(url, json=payload, headers=headers)
                 response.raise_for_status()
                 return response.json()
@@ -45,15 +47,10 @@ class ApprovalsClient:
     def start_approval_chain_sync(self, request_id: int, summary: str) -> Dict[str, Any] | None:
         """
         Synchronous wrapper for start_approval_chain_async.
-        Uses asyncio.run for Django views.
+        Runs on the shared inter-service loop (pooled connections).
         """
-        import asyncio
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        return loop.run_until_complete(self.start_approval_chain_async(request_id, summary))
+        # httpx timeout действует на каждую операцию; на весь вызов даём двойной запас
+        return run_sync(self.start_approval_chain_async(request_id, summary), timeout=self.timeout * 2)
 
     async def get_approval_chain_async(self, request_id: int) -> Dict[str, Any] | None:
         """Get approval chain status for a request."""
@@ -62,7 +59,7 @@ class ApprovalsClient:
 
         try:
             url = f"{self.base_url}/approvals/{request_id}/"
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with pooled_client("approvals", self.timeout) as client:
                 response = await client.get(url)
                 response.raise_for_status()
                 return response.json()
@@ -10,3 +10,14 @@ class RequestStatus(models.TextChoices):
     REJECTED = "rejected", "Отклонена"
     PAID = "paid", "Оплачена"
 
+
+
+class OutboxEventType(models.TextChoices):
+    APPROVAL_START = "approval.start", "Запуск согласования"
+    REQUEST_REPORT = "request.report", "Отчёт в reporting_service"
+
+
+class OutboxEventStatus(models.TextChoices):
+    PENDING = "pending", "Ожидает отправки"
+    SENT = "sent", "Доставлено"
+    FAILED = "failed", "Не доставлено"
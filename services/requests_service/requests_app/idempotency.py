@@ -0,0 +1,95 @@
+"""Idempotency-Key support for unsafe endpoints (create request, attach file)."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import timedelta
+from typing import Any, Callable
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def key_ttl() -> timedelta:
+    return timedelta(seconds=int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400")))
+
+
+def request_fingerprint(data: Any) -> str:
+    """SHA-256 of the request body in canonical JSON form."""
+    body = json.dumps(data, sort_keys=True, ensure_ascii=False, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _replay(record: IdempotencyKey, request_hash: str) -> Response:
+    if record.request_hash != request_hash:
+        return Response(
+            {"detail": "Idempotency-Key уже использован с другим телом запроса."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(record.response_body, status=record.status_code, headers={REPLAYED_HEADER: "true"})
+
+
+def _find(scope: str, key: str) -> IdempotencyKey | None:
+    return IdempotencyKey.objects.filter(scope=scope, key=key, expires_at__gt=timezone.now()).first()
+
+
+def idempotent(request, scope: str, handler: Callable[[], Response]) -> Response:
+    """
+    Run `handler` at most once per (scope, Idempotency-Key).
+
+    Without the header the handler just runs. Otherwise a stored response is
+    replayed; a new successful response is stored in the same transaction as
+    the handler's writes, so a concurrent duplicate rolls back and replays
+    the winner's response instead of creating a second object.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return handler()
+    if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+        return Response(
+            {"detail": "Слишком длинный Idempotency-Key."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    request_hash = request_fingerprint(request.data)
+    record = _find(scope, key)
+    if record is not None:
+        return _replay(record, request_hash)
+
+    try:
+        with transaction.atomic():
+            response = handler()
+            if status.is_success(response.status_code):
+                now = timezone.now()
+                # Просроченный ключ с тем же значением освобождаем под новый запрос
+                IdempotencyKey.objects.filter(scope=scope, key=key, expires_at__lte=now).delete()
+                IdempotencyKey.objects.create(
+                    key=key,
+                    scope=scope,
+                    request_hash=request_hash,
+                    status_code=response.status_code,
+                    response_body=response.data,
+                    expires_at=now + key_ttl(),
+                )
+    except IntegrityError:
+        # Параллельный запрос с тем же ключом успел первым
+        record = _find(scope, key)
+        if record is None:
+            raise
+        return _replay(record, request_hash)
+    return response
+
+
+def purge_expired_keys() -> int:
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,233 @@
+"""
+Benchmark of the hot Request queries with and without the composite indexes.
+
+Seeds synthetic requests (tagged with google_row_id="benchmark-seed", a value
+neither the API nor reporting_service ever writes), then for
+each phase ("without indexes", "with indexes") prints the query plan and
+latency percentiles of the list / retrieve / report queries. The command
+drops the Request indexes, so it only runs with DEBUG on or against a test
+database, needs an explicit database alias and --allow-drop-indexes:
+
+    python manage.py benchmark_request_queries --database default --allow-drop-indexes --rows 1000000
+    python manage.py benchmark_request_queries --database default --allow-drop-indexes --skip-seed --repeat 50
+    python manage.py benchmark_request_queries --database default --cleanup
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from requests_app.choices import RequestStatus
+from requests_app.models import Request
+from requests_app.pagination import encode_cursor, keyset_after
+from requests_app.read_path import detail_queryset, list_queryset
+
+# Метка синтетических заявок: google_row_id пишет только reporting_service
+# (вида "Reports!A5"), через API его не задать — реальные заявки не совпадут
+BENCHMARK_MARKER = "benchmark-seed"
+WAREHOUSES = ("Алматы", "Астана", "Шымкент", "Караганда", "Актобе")
+CATEGORIES = ("Авто", "Офис", "Склад", "IT", "Хозяйственные", "Маркетинг")
+SUBCATEGORIES = ("Ремонт", "Закуп", "Сервис", "Аренда")
+
+
+class Command(BaseCommand):
+    help = (
+        "Наполняет БД синтетическими заявками и замеряет горячие запросы "
+        "(планы и задержки) без составных индексов и с ними. Только для тестовой БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Сколько заявок должно быть в наборе.")
+        parser.add_argument("--users", type=int, default=5_000, help="Сколько разных tg_user_id.")
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Размер пачки bulk_create.")
+        parser.add_argument("--repeat", type=int, default=20, help="Сколько раз выполнять каждый запрос.")
+        parser.add_argument("--seed", type=int, default=42, help="Seed генератора (воспроизводимость).")
+        parser.add_argument("--database", required=True, help="Алиас БД из settings.DATABASES (обязателен).")
+        parser.add_argument(
+            "--allow-drop-indexes",
+            action="store_true",
+            help="Подтверждение: индексы Request будут удалены на время замера.",
+        )
+        parser.add_argument("--skip-seed", action="store_true", help="Не досоздавать данные.")
+        parser.add_argument("--cleanup", action="store_true", help="Удалить синтетические заявки и выйти.")
+
+    def handle(self, *args, **options):
+        self.using = options["database"]
+        self.connection = connections[self.using]
+        if not (settings.DEBUG or self._is_test_database()):
+            raise CommandError("Команда удаляет индексы: запускайте только с DJANGO_DEBUG=true или на тестовой БД.")
+        benchmark_rows = Request.objects.using(self.using).filter(google_row_id=BENCHMARK_MARKER)
+
+        if options["cleanup"]:
+            deleted, _ = benchmark_rows.delete()
+            self.stdout.write(f"Deleted {deleted} benchmark row(s).")
+            return
+
+        if not options["allow_drop_indexes"]:
+            raise CommandError("Замер удаляет индексы Request: подтвердите флагом --allow-drop-indexes.")
+
+        rng = random.Random(options["seed"])
+        if not options["skip_seed"]:
+            self._seed(rng, options["rows"] - benchmark_rows.count(), options["users"], options["batch_size"])
+        if not benchmark_rows.exists():
+            raise CommandError("Нет синтетических заявок: запустите без --skip-seed.")
+
+        queries = self._queries(rng, options["users"])
+        results: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        try:
+            self._drop_indexes()
+            results["without indexes"] = self._run_phase("without indexes", queries, options["repeat"])
+        finally:
+            self._create_indexes()
+        results["with indexes"] = self._run_phase("with indexes", queries, options["repeat"])
+        self._print_summary(results)
+
+    def _is_test_database(self) -> bool:
+        # Тест-раннер Django переименовывает БД в test_* (SQLite — в памяти)
+        name = str(self.connection.settings_dict["NAME"])
+        if self.connection.vendor == "sqlite" and self.connection.is_in_memory_db():
+            return True
+        return name.startswith("test_")
+
+    # -- data ---------------------------------------------------------------
+
+    def _seed(self, rng: random.Random, missing: int, users: int, batch_size: int) -> None:
+        if missing <= 0:
+            return
+        self.stdout.write(f"Seeding {missing} request(s)...")
+        now = timezone.now()
+        statuses = list(RequestStatus.values)
+        created = 0
+        started = time.perf_counter()
+        rows = Request.objects.using(self.using)
+        while created < missing:
+            size = min(batch_size, missing - created)
+            batch = rows.bulk_create(
+                Request(
+                    tg_user_id=rng.randint(1, users),
+                    warehouse=rng.choice(WAREHOUSES),
+                    category=rng.choice(CATEGORIES),
+                    subcategory=rng.choice(SUBCATEGORIES),
+                    amount=Decimal(rng.randint(1_000, 5_000_000)) / 100,
+                    status=rng.choice(statuses),
+                    google_row_id=BENCHMARK_MARKER,
+                )
+                for _ in range(size)
+            )
+            # created_at — auto_now_add, bulk_create ставит «сейчас»; разносим
+            # даты на два года отдельным UPDATE, не трогая поле модели
+            for request_obj in batch:
+                request_obj.created_at = now - timedelta(seconds=rng.randint(0, 730 * 86400))
+            rows.bulk_update(batch, ["created_at"], batch_size=1_000)
+            created += size
+            self.stdout.write(f"  {created}/{missing}")
+        self._analyze()
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s.")
+
+    def _queries(self, rng: random.Random, users: int) -> List[Tuple[str, Callable[[], object]]]:
+        rows = Request.objects.using(self.using)
+        user_id = rng.randint(1, users)
+        # Строка примерно на 500-й странице общего списка — для курсора «глубокой» страницы
+        sample = rows.order_by("-created_at", "-id").only("id", "created_at")[10_000 if rows.count() > 10_000 else 0]
+        cursor_filter = keyset_after(sample.created_at, sample.pk)
+        since = timezone.now() - timedelta(days=30)
+        warehouse, category = rng.choice(WAREHOUSES), rng.choice(CATEGORIES)
+        ordered = ("-created_at", "-id")
+        self.stdout.write(f"Deep-page cursor: {encode_cursor(sample.created_at, sample.pk)}")
+        return [
+            ("list by user", lambda: list(list_queryset(rows.filter(tg_user_id=user_id)).order_by(*ordered)[:21])),
+            ("list by status", lambda: list(list_queryset(rows.filter(status=RequestStatus.IN_PROGRESS)).order_by(*ordered)[:21])),
+            ("list all, deep page", lambda: list(list_queryset(rows.filter(cursor_filter)).order_by(*ordered)[:21])),
+            ("retrieve", lambda: detail_queryset(rows).get(pk=sample.pk)),
+            (
+                "report warehouse/category, 30 days",
+                lambda: rows.filter(warehouse=warehouse, category=category, created_at__gte=since).aggregate(
+                    total=Sum("amount"), count=Count("id")
+                ),
+            ),
+        ]
+
+    # -- indexes ------------------------------------------------------------
+
+    def _drop_indexes(self) -> None:
+        with self.connection.schema_editor() as editor:
+            for index in Request._meta.indexes:
+                editor.remove_index(Request, index)
+        self._analyze()
+
+    def _create_indexes(self) -> None:
+        existing = set(self.connection.introspection.get_constraints(
+            self.connection.cursor(), Request._meta.db_table
+        ))
+        with self.connection.schema_editor() as editor:
+            for index in Request._meta.indexes:
+                if index.name not in existing:
+                    editor.add_index(Request, index)
+        self._analyze()
+
+    def _analyze(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Request._meta.db_table}")
+
+    # -- measurements -------------------------------------------------------
+
+    def _explain(self, query: Callable[[], object]) -> str:
+        """Plan of the SQL the query issues (its first statement)."""
+        self._captured: List[Tuple[str, tuple]] = []
+        with self.connection.execute_wrapper(self._capture):
+            query()
+        sql, params = self._captured[0]
+        prefix = "EXPLAIN QUERY PLAN" if self.connection.vendor == "sqlite" else "EXPLAIN"
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+
+    def _capture(self, execute, sql, params, many, context):
+        self._captured.append((sql, params))
+        return execute(sql, params, many, context)
+
+    def _run_phase(
+        self,
+        phase: str,
+        queries: List[Tuple[str, Callable[[], object]]],
+        repeat: int,
+    ) -> Dict[str, Tuple[float, float]]:
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {phase} =="))
+        results: Dict[str, Tuple[float, float]] = {}
+        for name, query in queries:
+            self.stdout.write(self.style.MIGRATE_LABEL(f"\n{name}"))
+            self.stdout.write(self._explain(query))
+            query()  # прогрев кеша страниц
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p50 = statistics.median(timings)
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            results[name] = (p50, p95)
+            self.stdout.write(f"p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+        return results
+
+    def _print_summary(self, results: Dict[str, Dict[str, Tuple[float, float]]]) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== summary (p50 / p95, ms) =="))
+        before, after = results["without indexes"], results["with indexes"]
+        width = max(len(name) for name in before)
+        for name, (p50, p95) in before.items():
+            new_p50, new_p95 = after[name]
+            speedup = p50 / new_p50 if new_p50 else float("inf")
+            self.stdout.write(
+                f"{name.ljust(width)}  {p50:9.2f} / {p95:9.2f}  ->  {new_p50:9.2f} / {new_p95:9.2f}  (x{speedup:.1f})"
+            )
@@ -0,0 +1,15 @@
+"""Delete expired Idempotency-Key records."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from requests_app.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Удаляет просроченные ключи идемпотентности (запускать по расписанию)."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(f"Deleted {deleted} expired idempotency key(s).")
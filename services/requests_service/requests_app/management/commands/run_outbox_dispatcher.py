@@ -0,0 +1,69 @@
+"""Worker that delivers outbox events to approvals_service / reporting_service."""
+
+from __future__ import annotations
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from requests_app.outbox import OutboxDispatcher, requeue_failed
+
+
+class Command(BaseCommand):
+    help = "Доставляет события outbox (согласование, отчёты) во внешние сервисы."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать одну пачку событий и выйти.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0")),
+            help="Пауза между опросами, когда очередь пуста (секунды).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Сколько событий забирать за один проход.",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Вернуть в очередь события, исчерпавшие попытки (например, старт "
+            "согласования заявки, оставшейся NEW), перед запуском.",
+        )
+        parser.add_argument(
+            "--request-id",
+            type=int,
+            default=None,
+            help="С --retry-failed: только события этой заявки.",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            requeued = requeue_failed(options["request_id"])
+            self.stdout.write(f"Requeued {requeued} failed outbox event(s).")
+
+        dispatcher = OutboxDispatcher(batch_size=options["batch_size"])
+
+        if options["once"]:
+            processed = dispatcher.dispatch_batch()
+            self.stdout.write(f"Processed {processed} outbox event(s).")
+            return
+
+        self.stdout.write("Outbox dispatcher started.")
+        try:
+            while True:
+                close_old_connections()
+                processed = dispatcher.dispatch_batch()
+                # Пока есть работа, забираем следующую пачку без паузы
+                if processed < dispatcher.batch_size:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Outbox dispatcher stopped.")
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('approval.start', 'Запуск согласования'), ('request.report', 'Отчёт в reporting_service')], help_text='Тип события (определяет, куда и как его доставлять)', max_length=50)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Данные, зафиксированные на момент создания события')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('sent', 'Доставлено'), ('failed', 'Не доставлено')], default='pending', help_text='Статус доставки', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Сколько раз пытались доставить событие')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Не раньше какого времени делать следующую попытку')),
+                ('last_error', models.TextField(blank=True, help_text='Текст последней ошибки доставки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Когда событие было записано')),
+                ('sent_at', models.DateTimeField(blank=True, help_text='Когда событие было успешно доставлено', null=True)),
+                ('request', models.ForeignKey(help_text='Заявка, к которой относится событие', on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='requests_app.request')),
+            ],
+            options={
+                'verbose_name': 'Исходящее событие',
+                'verbose_name_plural': 'Исходящие события',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests_app', '0002_outbox_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='dedupe_key',
+            field=models.CharField(blank=True, help_text='Ключ схлопывания: пока событие ждёт отправки, второе такое же не создаётся', max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:36
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests_app', '0003_outbox_event_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Значение заголовка Idempotency-Key', max_length=255)),
+                ('scope', models.CharField(help_text='Операция, к которой относится ключ (например, requests.create)', max_length=100)),
+                ('request_hash', models.CharField(help_text='SHA-256 тела запроса: тот же ключ с другим телом — ошибка клиента', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(help_text='HTTP-статус сохранённого ответа')),
+                ('response_body', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Тело сохранённого ответа')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Когда ключ был использован впервые')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='После этого момента ключ можно использовать заново')),
+            ],
+            options={
+                'verbose_name': 'Ключ идемпотентности',
+                'verbose_name_plural': 'Ключи идемпотентности',
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='idempotency_scope_key_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests_app', '0004_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['tg_user_id', '-created_at', '-id'], name='request_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='request_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['-created_at', '-id'], name='request_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['warehouse', 'category', 'created_at'], name='request_wh_cat_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests_app', '0005_request_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='status_version',
+            field=models.PositiveIntegerField(default=0, help_text='Номер последнего применённого перехода согласования (переходы с меньшим номером игнорируются)'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 # requests_app/models.py
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
-from .choices import RequestStatus
+from .choices import OutboxEventStatus, OutboxEventType, RequestStatus
 
 
 class Request(models.Model):
@@ -90,6 +92,11 @@ class Request(models.Model):
         help_text="Текущий уровень согласования (0 - ещё не отправлено на согласование)",
     )
 
+    status_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Номер последнего применённого перехода согласования (переходы с меньшим номером игнорируются)",
+    )
+
     google_row_id = models.CharField(
         max_length=50,
         blank=True,
@@ -107,6 +114,26 @@ class Request(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        # Индексы под горячие запросы: список заявок пользователя и фильтр по
+        # статусу (keyset по created_at, id), общий список и отчёты по складу/категории
+        indexes = [
+            models.Index(
+                fields=("tg_user_id", "-created_at", "-id"),
+                name="request_user_created_idx",
+            ),
+            models.Index(
+                fields=("status", "-created_at", "-id"),
+                name="request_status_created_idx",
+            ),
+            models.Index(
+                fields=("-created_at", "-id"),
+                name="request_created_idx",
+            ),
+            models.Index(
+                fields=("warehouse", "category", "created_at"),
+                name="request_wh_cat_created_idx",
+            ),
+        ]
         verbose_name = "Заявка"
         verbose_name_plural = "Заявки"
 
@@ -195,3 +222,125 @@ class Attachment(models.Model):
         return f"Файл {self.file_name} для заявки #{self.request_id}"
 
 
+class OutboxEvent(models.Model):
+    """
+    Событие для внешних сервисов (approvals_service / reporting_service).
+
+    Пишется в той же транзакции, что и сама заявка, а доставляется отдельным
+    воркером (`manage.py run_outbox_dispatcher`) пачками и с повторами.
+    """
+
+    request = models.ForeignKey(
+        Request,
+        on_delete=models.CASCADE,
+        related_name="outbox_events",
+        help_text="Заявка, к которой относится событие",
+    )
+    event_type = models.CharField(
+        max_length=50,
+        choices=OutboxEventType.choices,
+        help_text="Тип события (определяет, куда и как его доставлять)",
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Данные, зафиксированные на момент создания события",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=OutboxEventStatus.choices,
+        default=OutboxEventStatus.PENDING,
+        help_text="Статус доставки",
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Сколько раз пытались доставить событие",
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Не раньше какого времени делать следующую попытку",
+    )
+    last_error = models.TextField(
+        blank=True,
+        help_text="Текст последней ошибки доставки",
+    )
+    dedupe_key = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text="Ключ схлопывания: пока событие ждёт отправки, второе такое же не создаётся",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Когда событие было записано",
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Когда событие было успешно доставлено",
+    )
+
+    class Meta:
+        ordering = ("id",)
+        indexes = [
+            models.Index(
+                fields=("status", "next_attempt_at"),
+                name="outbox_status_due_idx",
+            ),
+        ]
+        verbose_name = "Исходящее событие"
+        verbose_name_plural = "Исходящие события"
+
+    def __str__(self) -> str:
+        return f"{self.event_type} для заявки #{self.request_id} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Сохранённый ответ на запрос с заголовком Idempotency-Key.
+
+    Повтор запроса с тем же ключом (бот повторяет POST после таймаута)
+    получает этот ответ, а не создаёт вторую заявку.
+    """
+
+    key = models.CharField(
+        max_length=255,
+        help_text="Значение заголовка Idempotency-Key",
+    )
+    scope = models.CharField(
+        max_length=100,
+        help_text="Операция, к которой относится ключ (например, requests.create)",
+    )
+    request_hash = models.CharField(
+        max_length=64,
+        help_text="SHA-256 тела запроса: тот же ключ с другим телом — ошибка клиента",
+    )
+    status_code = models.PositiveSmallIntegerField(
+        help_text="HTTP-статус сохранённого ответа",
+    )
+    response_body = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        help_text="Тело сохранённого ответа",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Когда ключ был использован впервые",
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="После этого момента ключ можно использовать заново",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("scope", "key"),
+                name="idempotency_scope_key_uniq",
+            ),
+        ]
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+
+    def __str__(self) -> str:
+        return f"{self.scope}:{self.key}"
@@ -0,0 +1,227 @@
+"""Transactional outbox for approvals_service / reporting_service fan-out."""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from .approvals_client import get_approvals_client
+from .choices import OutboxEventStatus, OutboxEventType
+from .models import OutboxEvent, Request
+from .reporting_client import get_reporting_client
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDeliveryError(Exception):
+    """Raised by a handler when the upstream did not accept the event."""
+
+
+def enqueue_event(
+    request_obj: Request,
+    event_type: str,
+    payload: Dict[str, Any] | None = None,
+) -> OutboxEvent:
+    """
+    Record an event for later delivery.
+    Must be called inside the same transaction that changes the request.
+    """
+    return OutboxEvent.objects.create(
+        request=request_obj,
+        event_type=event_type,
+        payload=payload or {},
+    )
+
+
+def schedule_report(request_obj: Request) -> OutboxEvent:
+    """
+    Schedule a report of the request to reporting_service.
+
+    Reports are coalesced: while a report event for the request is still
+    waiting in the outbox, further changes reuse it (the dispatcher always
+    sends the state of the request at delivery time).
+    """
+    event, _ = OutboxEvent.objects.get_or_create(
+        dedupe_key=f"{OutboxEventType.REQUEST_REPORT}:{request_obj.pk}",
+        defaults={
+            "request": request_obj,
+            "event_type": OutboxEventType.REQUEST_REPORT,
+        },
+    )
+    return event
+
+
+def schedule_reports(request_ids: Iterable[int]) -> None:
+    """
+    Batch variant of schedule_report for changes made with QuerySet.update()
+    (no post_save): one INSERT, reports still waiting in the outbox are kept.
+    """
+    OutboxEvent.objects.bulk_create(
+        [
+            OutboxEvent(
+                request_id=request_id,
+                event_type=OutboxEventType.REQUEST_REPORT,
+                dedupe_key=f"{OutboxEventType.REQUEST_REPORT}:{request_id}",
+            )
+            for request_id in request_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue_request_created(request_obj: Request) -> OutboxEvent:
+    """
+    Event for a freshly created request: start the approval chain.
+    The report is scheduled by the post_save signal.
+    """
+    return enqueue_event(
+        request_obj,
+        OutboxEventType.APPROVAL_START,
+        {"summary": request_obj.build_summary_text()},
+    )
+
+
+def _deliver_approval_start(event: OutboxEvent) -> None:
+    client = get_approvals_client()
+    if not client.enabled:
+        return
+    result = client.start_approval_chain_sync(event.request_id, event.payload.get("summary", ""))
+    if result is None:
+        raise OutboxDeliveryError("approvals_service did not start the chain")
+
+
+def _deliver_report(event: OutboxEvent) -> None:
+    client = get_reporting_client()
+    if not client.enabled:
+        return
+    # Отправляем актуальное состояние заявки на момент доставки
+    result = client.report_request_sync(event.request)
+    if result is None:
+        raise OutboxDeliveryError("reporting_service did not accept the report")
+
+
+def requeue_failed(request_id: int | None = None) -> int:
+    """
+    Return failed events to the queue with a fresh attempt budget. Safe for
+    every event type: approval start and reports are idempotent upstream.
+    """
+    events = OutboxEvent.objects.filter(status=OutboxEventStatus.FAILED)
+    if request_id is not None:
+        events = events.filter(request_id=request_id)
+    return events.update(
+        status=OutboxEventStatus.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+    )
+
+
+class OutboxDispatcher:
+    """
+    Delivers pending outbox events in batches.
+
+    Each batch is claimed in a short transaction (rows are leased by moving
+    `next_attempt_at` forward, locked rows of other workers are skipped), then
+    delivered outside of it so slow upstreams never hold DB locks. Failed
+    events are retried with exponential backoff until `max_attempts`.
+    """
+
+    handlers: Dict[str, Callable[[OutboxEvent], None]] = {
+        OutboxEventType.APPROVAL_START: _deliver_approval_start,
+        OutboxEventType.REQUEST_REPORT: _deliver_report,
+    }
+
+    def __init__(
+        self,
+        *,
+        batch_size: int | None = None,
+        max_attempts: int | None = None,
+        retry_base_delay: float | None = None,
+        retry_max_delay: float | None = None,
+        lease_seconds: float | None = None,
+    ) -> None:
+        self.batch_size = batch_size or int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+        self.max_attempts = max_attempts or int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+        self.retry_base_delay = retry_base_delay or float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "5.0"))
+        self.retry_max_delay = retry_max_delay or float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "600.0"))
+        self.lease_seconds = lease_seconds or float(os.getenv("OUTBOX_LEASE_SECONDS", "120.0"))
+
+    def dispatch_batch(self) -> int:
+        """Deliver one batch of due events. Returns the number of events processed."""
+        events = self._claim_batch()
+        reported: set[int] = set()
+        for event in events:
+            if event.event_type == OutboxEventType.REQUEST_REPORT:
+                # Несколько отчётов по одной заявке в пачке — отправляем один
+                if event.request_id in reported:
+                    self._mark_sent(event, event.attempts)
+                    continue
+                reported.add(event.request_id)
+            self._deliver(event)
+        return len(events)
+
+    def _claim_batch(self) -> List[OutboxEvent]:
+        now = timezone.now()
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True, of=("self",))
+                .select_related("request")
+                .filter(status=OutboxEventStatus.PENDING, next_attempt_at__lte=now)
+                .order_by("id")[: self.batch_size]
+            )
+            if events:
+                # Снимаем dedupe_key: изменения заявки после этого момента
+                # должны породить новое событие, а не схлопнуться с уже взятым.
+                OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds),
+                    dedupe_key=None,
+                )
+        return events
+
+    def _deliver(self, event: OutboxEvent) -> None:
+        handler = self.handlers.get(event.event_type)
+        attempts = event.attempts + 1
+        try:
+            if handler is None:
+                raise OutboxDeliveryError(f"No handler for event type {event.event_type!r}")
+            handler(event)
+        except Exception as exc:
+            self._mark_failed_attempt(event, attempts, exc)
+            return
+        self._mark_sent(event, attempts)
+
+    def _mark_sent(self, event: OutboxEvent, attempts: int) -> None:
+        OutboxEvent.objects.filter(pk=event.pk).update(
+            status=OutboxEventStatus.SENT,
+            attempts=attempts,
+            sent_at=timezone.now(),
+            last_error="",
+        )
+
+    def _mark_failed_attempt(self, event: OutboxEvent, attempts: int, exc: Exception) -> None:
+        if attempts >= self.max_attempts:
+            logger.error(
+                f"Outbox event {event.pk} ({event.event_type}) for request {event.request_id} "
+                f"failed after {attempts} attempts: {exc}"
+            )
+            OutboxEvent.objects.filter(pk=event.pk).update(
+                status=OutboxEventStatus.FAILED,
+                attempts=attempts,
+                last_error=str(exc),
+            )
+            return
+
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        logger.warning(
+            f"Outbox event {event.pk} ({event.event_type}) for request {event.request_id} "
+            f"failed (attempt {attempts}/{self.max_attempts}): {exc}. Retrying in {delay}s..."
+        )
+        OutboxEvent.objects.filter(pk=event.pk).update(
+            attempts=attempts,
+            next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            last_error=str(exc),
+        )
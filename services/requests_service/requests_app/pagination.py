@@ -0,0 +1,87 @@
+"""Keyset (created_at, id) pagination for the request list."""
+
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import Any, List, Tuple
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split("|")
+        parsed = parse_datetime(created_at)
+        if parsed is None:
+            raise ValueError(created_at)
+        return parsed, int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValidationError({"cursor": "Неверный курсор."}) from exc
+
+
+def keyset_after(created_at: datetime, pk: int) -> Q:
+    """
+    Rows strictly after (created_at, pk) in (-created_at, -id) order.
+    The redundant created_at <= bound lets the planner seek the index
+    instead of scanning it (the OR alone is not sargable).
+    """
+    return Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+
+
+class RequestKeysetPagination(BasePagination):
+    """
+    Newest first, ordered by (created_at, id). The next page starts strictly
+    after the last row of the previous one, so a page costs one indexed range
+    scan however deep the user scrolls, and new requests never shift pages.
+
+    Response: {"results": [...], "next_cursor": str | None, "has_next": bool}.
+    """
+
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request) -> int:
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            page_size = int(value)
+        except ValueError as exc:
+            raise ValidationError({"page_size": "Ожидается целое число."}) from exc
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> List[Any]:
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        queryset = queryset.order_by("-created_at", "-id")
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            queryset = queryset.filter(keyset_after(created_at, pk))
+        # Одна лишняя строка говорит, есть ли следующая страница, без COUNT(*)
+        rows = list(queryset[: page_size + 1])
+        self.has_next = len(rows) > page_size
+        page = rows[:page_size]
+        self.next_cursor = encode_cursor(page[-1].created_at, page[-1].pk) if self.has_next else None
+        return page
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(
+            {
+                "results": data,
+                "next_cursor": self.next_cursor,
+                "has_next": self.has_next,
+            }
+        )
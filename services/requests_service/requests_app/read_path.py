@@ -0,0 +1,102 @@
+"""
+Query-optimised read path for requests.
+
+Querysets load only the columns the response needs and prefetch attachments
+in one extra query, so a page costs a constant number of queries whatever
+its size. Rows are rendered by a flat fast path: the field objects of the
+DRF serializers are bound once and applied directly to each row (no
+per-row serializer instances, no nested serializer for attachments), which
+keeps the output identical to RequestListSerializer / RequestDetailSerializer.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from django.db.models import Prefetch, QuerySet
+from rest_framework.fields import Field
+
+from .models import Attachment, Request
+from .serializers import AttachmentSerializer, RequestDetailSerializer, RequestListSerializer
+
+# Поля, которые считаются не из колонок, а из методов модели
+_COMPUTED = {"status_display", "summary_text", "attachments"}
+
+# Колонки, которые нужны build_summary_text() сверх полей ответа
+_SUMMARY_COLUMNS = ("subsubcategory", "extra_value", "goal", "item_name", "quantity", "comment")
+
+
+def _columns(serializer_class) -> Tuple[str, ...]:
+    return tuple(name for name in serializer_class.Meta.fields if name not in _COMPUTED)
+
+
+LIST_COLUMNS = _columns(RequestListSerializer)
+DETAIL_COLUMNS = tuple(dict.fromkeys(_columns(RequestDetailSerializer) + _SUMMARY_COLUMNS))
+ATTACHMENT_COLUMNS = _columns(AttachmentSerializer)
+
+
+@lru_cache(maxsize=None)
+def _bound_fields(serializer_class) -> Tuple[Tuple[str, Field | None], ...]:
+    """Serializer fields in output order; computed fields are marked with None."""
+    fields = serializer_class().fields
+    return tuple((name, None if name in _COMPUTED else field) for name, field in fields.items())
+
+
+def _render(
+    obj: Any,
+    fields: Tuple[Tuple[str, Field | None], ...],
+    computed: Dict[str, Callable[[Any], Any]] | None = None,
+) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for name, field in fields:
+        if field is None:
+            data[name] = computed[name](obj)
+            continue
+        value = getattr(obj, field.source)
+        data[name] = None if value is None else field.to_representation(value)
+    return data
+
+
+def _attachments(request_obj: Request) -> List[Dict[str, Any]]:
+    fields = _bound_fields(AttachmentSerializer)
+    return [_render(attachment, fields) for attachment in request_obj.attachments.all()]
+
+
+_LIST_COMPUTED = {"status_display": Request.get_status_display}
+_DETAIL_COMPUTED = {
+    "status_display": Request.get_status_display,
+    "summary_text": Request.build_summary_text,
+    "attachments": _attachments,
+}
+
+
+def list_queryset(queryset: QuerySet[Request]) -> QuerySet[Request]:
+    return queryset.only(*LIST_COLUMNS)
+
+
+def detail_queryset(queryset: QuerySet[Request]) -> QuerySet[Request]:
+    return queryset.only(*DETAIL_COLUMNS).prefetch_related(
+        Prefetch(
+            "attachments",
+            queryset=Attachment.objects.only("request", *ATTACHMENT_COLUMNS).order_by("id"),
+        )
+    )
+
+
+def render_list_item(request_obj: Request) -> Dict[str, Any]:
+    """Same output as RequestListSerializer."""
+    return _render(request_obj, _bound_fields(RequestListSerializer), _LIST_COMPUTED)
+
+
+def render_detail(request_obj: Request) -> Dict[str, Any]:
+    """
+    Same output as RequestDetailSerializer. Attachments should be prefetched
+    (detail_queryset), otherwise they cost one query for this request.
+    """
+    return _render(request_obj, _bound_fields(RequestDetailSerializer), _DETAIL_COMPUTED)
+
+
+def render_list(rows: Iterable[Request], *, detail: bool = False) -> List[Dict[str, Any]]:
+    render = render_detail if detail else render_list_item
+    return [render(row) for row in rows]
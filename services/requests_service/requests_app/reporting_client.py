@@ -6,7 +6,7 @@ import logging
 import os
 from typing import Any, Dict
 
-import httpx
+from http_pool import pooled_client, run_sync
 
 from .http_utils import get_api_headers
 
@@ -43,15 +43,10 @@ class ReportingClient:
             }
             url = f"{self.base_url}/reports/requests"
             headers = get_api_headers()
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with pooled_client("reporting", self.timeout) as client:
                 response = await client.post(url, json=payload, headers=headers)
                 response.raise_for_status()
-                result = response.json()
-                # Сохраняем google_row_id если вернулся
-                if "google_row_id" in result:
-                    request_obj.google_row_id = result["google_row_id"]
-                    request_obj.save(update_fields=["google_row_id"])
-                return result
+                return response.json()
         except Exception as exc:
             logger.error(f"Failed to report request {request_obj.id} to reporting_service: {exc}")
             return None
@@ -59,15 +54,25 @@ class ReportingClient:
     def report_request_sync(self, request_obj: "Request") -> Dict[str, Any] | None:
         """
         Synchronous wrapper for report_request_async.
-        Uses asyncio.run for Django views.
+        Runs on the shared inter-service loop (pooled connections).
         """
-        import asyncio
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        return loop.run_until_complete(self.report_request_async(request_obj))
+        # httpx timeout действует на каждую операцию; на весь вызов даём двойной запас
+        result = run_sync(self.report_request_async(request_obj), timeout=self.timeout * 2)
+        if result:
+            self._store_row_id(request_obj, result.get("google_row_id"))
+        return result
+
+    def _store_row_id(self, request_obj: "Request", row_id: str | None) -> None:
+        """
+        Save google_row_id returned by reporting_service.
+        Uses a queryset update so post_save (and a new report) is not triggered.
+        """
+        if not row_id or request_obj.google_row_id == row_id:
+            return
+        from .models import Request
+
+        Request.objects.filter(pk=request_obj.pk).update(google_row_id=row_id)
+        request_obj.google_row_id = row_id
 
     def _build_history(self, request_obj: "Request") -> str:
         """Build history string from request data."""
@@ -13,6 +13,16 @@ class AttachmentSerializer(serializers.ModelSerializer):
         fields = ("id", "file_url", "storage_path", "file_name", "created_at")
 
 
+class AttachmentCreateSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для привязки файла к заявке после загрузки в файловый сервис.
+    """
+
+    class Meta:
+        model = Attachment
+        fields = ("file_url", "storage_path", "file_name")
+
+
 class RequestCreateSerializer(serializers.ModelSerializer):
     """
     Сериализатор для создания заявки из бота.
@@ -22,8 +32,12 @@ class RequestCreateSerializer(serializers.ModelSerializer):
     - warehouse, category, subcategory, subsubcategory
     - extra_value, goal, item_name, quantity
     - amount, comment
+    - attachments (необязательно): файлы, уже загруженные в файловый сервис,
+      сохраняются вместе с заявкой
     """
 
+    attachments = AttachmentCreateSerializer(many=True, required=False, write_only=True)
+
     class Meta:
         model = Request
         fields = (
@@ -40,6 +54,7 @@ class RequestCreateSerializer(serializers.ModelSerializer):
             "quantity",
             "amount",
             "comment",
+            "attachments",
         )
 
     def validate_amount(self, value):
@@ -50,13 +65,45 @@ class RequestCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """
-        На этапе создания статус всегда 'new', current_level = 0.
+        На этапе создания статус всегда 'new', current_level = 0;
+        in_progress ставит approvals_service после старта цепочки.
         Всё остальное — из validated_data.
+        Вложения пишутся одним INSERT; транзакцию открывает view.
         """
+        attachments = validated_data.pop("attachments", [])
         request_obj = Request.objects.create(**validated_data)
+        if attachments:
+            Attachment.objects.bulk_create(
+                Attachment(request=request_obj, **attachment) for attachment in attachments
+            )
         return request_obj
 
 
+class RequestListSerializer(serializers.ModelSerializer):
+    """
+    Облегчённый сериализатор для списка заявок: без вложений и текста
+    сводки, чтобы страница не тянула лишние запросы и данные.
+    """
+
+    status_display = serializers.CharField(
+        source="get_status_display",
+        read_only=True,
+    )
+
+    class Meta:
+        model = Request
+        fields = (
+            "id",
+            "warehouse",
+            "category",
+            "subcategory",
+            "amount",
+            "status",
+            "status_display",
+            "created_at",
+        )
+
+
 class RequestDetailSerializer(serializers.ModelSerializer):
     """
     Подробный сериализатор для чтения заявки.
@@ -127,11 +174,23 @@ class RequestUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
-class AttachmentCreateSerializer(serializers.ModelSerializer):
+class RequestTransitionSerializer(serializers.Serializer):
     """
-    Сериализатор для привязки файла к заявке после загрузки в файловый сервис.
+    Переход статуса от approvals_service (POST /requests/{id}/transition/).
+    version — номер перехода цепочки согласования: применяется, только если
+    он больше уже применённого (повторы и запоздавшие переходы игнорируются).
     """
 
-    class Meta:
-        model = Attachment
-        fields = ("file_url", "storage_path", "file_name")
+    status = serializers.ChoiceField(choices=RequestStatus.choices)
+    current_level = serializers.IntegerField(min_value=0)
+    version = serializers.IntegerField(min_value=1)
+
+
+class RequestTransitionItemSerializer(RequestTransitionSerializer):
+    id = serializers.IntegerField(min_value=1)
+
+
+class RequestTransitionBatchSerializer(serializers.Serializer):
+    """Пачка переходов (POST /requests/transitions/)."""
+
+    transitions = RequestTransitionItemSerializer(many=True, allow_empty=False, max_length=500)
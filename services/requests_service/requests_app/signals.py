@@ -8,7 +8,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from .models import Request
-from .reporting_client import get_reporting_client
+from .outbox import schedule_report
 
 logger = logging.getLogger(__name__)
 
@@ -16,16 +16,13 @@ logger = logging.getLogger(__name__)
 @receiver(post_save, sender=Request)
 def update_reporting_service(sender, instance: Request, created: bool, **kwargs):
     """
-    Automatically update reporting_service when request is created or updated.
+    Schedule a (coalesced) report to reporting_service when request is created or updated.
+    The event is written in the same transaction as the change itself.
     """
-    try:
-        reporting_client = get_reporting_client()
-        reporting_client.report_request_sync(instance)
-    except Exception as exc:
-        logger.error(f"Failed to sync request {instance.id} to reporting_service: {exc}")
-
-
-
-
-
-
+    if kwargs.get("raw"):
+        return
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and set(update_fields) <= {"google_row_id"}:
+        # Запись google_row_id — результат самого отчёта, повторно не отправляем
+        return
+    schedule_report(instance)
@@ -0,0 +1,67 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TransactionTestCase
+
+from requests_app.management.commands.benchmark_request_queries import Command
+from requests_app.models import Request
+
+
+class BenchmarkCommandTests(TransactionTestCase):
+    def test_benchmark_runs_both_phases_and_restores_indexes(self) -> None:
+        out = StringIO()
+        call_command(
+            "benchmark_request_queries",
+            database="default",
+            allow_drop_indexes=True,
+            rows=300,
+            users=10,
+            repeat=1,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn("== without indexes ==", output)
+        self.assertIn("== with indexes ==", output)
+        self.assertIn("list by user", output)
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Request._meta.db_table)
+        for index in Request._meta.indexes:
+            self.assertIn(index.name, constraints)
+
+        # Даты разнесены по двум годам, а не проставлены моментом наполнения
+        self.assertGreater(Request.objects.dates("created_at", "month").count(), 1)
+
+        # Реальная заявка пользователя с ником benchmark не синтетическая
+        real = Request.objects.create(
+            tg_user_id=1,
+            author_username="benchmark",
+            warehouse="Алматы",
+            category="Авто",
+            subcategory="Ремонт",
+            amount="10.00",
+        )
+        call_command("benchmark_request_queries", database="default", cleanup=True, stdout=StringIO())
+        self.assertEqual(list(Request.objects.values_list("pk", flat=True)), [real.pk])
+        self.assertTrue(Request._meta.get_field("created_at").auto_now_add)
+
+    def test_benchmark_requires_explicit_database_and_confirmation(self) -> None:
+        with self.assertRaises(CommandError):
+            call_command("benchmark_request_queries", rows=10, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "--allow-drop-indexes"):
+            call_command("benchmark_request_queries", database="default", rows=10, stdout=StringIO())
+        self.assertFalse(Request.objects.exists())
+
+    def test_benchmark_refuses_outside_debug_and_test_database(self) -> None:
+        with mock.patch.object(Command, "_is_test_database", return_value=False):
+            with self.assertRaisesMessage(CommandError, "DJANGO_DEBUG"):
+                call_command(
+                    "benchmark_request_queries",
+                    database="default",
+                    allow_drop_indexes=True,
+                    stdout=StringIO(),
+                )
@@ -0,0 +1,41 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import httpx
+from django.test import SimpleTestCase
+
+from circuit_breaker import CircuitOpenError, get_breaker
+from http_pool import pooled_client, run_sync
+
+
+async def _client_of(name: str):
+    async with pooled_client(name, 5.0) as client:
+        return client
+
+
+class HttpPoolTests(SimpleTestCase):
+    def test_sync_calls_reuse_one_client_per_upstream(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            clients = list(executor.map(lambda _: run_sync(_client_of("approvals")), range(8)))
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertFalse(clients[0].is_closed)
+        self.assertIsNot(run_sync(_client_of("reporting")), clients[0])
+
+    def test_run_sync_times_out_and_cancels_call(self):
+        with self.assertRaises(FutureTimeoutError):
+            run_sync(asyncio.sleep(5), timeout=0.05)
+
+    def test_pooled_client_fails_fast_while_upstream_is_down(self):
+        breaker = get_breaker("down-upstream", failure_rate=1.0, min_calls=2, open_seconds=60)
+
+        async def call_down_upstream():
+            async with pooled_client("down-upstream", 0.5) as client:
+                await client.get("http://127.0.0.1:1/")
+
+        for _ in range(2):
+            with self.assertRaises(httpx.ConnectError):
+                run_sync(call_down_upstream())
+        with self.assertRaises(CircuitOpenError):
+            run_sync(call_down_upstream())
+        self.assertEqual(breaker.state, "open")
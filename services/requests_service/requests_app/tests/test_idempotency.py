@@ -0,0 +1,62 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from requests_app.models import Attachment, IdempotencyKey, OutboxEvent, Request
+
+
+class IdempotencyKeyTests(APITestCase):
+    def setUp(self) -> None:
+        self.payload = {
+            "tg_user_id": 1001,
+            "warehouse": "Алматы",
+            "category": "Авто",
+            "subcategory": "Ремонт авто",
+            "amount": "12000.00",
+        }
+
+    def test_retry_with_same_key_replays_response(self) -> None:
+        first = self.client.post("/api/requests/", self.payload, format="json", HTTP_IDEMPOTENCY_KEY="k-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(1):
+            second = self.client.post("/api/requests/", self.payload, format="json", HTTP_IDEMPOTENCY_KEY="k-1")
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data["id"], first.data["id"])
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Request.objects.count(), 1)
+        self.assertEqual(OutboxEvent.objects.filter(event_type="approval.start").count(), 1)
+
+    def test_same_key_with_different_body_is_rejected(self) -> None:
+        self.client.post("/api/requests/", self.payload, format="json", HTTP_IDEMPOTENCY_KEY="k-2")
+        response = self.client.post(
+            "/api/requests/",
+            {**self.payload, "amount": "1.00"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="k-2",
+        )
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Request.objects.count(), 1)
+
+    def test_failed_validation_does_not_consume_key(self) -> None:
+        bad = self.client.post(
+            "/api/requests/",
+            {**self.payload, "amount": "-1"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="k-3",
+        )
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_attach_retry_creates_one_attachment(self) -> None:
+        created = self.client.post("/api/requests/", self.payload, format="json")
+        attachment = {
+            "file_url": "https://example.com/file.pdf",
+            "storage_path": "/Авто/Ремонт авто/2026-10/file.pdf",
+            "file_name": "file.pdf",
+        }
+        url = f"/api/requests/{created.data['id']}/attach/"
+        for _ in range(2):
+            response = self.client.post(url, attachment, format="json", HTTP_IDEMPOTENCY_KEY="k-4")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Attachment.objects.count(), 1)
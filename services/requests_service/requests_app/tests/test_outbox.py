@@ -0,0 +1,164 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import AsyncMock, patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from requests_app.choices import OutboxEventStatus, OutboxEventType, RequestStatus
+from requests_app.models import OutboxEvent, Request
+from requests_app.outbox import OutboxDispatcher
+from requests_app.reporting_client import ReportingClient
+
+
+class _StubClient:
+    enabled = True
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def start_approval_chain_sync(self, request_id, summary):
+        self.calls.append((request_id, summary))
+        return self.result
+
+    def report_request_sync(self, request_obj):
+        self.calls.append(request_obj.id)
+        return self.result
+
+
+class OutboxCreateTests(APITestCase):
+    def test_create_request_writes_outbox_events(self) -> None:
+        payload = {
+            "tg_user_id": 1001,
+            "warehouse": "Алматы",
+            "category": "Авто",
+            "subcategory": "Ремонт авто",
+            "amount": "12000.00",
+        }
+        response = self.client.post("/api/requests/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        request_obj = Request.objects.get(id=response.data["id"])
+        # in_progress появится только после подтверждения старта approvals_service
+        self.assertEqual(request_obj.status, RequestStatus.NEW)
+        self.assertEqual(request_obj.current_level, 0)
+        event_types = set(request_obj.outbox_events.values_list("event_type", flat=True))
+        self.assertEqual(
+            event_types,
+            {OutboxEventType.APPROVAL_START, OutboxEventType.REQUEST_REPORT},
+        )
+
+
+class OutboxDispatcherTests(TestCase):
+    def setUp(self) -> None:
+        self.request_obj = Request.objects.create(
+            tg_user_id=1001,
+            warehouse="Алматы",
+            category="Авто",
+            subcategory="Ремонт авто",
+            amount="1000.00",
+        )
+        # Отчёт, поставленный сигналом при создании, здесь не нужен
+        OutboxEvent.objects.all().delete()
+        self.event = OutboxEvent.objects.create(
+            request=self.request_obj,
+            event_type=OutboxEventType.APPROVAL_START,
+            payload={"summary": "Служебка"},
+        )
+
+    def test_dispatch_marks_event_sent(self) -> None:
+        client = _StubClient({"id": 1})
+        with patch("requests_app.outbox.get_approvals_client", return_value=client):
+            processed = OutboxDispatcher().dispatch_batch()
+
+        self.assertEqual(processed, 1)
+        self.assertEqual(client.calls, [(self.request_obj.id, "Служебка")])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.status, OutboxEventStatus.SENT)
+        self.assertEqual(self.event.attempts, 1)
+        self.assertIsNotNone(self.event.sent_at)
+
+    def test_failed_delivery_is_rescheduled_then_given_up(self) -> None:
+        client = _StubClient(None)
+        dispatcher = OutboxDispatcher(max_attempts=2, retry_base_delay=30)
+        with patch("requests_app.outbox.get_approvals_client", return_value=client):
+            dispatcher.dispatch_batch()
+            self.event.refresh_from_db()
+            self.assertEqual(self.event.status, OutboxEventStatus.PENDING)
+            self.assertEqual(self.event.attempts, 1)
+            self.assertGreater(self.event.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+            # Пока не наступило время повтора, событие не забирается
+            self.assertEqual(dispatcher.dispatch_batch(), 0)
+
+            OutboxEvent.objects.filter(pk=self.event.pk).update(next_attempt_at=timezone.now())
+            dispatcher.dispatch_batch()
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.status, OutboxEventStatus.FAILED)
+        self.assertEqual(self.event.attempts, 2)
+        self.assertTrue(self.event.last_error)
+
+    def test_failed_start_can_be_requeued(self) -> None:
+        OutboxEvent.objects.filter(pk=self.event.pk).update(status=OutboxEventStatus.FAILED, attempts=10)
+        client = _StubClient({"id": 1})
+        out = StringIO()
+        with patch("requests_app.outbox.get_approvals_client", return_value=client):
+            call_command("run_outbox_dispatcher", "--once", "--retry-failed", stdout=out)
+
+        self.assertIn("Requeued 1 failed outbox event(s).", out.getvalue())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.status, OutboxEventStatus.SENT)
+        self.assertEqual(self.event.attempts, 1)
+
+
+class ReportCoalescingTests(APITestCase):
+    def test_changes_collapse_into_single_pending_report(self) -> None:
+        payload = {
+            "tg_user_id": 1001,
+            "warehouse": "Алматы",
+            "category": "Авто",
+            "subcategory": "Ремонт авто",
+            "amount": "12000.00",
+        }
+        request_id = self.client.post("/api/requests/", payload, format="json").data["id"]
+        request_obj = Request.objects.get(id=request_id)
+        request_obj.comment = "Уточнение"
+        request_obj.save()
+
+        reports = OutboxEvent.objects.filter(
+            request_id=request_id,
+            event_type=OutboxEventType.REQUEST_REPORT,
+        )
+        self.assertEqual(reports.count(), 1)
+
+    def test_row_id_write_back_does_not_schedule_new_report(self) -> None:
+        request_obj = Request.objects.create(
+            tg_user_id=1001,
+            warehouse="Алматы",
+            category="Авто",
+            subcategory="Ремонт авто",
+            amount="1000.00",
+        )
+        # Настоящий клиент, подменён только HTTP-вызов к reporting_service
+        client = ReportingClient()
+        client.enabled = True
+        with patch.object(
+            client,
+            "report_request_async",
+            AsyncMock(return_value={"google_row_id": "Reports!A2"}),
+        ), patch("requests_app.outbox.get_reporting_client", return_value=client):
+            OutboxDispatcher().dispatch_batch()
+
+        request_obj.refresh_from_db()
+        self.assertEqual(request_obj.google_row_id, "Reports!A2")
+        self.assertFalse(
+            OutboxEvent.objects.filter(
+                request=request_obj,
+                status=OutboxEventStatus.PENDING,
+            ).exists()
+        )
@@ -0,0 +1,54 @@
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from requests_app.models import Attachment, Request
+from requests_app.read_path import detail_queryset, list_queryset, render_detail, render_list_item
+from requests_app.serializers import RequestDetailSerializer, RequestListSerializer
+
+
+class RequestReadPathTests(APITestCase):
+    def setUp(self) -> None:
+        for index in range(12):
+            request_obj = Request.objects.create(
+                tg_user_id=1001,
+                warehouse="Алматы",
+                category="Авто",
+                subcategory="Ремонт авто",
+                goal="Ремонт" if index % 2 else "",
+                amount="1500.50",
+                comment="Плановое обслуживание",
+            )
+            for number in range(2):
+                Attachment.objects.create(
+                    request=request_obj,
+                    file_url=f"https://example.com/{index}-{number}.pdf",
+                    storage_path=f"/Авто/{index}-{number}.pdf",
+                    file_name=f"{index}-{number}.pdf",
+                )
+
+    def test_fast_path_matches_serializers(self) -> None:
+        for request_obj in detail_queryset(Request.objects.all()):
+            reference = Request.objects.get(pk=request_obj.pk)
+            self.assertEqual(render_detail(request_obj), RequestDetailSerializer(reference).data)
+        for request_obj in list_queryset(Request.objects.all()):
+            self.assertEqual(render_list_item(request_obj), RequestListSerializer(request_obj).data)
+
+    def test_query_count_does_not_depend_on_page_size(self) -> None:
+        counts = {}
+        for page_size in (2, 10):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    "/api/requests/",
+                    {"tg_user_id": 1001, "page_size": page_size, "view": "detail"},
+                )
+            self.assertEqual(len(response.data["results"]), page_size)
+            self.assertEqual(len(response.data["results"][0]["attachments"]), 2)
+            counts[page_size] = len(queries)
+        self.assertEqual(counts[2], counts[10])
+        self.assertEqual(counts[10], 2)
+
+        request_id = Request.objects.first().pk
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/requests/{request_id}/")
+        self.assertEqual(len(response.data["attachments"]), 2)
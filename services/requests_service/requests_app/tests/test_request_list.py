@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from requests_app.models import Request, RequestStatus
+
+
+class RequestListTests(APITestCase):
+    def setUp(self) -> None:
+        base = timezone.make_aware(datetime(2026, 10, 1, 12, 0))
+        self.requests = []
+        for index in range(7):
+            request_obj = Request.objects.create(
+                tg_user_id=1001,
+                warehouse="Алматы" if index % 2 else "Астана",
+                category="Авто",
+                subcategory="Ремонт авто",
+                amount="100.00",
+                status=RequestStatus.APPROVED if index == 6 else RequestStatus.IN_PROGRESS,
+            )
+            self.requests.append(request_obj)
+        # Две заявки с одинаковым created_at: порядок по id не должен терять строки
+        for index, request_obj in enumerate(self.requests):
+            Request.objects.filter(pk=request_obj.pk).update(
+                created_at=base + timedelta(days=min(index, 5))
+            )
+        Request.objects.create(
+            tg_user_id=2002,
+            warehouse="Алматы",
+            category="Авто",
+            subcategory="Ремонт авто",
+            amount="100.00",
+        )
+
+    def _ids(self, response) -> list[int]:
+        return [item["id"] for item in response.data["results"]]
+
+    def test_cursor_pages_cover_all_rows_newest_first(self) -> None:
+        seen = []
+        params = {"tg_user_id": 1001, "page_size": 3}
+        while True:
+            response = self.client.get("/api/requests/", params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(self._ids(response))
+            if not response.data["has_next"]:
+                self.assertIsNone(response.data["next_cursor"])
+                break
+            params["cursor"] = response.data["next_cursor"]
+
+        expected = [r.pk for r in sorted(self.requests, key=lambda r: (min(self.requests.index(r), 5), r.pk), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_list_items_are_lightweight(self) -> None:
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/requests/", {"tg_user_id": 1001, "page_size": 5})
+        item = response.data["results"][0]
+        self.assertNotIn("attachments", item)
+        self.assertNotIn("summary_text", item)
+        self.assertIn("status_display", item)
+
+    def test_filters(self) -> None:
+        response = self.client.get("/api/requests/", {"tg_user_id": 1001, "status": "approved"})
+        self.assertEqual(self._ids(response), [self.requests[6].pk])
+
+        response = self.client.get("/api/requests/", {"tg_user_id": 1001, "warehouse": "Астана"})
+        self.assertEqual(sorted(self._ids(response)), [self.requests[i].pk for i in (0, 2, 4, 6)])
+
+        response = self.client.get(
+            "/api/requests/",
+            {"tg_user_id": 1001, "created_from": "2026-10-02", "created_to": "2026-10-03"},
+        )
+        self.assertEqual(sorted(self._ids(response)), [self.requests[1].pk, self.requests[2].pk])
+
+    def test_invalid_filters_are_rejected(self) -> None:
+        for params in ({"status": "unknown"}, {"created_from": "yesterday"}, {"cursor": "garbage"}):
+            response = self.client.get("/api/requests/", params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
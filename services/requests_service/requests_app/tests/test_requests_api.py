@@ -75,3 +75,38 @@ class RequestAPITests(APITestCase):
         self.assertIn("attachment_id", response.data)
 
 
+
+    def test_create_request_with_attachments_in_one_call(self) -> None:
+        payload = {
+            **self.base_payload,
+            "attachments": [
+                {
+                    "file_url": "https://example.com/invoice.pdf",
+                    "storage_path": "/Авто/Ремонт авто/2026-10/invoice.pdf",
+                    "file_name": "invoice.pdf",
+                },
+                {
+                    "file_url": "https://example.com/photo.jpg",
+                    "storage_path": "/Авто/Ремонт авто/2026-10/photo.jpg",
+                    "file_name": "photo.jpg",
+                },
+            ],
+        }
+        response = self.client.post("/api/requests/", payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [attachment["file_name"] for attachment in response.data["attachments"]],
+            ["invoice.pdf", "photo.jpg"],
+        )
+        request_obj = Request.objects.get(pk=response.data["id"])
+        self.assertEqual(request_obj.attachments.count(), 2)
+        self.assertEqual(request_obj.outbox_events.filter(event_type="request.report").count(), 1)
+
+    def test_invalid_attachment_rolls_back_request(self) -> None:
+        payload = {**self.base_payload, "attachments": [{"file_url": "not-a-url", "file_name": "x"}]}
+        response = self.client.post("/api/requests/", payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("attachments", response.data)
+        self.assertFalse(Request.objects.exists())
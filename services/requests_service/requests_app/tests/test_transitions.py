@@ -0,0 +1,118 @@
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from requests_app.choices import OutboxEventStatus, OutboxEventType, RequestStatus
+from requests_app.models import OutboxEvent, Request
+
+
+class RequestTransitionTests(APITestCase):
+    def setUp(self) -> None:
+        self.requests = [
+            Request.objects.create(
+                tg_user_id=1001,
+                warehouse="Алматы",
+                category="Авто",
+                subcategory="Ремонт авто",
+                amount="1000.00",
+                status=RequestStatus.IN_PROGRESS,
+                current_level=1,
+            )
+            for _ in range(3)
+        ]
+        self.request_obj = self.requests[0]
+        # Отчёты о создании уже ушли: проверяем только новые
+        OutboxEvent.objects.update(status=OutboxEventStatus.SENT, dedupe_key=None)
+
+    def _transition(self, request_id: int, **data):
+        return self.client.post(f"/api/requests/{request_id}/transition/", data, format="json")
+
+    def _pending_reports(self) -> list:
+        return list(
+            OutboxEvent.objects.filter(
+                event_type=OutboxEventType.REQUEST_REPORT,
+                status=OutboxEventStatus.PENDING,
+            ).values_list("request_id", flat=True)
+        )
+
+    def test_transition_applies_with_one_update(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self._transition(
+                self.request_obj.pk, status=RequestStatus.IN_PROGRESS, current_level=2, version=2
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "id": self.request_obj.pk,
+                "status": RequestStatus.IN_PROGRESS,
+                "current_level": 2,
+                "status_version": 2,
+                "applied": True,
+            },
+        )
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+        self.assertEqual(statements.count("UPDATE"), 1)
+        self.assertNotIn("SELECT", statements)
+
+        self.request_obj.refresh_from_db()
+        self.assertEqual(self.request_obj.current_level, 2)
+        self.assertEqual(self.request_obj.status_version, 2)
+        self.assertEqual(self._pending_reports(), [self.request_obj.pk])
+
+    def test_stale_or_repeated_transition_is_ignored(self) -> None:
+        self._transition(self.request_obj.pk, status=RequestStatus.APPROVED, current_level=4, version=5)
+        for version in (5, 3):
+            response = self._transition(
+                self.request_obj.pk, status=RequestStatus.IN_PROGRESS, current_level=2, version=version
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(response.data["applied"])
+            self.assertEqual(response.data["status"], RequestStatus.APPROVED)
+            self.assertEqual(response.data["status_version"], 5)
+
+        self.request_obj.refresh_from_db()
+        self.assertEqual(self.request_obj.status, RequestStatus.APPROVED)
+        # Отчёт схлопнут в одно событие
+        self.assertEqual(self._pending_reports(), [self.request_obj.pk])
+
+    def test_transition_validates_payload_and_request(self) -> None:
+        response = self._transition(self.request_obj.pk, status="unknown", current_level=1, version=1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._transition(999999, status=RequestStatus.REJECTED, current_level=1, version=1)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_batch_applies_newest_transitions_in_one_update(self) -> None:
+        first, second, third = self.requests
+        Request.objects.filter(pk=third.pk).update(status_version=7)
+        payload = {
+            "transitions": [
+                {"id": first.pk, "status": RequestStatus.IN_PROGRESS, "current_level": 2, "version": 2},
+                {"id": first.pk, "status": RequestStatus.IN_PROGRESS, "current_level": 3, "version": 3},
+                {"id": second.pk, "status": RequestStatus.REJECTED, "current_level": 1, "version": 2},
+                {"id": third.pk, "status": RequestStatus.APPROVED, "current_level": 4, "version": 4},
+                {"id": 999999, "status": RequestStatus.APPROVED, "current_level": 4, "version": 4},
+            ]
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/requests/transitions/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+        self.assertEqual(statements.count("UPDATE"), 1)
+
+        results = {item["id"]: item for item in response.data["results"]}
+        self.assertEqual(results[first.pk]["current_level"], 3)
+        self.assertTrue(results[first.pk]["applied"])
+        self.assertTrue(results[second.pk]["applied"])
+        self.assertFalse(results[third.pk]["applied"])
+        self.assertEqual(results[third.pk]["status_version"], 7)
+        self.assertIn("detail", results[999999])
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        third.refresh_from_db()
+        self.assertEqual((first.current_level, first.status_version), (3, 3))
+        self.assertEqual(second.status, RequestStatus.REJECTED)
+        self.assertEqual(third.status, RequestStatus.IN_PROGRESS)
+        self.assertEqual(sorted(self._pending_reports()), sorted([first.pk, second.pk]))
@@ -0,0 +1,123 @@
+"""
+Status transitions pushed by approvals_service.
+
+A transition carries the approval chain's transition number (`version`) and
+is applied only if it is newer than the request's `status_version`, by one
+conditional UPDATE: retries and out-of-order deliveries are no-ops. The
+post_save signal is not involved, so the report to reporting_service is
+scheduled explicitly (coalesced) in the same transaction.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Request
+from .outbox import schedule_reports
+
+COMPACT_FIELDS = ("id", "status", "current_level", "status_version")
+
+
+@dataclass(frozen=True)
+class Transition:
+    request_id: int
+    status: str
+    current_level: int
+    version: int
+
+    def compact(self, *, applied: bool) -> Dict[str, Any]:
+        return {
+            "id": self.request_id,
+            "status": self.status,
+            "current_level": self.current_level,
+            "status_version": self.version,
+            "applied": applied,
+        }
+
+
+def _compact_row(row: Dict[str, Any], *, applied: bool) -> Dict[str, Any]:
+    return {**row, "applied": applied}
+
+
+def apply_transition(transition: Transition) -> Dict[str, Any] | None:
+    """
+    Apply one transition. Returns the compact state of the request
+    (`applied` is False for a stale or repeated transition), None if the
+    request does not exist.
+    """
+    with transaction.atomic():
+        updated = Request.objects.filter(
+            pk=transition.request_id,
+            status_version__lt=transition.version,
+        ).update(
+            status=transition.status,
+            current_level=transition.current_level,
+            status_version=transition.version,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            schedule_reports([transition.request_id])
+            return transition.compact(applied=True)
+    row = Request.objects.filter(pk=transition.request_id).values(*COMPACT_FIELDS).first()
+    return None if row is None else _compact_row(row, applied=False)
+
+
+def apply_transitions(transitions: Iterable[Transition]) -> List[Dict[str, Any]]:
+    """
+    Apply a batch: one locking SELECT of the current versions and one UPDATE
+    (per-row values via CASE) for all transitions that are newer. For several
+    transitions of the same request only the newest one counts. Missing
+    requests are reported with `applied: False` and a detail.
+    """
+    latest: Dict[int, Transition] = {}
+    for transition in transitions:
+        current = latest.get(transition.request_id)
+        if current is None or transition.version > current.version:
+            latest[transition.request_id] = transition
+
+    with transaction.atomic():
+        rows = {
+            row["id"]: row
+            for row in Request.objects.select_for_update()
+            .filter(pk__in=latest)
+            .order_by("pk")
+            .values(*COMPACT_FIELDS)
+        }
+        newer = [
+            transition
+            for request_id, transition in latest.items()
+            if request_id in rows and transition.version > rows[request_id]["status_version"]
+        ]
+        if newer:
+            def by_id(attr: str, output_field=None) -> Case:
+                return Case(
+                    *(
+                        When(pk=transition.request_id, then=Value(getattr(transition, attr)))
+                        for transition in newer
+                    ),
+                    output_field=output_field,
+                )
+
+            Request.objects.filter(pk__in=[transition.request_id for transition in newer]).update(
+                status=by_id("status"),
+                current_level=by_id("current_level", IntegerField()),
+                status_version=by_id("version", IntegerField()),
+                updated_at=timezone.now(),
+            )
+            schedule_reports(transition.request_id for transition in newer)
+
+    applied = {transition.request_id for transition in newer}
+    results: List[Dict[str, Any]] = []
+    for request_id, transition in latest.items():
+        if request_id in applied:
+            results.append(transition.compact(applied=True))
+        elif request_id in rows:
+            results.append(_compact_row(rows[request_id], applied=False))
+        else:
+            results.append({"id": request_id, "applied": False, "detail": "Заявка не найдена."})
+    return results
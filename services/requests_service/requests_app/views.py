@@ -1,39 +1,88 @@
 # requests_app/views.py
 import logging
+from datetime import datetime, time, timedelta
 
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from .idempotency import idempotent
 from .models import Request, RequestStatus
-from .approvals_client import get_approvals_client
-from .reporting_client import get_reporting_client
+from .pagination import RequestKeysetPagination
+from .read_path import detail_queryset, list_queryset, render_detail, render_list
+from .transitions import Transition, apply_transition, apply_transitions
+from .outbox import enqueue_request_created
 from .serializers import (
     RequestCreateSerializer,
     RequestDetailSerializer,
+    RequestListSerializer,
     RequestUpdateSerializer,
+    RequestTransitionBatchSerializer,
+    RequestTransitionSerializer,
     AttachmentCreateSerializer,
 )
 
 logger = logging.getLogger(__name__)
 
 
+def parse_range_bound(value: str, *, end_of_range: bool) -> datetime | None:
+    """
+    Граница фильтра по created_at. Дата без времени для конца диапазона
+    означает «весь этот день включительно» (created_at < начала следующего дня).
+    """
+    try:
+        day = parse_date(value)
+        if day is not None:
+            if end_of_range:
+                day += timedelta(days=1)
+            parsed = datetime.combine(day, time.min)
+        else:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                return None
+            if end_of_range:
+                # Точное время — включительно
+                parsed += timedelta(microseconds=1)
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
 class RequestViewSet(viewsets.GenericViewSet):
     """
     ViewSet для работы с заявками.
     Здесь:
     - POST /requests/             -> создать заявку
+    - GET /requests/              -> список (фильтры, курсорная пагинация)
     - GET /requests/{id}/         -> получить заявку
     - PATCH /requests/{id}/       -> частично обновить (пока статус NEW)
     - POST /requests/{id}/attach/ -> привязать файл
+    - POST /requests/{id}/transition/ -> переход статуса (approvals_service)
+    - POST /requests/transitions/     -> пачка переходов
+
+    POST-запросы принимают заголовок Idempotency-Key.
     """
 
     queryset = Request.objects.all()
+    pagination_class = RequestKeysetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            return detail_queryset(queryset)
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "create":
             return RequestCreateSerializer
-        elif self.action in ("retrieve", "list"):
+        elif self.action == "list":
+            return RequestListSerializer
+        elif self.action == "retrieve":
             return RequestDetailSerializer
         elif self.action == "partial_update":
             return RequestUpdateSerializer
@@ -44,55 +93,88 @@ class RequestViewSet(viewsets.GenericViewSet):
     def create(self, request, *args, **kwargs):
         """
         Создание новой заявки (бот вызывает этот endpoint после того,
-        как пользователь прошёл все шаги).
+        как пользователь прошёл все шаги). Файлы можно передать сразу
+        в поле attachments — отдельный вызов attach не нужен.
+        С заголовком Idempotency-Key повтор запроса вернёт уже созданную заявку.
         """
+        return idempotent(request, "requests.create", lambda: self._create(request))
+
+    def _create(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        request_obj = serializer.save()
 
-        # Запускаем цепочку согласования
-        try:
-            approvals_client = get_approvals_client()
-            summary = request_obj.build_summary_text()
-            approvals_client.start_approval_chain_sync(request_obj.id, summary)
-            # Обновляем статус заявки на "в согласовании"
-            request_obj.status = RequestStatus.IN_PROGRESS
-            request_obj.current_level = 1
-            request_obj.save(update_fields=["status", "current_level"])
-        except Exception as exc:
-            logger.error(f"Failed to start approval chain for request {request_obj.id}: {exc}")
-
-        # Отправляем в reporting_service (асинхронно, не блокируем ответ)
-        try:
-            reporting_client = get_reporting_client()
-            reporting_client.report_request_sync(request_obj)
-        except Exception as exc:
-            logger.error(f"Failed to report request {request_obj.id} to reporting_service: {exc}")
+        # Заявка, её вложения и события для approvals_service / reporting_service
+        # пишутся одной транзакцией (отчёт ставит сигнал post_save); доставку
+        # выполняет воркер run_outbox_dispatcher. Заявка остаётся NEW, пока
+        # approvals_service не подтвердит старт цепочки переходом in_progress
+        # (version 1). Если событие старта ушло в FAILED, заявка остаётся NEW;
+        # после восстановления approvals_service:
+        # manage.py run_outbox_dispatcher --retry-failed
+        with transaction.atomic():
+            request_obj = serializer.save()
+            enqueue_request_created(request_obj)
 
         # Возвращаем подробную информацию для бота
-        detail_data = RequestDetailSerializer(request_obj).data
+        detail_data = render_detail(request_obj)
         return Response(detail_data, status=status.HTTP_201_CREATED)
 
     def list(self, request, *args, **kwargs):
         """
-        Получить список заявок пользователя.
-        Фильтрация по tg_user_id через параметр запроса.
+        Список заявок, новые сверху, постранично по курсору.
+
+        Фильтры (query params): tg_user_id, status (можно через запятую),
+        warehouse, created_from / created_to (дата или дата-время, границы
+        включительно). Страница: page_size (по умолчанию 20), cursor — значение
+        next_cursor из предыдущего ответа. view=detail — полные карточки
+        (с вложениями и summary_text) вместо облегчённых строк.
+
+        Число запросов к БД не зависит от размера страницы: 1 (2 с view=detail).
         """
+        filters = {}
         tg_user_id = request.query_params.get("tg_user_id")
-        queryset = self.queryset
-        
         if tg_user_id:
             try:
-                tg_user_id = int(tg_user_id)
-                queryset = queryset.filter(tg_user_id=tg_user_id)
+                filters["tg_user_id"] = int(tg_user_id)
             except (ValueError, TypeError):
                 return Response(
                     {"detail": "Неверный формат tg_user_id."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+
+        statuses = [value for value in request.query_params.get("status", "").split(",") if value]
+        if statuses:
+            unknown = set(statuses) - set(RequestStatus.values)
+            if unknown:
+                return Response(
+                    {"detail": f"Неизвестный статус: {', '.join(sorted(unknown))}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            filters["status__in"] = statuses
+
+        warehouse = request.query_params.get("warehouse")
+        if warehouse:
+            filters["warehouse"] = warehouse
+
+        for param, lookup, end_of_range in (
+            ("created_from", "created_at__gte", False),
+            ("created_to", "created_at__lt", True),
+        ):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            bound = parse_range_bound(value, end_of_range=end_of_range)
+            if bound is None:
+                return Response(
+                    {"detail": f"Неверный формат {param}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            filters[lookup] = bound
+
+        detail = request.query_params.get("view") == "detail"
+        queryset = self.get_queryset().filter(**filters)
+        queryset = detail_queryset(queryset) if detail else list_queryset(queryset)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(render_list(page, detail=detail))
 
     def retrieve(self, request, pk=None, *args, **kwargs):
         """
@@ -100,8 +182,7 @@ class RequestViewSet(viewsets.GenericViewSet):
         Можно использовать для проверки статуса или отображения истории.
         """
         request_obj = self.get_object()
-        serializer = self.get_serializer(request_obj)
-        return Response(serializer.data)
+        return Response(render_detail(request_obj))
 
     def partial_update(self, request, pk=None, *args, **kwargs):
         """
@@ -122,16 +203,10 @@ class RequestViewSet(viewsets.GenericViewSet):
             partial=True,
         )
         serializer.is_valid(raise_exception=True)
+        # Отчёт в reporting_service ставится в outbox сигналом post_save
         serializer.save()
-        
-        # Обновляем отчет в reporting_service при изменении заявки
-        try:
-            reporting_client = get_reporting_client()
-            reporting_client.report_request_sync(request_obj)
-        except Exception as exc:
-            logger.error(f"Failed to update report for request {request_obj.id}: {exc}")
-        
-        detail_data = RequestDetailSerializer(request_obj).data
+
+        detail_data = render_detail(request_obj)
         return Response(detail_data)
 
     @action(detail=True, methods=["post"], url_path="attach")
@@ -140,8 +215,16 @@ class RequestViewSet(viewsets.GenericViewSet):
         Привязать файл к заявке.
         Предполагается, что файл уже загружен файловым сервисом в облако,
         и сюда приходят только ссылки/пути.
+        С заголовком Idempotency-Key повтор не создаёт второе вложение.
         """
         request_obj = self.get_object()
+        return idempotent(
+            request,
+            f"requests.{request_obj.pk}.attach",
+            lambda: self._attach(request, request_obj),
+        )
+
+    def _attach(self, request, request_obj):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
@@ -153,3 +236,37 @@ class RequestViewSet(viewsets.GenericViewSet):
             },
             status=status.HTTP_201_CREATED,
         )
+
+    @action(detail=True, methods=["post"], url_path="transition")
+    def transition(self, request, pk=None, *args, **kwargs):
+        """
+        Внутренний endpoint для approvals_service: смена status / current_level.
+        Применяется одним условным UPDATE, только если version больше уже
+        применённой; ответ — компактное состояние заявки (applied=false, если
+        переход устарел или повторный). Полная карточка не рендерится.
+        """
+        serializer = RequestTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            request_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({"detail": "Заявка не найдена."}, status=status.HTTP_404_NOT_FOUND)
+        result = apply_transition(Transition(request_id=request_id, **serializer.validated_data))
+        if result is None:
+            return Response({"detail": "Заявка не найдена."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+    @action(detail=False, methods=["post"], url_path="transitions")
+    def transitions(self, request, *args, **kwargs):
+        """
+        Пачка переходов: {"transitions": [{"id", "status", "current_level", "version"}, ...]}.
+        Один SELECT и один UPDATE на всю пачку; ответ — {"results": [...]}
+        в формате /transition/ (для несуществующих заявок — detail).
+        """
+        serializer = RequestTransitionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_transitions(
+            Transition(request_id=item.pop("id"), **item)
+            for item in serializer.validated_data["transitions"]
+        )
+        return Response({"results": results})
@@ -9,6 +9,7 @@ via environment variables to fit different environments.
 from __future__ import annotations
 
 import os
+import sys
 from pathlib import Path
 from typing import List
 
@@ -24,6 +25,15 @@ load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Общие модули из config/ (circuit_breaker, http_pool): в репозитории — корень
+# проекта, в образе — /app/config
+CONFIG_DIR = next(
+    (path / "config" for path in (BASE_DIR, *BASE_DIR.parents) if (path / "config").is_dir()),
+    None,
+)
+if CONFIG_DIR is not None and str(CONFIG_DIR) not in sys.path:
+    sys.path.insert(0, str(CONFIG_DIR))
+
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "unsafe-secret-key-for-dev-only")
 
 DEBUG = os.getenv("DJANGO_DEBUG", "false").lower() == "true"
@@ -10,7 +10,7 @@ from rest_framework.test import APITestCase
 
 pytestmark = pytest.mark.django_db
 
-from requests_app.choices import RequestStatus
+from requests_app.choices import OutboxEventType, RequestStatus
 from requests_app.models import Attachment, Request
 
 
@@ -57,8 +57,23 @@ class RequestAPIExtendedTests(APITestCase):
             with patch.dict(os.environ, {"APPROVALS_SERVICE_ENABLED": "true"}):
                 response = self._authenticated_request("post", "/api/requests/", data=self.base_payload, format="json")
                 self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-                # Check that approval chain was started
+                # Старт цепочки поставлен в outbox; до подтверждения заявка остаётся NEW
                 request_obj = Request.objects.get(id=response.data["id"])
+                self.assertTrue(
+                    request_obj.outbox_events.filter(event_type=OutboxEventType.APPROVAL_START).exists()
+                )
+                self.assertEqual(request_obj.status, RequestStatus.NEW)
+                self.assertEqual(request_obj.current_level, 0)
+
+                # approvals_service подтверждает старт переходом с version 1
+                response = self._authenticated_request(
+                    "post",
+                    f"/api/requests/{request_obj.id}/transition/",
+                    data={"status": RequestStatus.IN_PROGRESS, "current_level": 1, "version": 1},
+                    format="json",
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                request_obj.refresh_from_db()
                 self.assertEqual(request_obj.status, RequestStatus.IN_PROGRESS)
                 self.assertEqual(request_obj.current_level, 1)
 